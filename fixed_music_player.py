@@ -7,6 +7,12 @@ from pathlib import Path
 import threading
 import time
 
+from musicflow.library_scanner import LibraryScanner
+from musicflow.play_history import PlayHistory
+from musicflow.playback_events import FINISHED, PAUSED, RESUMED, SEEK, STARTED, STOPPED, PlaybackEvents
+from musicflow.shuffle import ShuffleBag
+from musicflow.ui_bus import UIUpdateBus
+
 # ============================================================================
 # MUSICFLOW - ULTIMATE SPOTIFY-LIKE MUSIC PLAYER (FIXED & WORKING)
 # ============================================================================
@@ -42,12 +48,27 @@ class SpotifyMusicPlayer:
         self.repeat_mode = 0
         self.music_folder = "./songs"
         self.current_song_length = 0
-        self.played_indices = []
+        # Play log with running counts and a bounded recent list, per music folder
+        self.history = None
+        self.positions = {}  # path -> index in playlist
+        self.shuffle = ShuffleBag(no_repeat=10)
+        self.library_scanner = None
+        # The update thread hands widget changes to the Tk thread through this bus
+        self.ui_bus = UIUpdateBus(self.root)
+        # Song ends arrive as mixer events; the update thread sleeps while nothing plays
+        self.events = PlaybackEvents(self.root, pygame.mixer.music, remaining=self.remaining_time)
+        self.events.subscribe(FINISHED, self.on_track_end)
+        self.playing_now = threading.Event()
+        for kind in (STARTED, RESUMED, SEEK):
+            self.events.subscribe(kind, lambda **_: self.playing_now.set())
+        for kind in (PAUSED, STOPPED):
+            self.events.subscribe(kind, lambda **_: self.playing_now.clear())
         
         Path(self.music_folder).mkdir(exist_ok=True)
         
         # ====================== BUILD UI =======================
         self.build_ui()
+        self.ui_bus.start()
         self.load_songs()
         
         # ====================== START UPDATE THREAD =======================
@@ -300,18 +321,31 @@ class SpotifyMusicPlayer:
         self.stats.pack(fill=tk.X, padx=15, pady=10)
         
     def load_songs(self):
-        """Load songs from folder"""
-        supported = ('.mp3', '.wav', '.flac', '.ogg', '.m4a')
-        self.playlist = []
-        
+        """Load songs from folder and subfolders (a refresh only picks up changes)"""
         try:
-            if os.path.exists(self.music_folder):
-                for file in os.listdir(self.music_folder):
-                    if file.lower().endswith(supported):
-                        self.playlist.append(os.path.join(self.music_folder, file))
-            
-            self.playlist.sort()
-            self.update_songlist()
+            fresh = self.library_scanner is None or self.library_scanner.music_folder != self.music_folder
+            if fresh:
+                self.library_scanner = LibraryScanner(self.music_folder)
+                if self.history is not None:
+                    self.history.close()
+                try:
+                    self.history = PlayHistory(self.music_folder)
+                except Exception as e:
+                    print("Play history unavailable:", e)
+                    self.history = None
+            current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+            changes = self.library_scanner.rescan()
+            if changes or fresh:
+                if fresh:
+                    self.shuffle.reset()
+                for path in changes.removed:
+                    self.shuffle.remove(path)
+                for path in changes.added:
+                    self.shuffle.add(path)
+                self.playlist = self.library_scanner.paths()
+                self.positions = positions = {p: i for i, p in enumerate(self.playlist)}
+                self.current_index = positions.get(current, -1)
+                self.update_songlist()
             
             if self.playlist:
                 self.status.config(text=f"✅ Loaded {len(self.playlist)} songs")
@@ -335,7 +369,8 @@ class SpotifyMusicPlayer:
         if self.current_index >= 0:
             self.songlist.see(self.current_index)
         
-        self.stats.config(text=f"Songs: {len(self.playlist)} | Now: {self.current_index + 1 if self.current_index >= 0 else 'None'}/{len(self.playlist)}")
+        plays = self.history.total if self.history is not None else 0
+        self.stats.config(text=f"Songs: {len(self.playlist)} | Now: {self.current_index + 1 if self.current_index >= 0 else 'None'}/{len(self.playlist)} | Plays: {plays}")
     
     def play_pause(self):
         """Play or pause"""
@@ -348,10 +383,12 @@ class SpotifyMusicPlayer:
             self.is_paused = False
             self.is_playing = True
             self.play_btn.config(text="⏸️ PAUSE")
+            self.events.emit(RESUMED)
         elif self.is_playing:
             pygame.mixer.music.pause()
             self.is_paused = True
             self.play_btn.config(text="▶️ PLAY")
+            self.events.emit(PAUSED)
         else:
             if self.current_index < 0:
                 self.current_index = random.randint(0, len(self.playlist) - 1) if self.shuffle_mode else 0
@@ -377,10 +414,12 @@ class SpotifyMusicPlayer:
             self.song_title.config(text=name)
             self.song_info.config(text=f"Track {index + 1} of {len(self.playlist)}")
             
+            if self.history is not None:
+                self.history.record(path)
             self.update_songlist()
             
-            if index not in self.played_indices:
-                self.played_indices.append(index)
+            self.shuffle.played(path)
+            self.events.emit(STARTED, index=index, path=path)
         except Exception as e:
             messagebox.showerror("Error", f"Could not play: {str(e)}")
     
@@ -390,13 +429,7 @@ class SpotifyMusicPlayer:
             return
         
         if self.shuffle_mode:
-            while True:
-                idx = random.randint(0, len(self.playlist) - 1)
-                if idx not in self.played_indices or len(self.played_indices) >= len(self.playlist):
-                    if len(self.played_indices) >= len(self.playlist):
-                        self.played_indices = []
-                    self.play_song(idx)
-                    break
+            self.play_song(self.positions.get(self.shuffle.next(), -1))
         else:
             self.play_song((self.current_index + 1) % len(self.playlist))
     
@@ -404,6 +437,11 @@ class SpotifyMusicPlayer:
         """Play previous song"""
         if not self.playlist:
             return
+        if self.shuffle_mode:
+            path = self.shuffle.previous()
+            if path is not None:
+                self.play_song(self.positions.get(path, -1))
+            return
         self.play_song((self.current_index - 1) % len(self.playlist))
     
     def on_song_double_click(self, event):
@@ -464,19 +502,15 @@ class SpotifyMusicPlayer:
         """Update thread"""
         def update_loop():
             while self.update_active:
+                self.playing_now.wait()
                 try:
                     if self.is_playing and not self.is_paused and pygame.mixer.music.get_busy():
                         pos = pygame.mixer.music.get_pos() / 1000.0
                         if pos >= 0:
-                            self.time_label.config(text=self.format_time(pos))
+                            self.ui_bus.post_config(self.time_label, text=self.format_time(pos))
                             if self.current_song_length > 0:
                                 progress = (pos / self.current_song_length) * 100
-                                self.progress_var.set(min(100, progress))
-                    elif self.is_playing and not pygame.mixer.music.get_busy() and not self.is_paused:
-                        if self.repeat_mode == 2:
-                            self.play_song(self.current_index)
-                        else:
-                            self.next_song()
+                                self.ui_bus.post_var(self.progress_var, min(100, progress))
                     
                     time.sleep(0.1)
                 except:
@@ -485,9 +519,28 @@ class SpotifyMusicPlayer:
         self.thread = threading.Thread(target=update_loop, daemon=True)
         self.thread.start()
     
+    def remaining_time(self):
+        """Seconds left in the song, None if the length is unknown"""
+        if self.current_song_length <= 0:
+            return None
+        return self.current_song_length - pygame.mixer.music.get_pos() / 1000.0
+    
+    def on_track_end(self, queued=False):
+        """Song finished (mixer end event, Tk thread)"""
+        if queued or not self.is_playing or self.is_paused:
+            return
+        if self.repeat_mode == 2:
+            self.play_song(self.current_index)
+        else:
+            self.next_song()
+    
     def on_close(self):
         """Close app"""
         self.update_active = False
+        self.playing_now.set()
+        self.ui_bus.stop()
+        if self.history is not None:
+            self.history.close()
         pygame.mixer.music.stop()
         self.root.destroy()
 
@@ -1,25 +1,44 @@
+import time
+# Taken before any other import, so --profile-startup can account for them
+_STARTED_AT = time.perf_counter()
+import sys
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox
 import tkinter.font as tkfont
-import pygame
 import traceback
-import math
 import os
-import random
-import shutil
 from pathlib import Path
 import threading
-from datetime import timedelta
-import json
-from PIL import Image, ImageDraw, ImageFont, ImageTk, ImageFilter
-from io import BytesIO
-try:
-    from mutagen._file import File as MutagenFile
-    from mutagen.id3._util import ID3NoHeaderError
-    MUTAGEN_AVAILABLE = True
-except ImportError:
-    MutagenFile = None
-    MUTAGEN_AVAILABLE = False
+import queue
+from musicflow.animation import AnimationScheduler, bounce_offsets, color_cycle
+from musicflow.art_cache import ArtCache, ArtLRU
+from musicflow.card_grid import VirtualCardGrid
+from musicflow.fingerprint import FingerprintStore
+from musicflow.lazy import lazy_import
+from musicflow.library_scanner import LibraryScanner
+from musicflow.liked_store import LikedStore
+from musicflow.loudness import LoudnessPool
+from musicflow.metadata_store import MetadataStore
+from musicflow.mixer_boot import MixerBoot
+from musicflow.peaks import PRIORITY_CURRENT, PRIORITY_LIBRARY, PRIORITY_NEXT, PeakCache
+from musicflow.play_history import PlayHistory
+from musicflow.player_core import STATE_PAUSED, STATE_STOPPED, PlayerCore
+from musicflow.playback_events import PAUSED, RESUMED, SEEK, STARTED, STOPPED
+from musicflow.scan_pool import ScanPool
+from musicflow.seek_index import SeekIndex
+from musicflow.session_snapshot import SessionCard, SessionSnapshot, load_session, save_session
+from musicflow.startup_profile import StartupProfiler
+from musicflow.track_inspector import inspect_track, metadata_from_info
+from musicflow.ui_bus import UIUpdateBus
+from musicflow.waveform_bar import WaveformBar
+
+# pygame and PIL take longer to import than the window takes to draw; they load on first use
+pygame = lazy_import('pygame')
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
+ImageTk = lazy_import('PIL.ImageTk')
+stream_server = lazy_import('musicflow.stream_server')
 
 # ============================================================================
 # MUSICFLOW - TRUE SPOTIFY CLONE (2025 RADICAL REDESIGN)
@@ -27,8 +46,12 @@ except ImportError:
 # ============================================================================
 
 class SpotifyClonePlayer:
-    def __init__(self, root):
+    # Load the library even if the window never reports being mapped (e.g. started minimized)
+    STARTUP_FALLBACK_MS = 1000
+
+    def __init__(self, root, profiler=None):
         self.root = root
+        self.profiler = profiler or StartupProfiler(_STARTED_AT)
         self.root.title("🎵 MusicFlow - Spotify Clone")
         self.root.geometry("1400x850")
         self.root.minsize(1100, 700)
@@ -58,46 +81,175 @@ class SpotifyClonePlayer:
                 pass
         
         # ====================== PYGAME INIT =======================
-        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        # 44.1 kHz matches most files (no resampling) and keeps one 512-frame buffer,
+        # the worst-case gapless handoff, under 12 ms
+        self.MIXER_FREQUENCY = 44100
+        self.MIXER_BUFFER = 512
+        # Worker threads hand UI updates to the Tk thread through this bus
+        self.ui_bus = UIUpdateBus(self.root)
+        # pygame is imported and the device opened on a worker thread while the UI is built;
+        # self.mixer.music stands in for pygame.mixer.music meanwhile
+        self.mixer = MixerBoot(self.MIXER_FREQUENCY, self.MIXER_BUFFER,
+                               on_ready=lambda error: self.ui_bus.call(self._on_mixer_ready, error)).start()
         
         # ====================== STATE VARS =======================
-        self.playlist = []
-        self.current_index = -1
-        self.is_playing = False
-        self.is_paused = False
-        self.shuffle_mode = False
-        self.repeat_mode = 0
         self.music_folder = "./songs"
+        # Shuffle order: no repeats within SHUFFLE_NO_REPEAT steps, artists spread apart;
+        # set SHUFFLE_SEED for a reproducible session
+        self.SHUFFLE_SEED = None
+        self.SHUFFLE_NO_REPEAT = 10
+        # Gapless: the predicted next track waits in the mixer's queue
+        self.GAPLESS = True
+        # Loudness normalization: each track's stored gain scales the volume
+        self.NORMALIZE = True
+        # The transport (play queue, shuffle/repeat, gapless handoff, clock, events) is the
+        # PlayerCore the headless player runs; the window draws what its events announce
+        self.core = PlayerCore(self.music_folder, self.root, self.MIXER_FREQUENCY, self.MIXER_BUFFER,
+                               normalize=self.NORMALIZE, shuffle_seed=self.SHUFFLE_SEED,
+                               shuffle_no_repeat=self.SHUFFLE_NO_REPEAT, gapless=self.GAPLESS, mixer=self.mixer)
+        # Track rows live in a columnar table; playlist and views hold track ids
+        self.tracks = self.core.tracks
+        self.shuffle = self.core.shuffle
         self.current_song_length = 0
-        self.current_position = 0
-        self.played_indices = []
+        # Bounded recent plays plus a play log with running counts, per music folder (self.history)
+        self.STATS_TOP = 50
         self.filtered_playlist = []
-        self.song_metadata = {}
-        self.card_widgets = {}
+        # Track ids a special view (Liked, Duplicates) shows in the grid instead of the library
+        self.grid_view = None
+        self.grid_view_name = None
+        self.view_title = None
+        self.summary_label = None
+        # Last session's window, shown until the first library scan replaces it
+        self.session = None
+        # Where play resumes in the restored track (seconds) until it is played
+        self._resume_at = 0
+        self.liked = None
+        self.fingerprints = None
+        self._duplicates_thread = None
+        self.library_scanner = None
+        self.metadata_store = None
+        self.art_cache = None
+        self._art_cache_lock = threading.Lock()
+        self.ART_MEMORY_BYTES = 48 * 1024 * 1024
+        self.art_memory = ArtLRU(self.ART_MEMORY_BYTES)
+        self._metadata_pending = frozenset()
+        # Metadata scan: worker processes (default all cores but one) and paths per task
+        self.SCAN_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+        self.SCAN_CHUNK = 32
+        # Loudness gains are measured in the background, a batch at a time
+        self.LOUDNESS_WORKERS = 1
+        self.LOUDNESS_BATCH = 8
+        self._loudness_thread = None
+        self.card_grid = None
+        self.search_index = self.core.search_index
+        self.SEARCH_DEBOUNCE_MS = 150
+        self._search_after_id = None
+        self._art_queue = queue.Queue()
+        self._art_requested = set()
+        self._art_thread = None
         self.current_art_photo = None
         self.small_art_photo = None
         self.sidebar_visible = True  # For collapsible sidebar
-        self.COMPACT_THRESHOLD = 60
-        self.compact_tree = None
+        # Home animations share one timer: capped frame rate, paused while hidden or unfocused
+        self.animations = AnimationScheduler(self.root)
+        self.CAROUSEL_INTERVAL_MS = 40
+        self.CAROUSEL_STEP_PX = 2
+        self.PULSE_INTERVAL_MS = 80
+        self.PULSE_FRAMES = 126
+        # Devices: the library is served over HTTP from the first time the Devices button is used.
+        # 127.0.0.1 keeps it on this machine; '0.0.0.0' lets phones on the network connect
+        self.STREAM_HOST = '127.0.0.1'
+        self.STREAM_PORT = 8700
+        self.stream_server = None
+        self.stream_url = None
+        self.gapless = self.core.gapless
+        # Song position = seek offset + get_pos() progress; MP3 seeks use a frame index
+        self.clock = self.core.clock
+        # Waveform peaks are computed in the background and cached per track
+        self.peak_cache = None
+        # Track end/start/pause/seek arrive as events instead of being polled for; the core
+        # follows track ends itself (gapless handoff or the next track) and announces STARTED
+        self.events = self.core.events
+        self.events.subscribe(STARTED, lambda index, track: self._show_track(index))
+        self._progress_wake = threading.Event()
+        for kind in (STARTED, RESUMED, SEEK):
+            self.events.subscribe(kind, lambda **_: self._progress_wake.set())
+        for kind in (PAUSED, STOPPED):
+            self.events.subscribe(kind, lambda **_: self._progress_wake.clear())
         
         Path(self.music_folder).mkdir(exist_ok=True)
         
         # ====================== UI SETUP =======================
         self.setup_ui()
-        self.load_songs()
+        self.profiler.mark("setup_ui")
+        # Paint the window as it was left; the library scan reconciles it after the first frame
+        self._show_session()
+        self.profiler.mark("session")
+        self.ui_bus.start()
+        # The folder is listed once the window is on screen
+        self._startup_done = False
+        self.root.bind('<Map>', self._on_first_map, add='+')
+        self.root.after(self.STARTUP_FALLBACK_MS, self._finish_startup)
+
+    def _on_first_map(self, event):
+        if event.widget is not self.root or self._startup_done:
+            return
+        self.root.update_idletasks()
+        self.profiler.mark("first paint")
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        """Second half of startup, run after the first frame: scan the library and start the workers."""
+        if self._startup_done:
+            return
+        self._startup_done = True
         self.start_update_thread()
-        self.root.after(100, self.check_music_end)
-        
-    def get_duration(self, path):
-        if MUTAGEN_AVAILABLE and MutagenFile is not None:
+        self._first_scan()
+
+    def _first_scan(self):
+        """Walk the library off the Tk thread; the restored window stays up meanwhile."""
+        folder, session = self.music_folder, self.session
+
+        def work():
             try:
-                if callable(MutagenFile):
-                    audio = MutagenFile(path)
-                    if audio is not None and hasattr(audio, 'info') and audio.info is not None:
-                        return audio.info.length
-            except:
-                pass
+                scanner = LibraryScanner(folder)
+                changes = scanner.rescan()
+            except Exception as e:
+                self.ui_bus.post_config(self.status_label, text=f"Error: {str(e)}")
+                return
+            self.ui_bus.call(self._on_first_scan, scanner, changes, session)
+        threading.Thread(target=work, daemon=True).start()
+
+    def _on_first_scan(self, scanner, changes, session):
+        """The startup scan finished (Tk thread): load it, then put the last session back on top."""
+        # A view switch may have loaded the library synchronously in the meantime
+        if self.library_scanner is None and scanner.music_folder == self.music_folder:
+            try:
+                self._use_scanner(scanner)
+                self._apply_library_changes(changes, True)
+            except Exception as e:
+                self.status_label.config(text=f"Error: {str(e)}")
+                return
+        if session is not None:
+            self._restore_session(session)
+        self.profiler.mark("load_songs")
+
+    def _on_mixer_ready(self, error):
+        """The background mixer start finished (Tk thread)."""
+        self.profiler.add("pygame import", self.mixer.import_s)
+        self.profiler.add("mixer init", self.mixer.init_s)
+        if error is not None:
+            self.status_label.config(text=f"Audio unavailable: {error}")
+            return
+        self._apply_volume()
+        
+    def get_duration(self, path, info=None):
+        if info is None:
+            info = inspect_track(path, with_art=False)
+        if info.get('duration'):
+            return info['duration']
         try:
+            self.mixer.wait()
             sound = pygame.mixer.Sound(path)
             return int(sound.get_length())
         except:
@@ -105,87 +257,251 @@ class SpotifyClonePlayer:
         return 0
     
     def get_metadata(self, path):
-        if path in self.song_metadata:
-            return self.song_metadata[path]
-        
-        duration = self.get_duration(path)
-        title = os.path.splitext(os.path.basename(path))[0]
-        artist = "Unknown Artist"
-        
-        if MUTAGEN_AVAILABLE and MutagenFile is not None and callable(MutagenFile):
-            try:
-                audio = MutagenFile(path)
-                if audio is not None and audio.tags:
-                    if 'TIT2' in audio.tags:
-                        title = str(audio.tags['TIT2'])
-                    if 'TPE1' in audio.tags:
-                        artist = str(audio.tags['TPE1'])
-            except:
-                pass
-        
-        meta = {'duration': duration, 'title': title, 'artist': artist}
-        self.song_metadata[path] = meta
+        tid = self.tracks.id_of(path)
+        if tid is not None:
+            return self.tracks.meta(tid)
+        meta = self._read_metadata(path)
+        self.tracks.add(path, meta)
+        return meta
+
+    def _read_metadata(self, path, info=None):
+        """Parse duration and tags from the file itself (no cache lookup)."""
+        if info is None:
+            info = inspect_track(path)
+        meta = metadata_from_info(info)
+        meta['duration'] = self.get_duration(path, info)
+        meta['art_key'] = self._cache_art(info)
         return meta
+
+    def _cache_art(self, info):
+        """Render the track's embedded art into the thumbnail cache; returns its key ('' if none)."""
+        cache = self._open_art_cache()
+        if cache is None or not info.get('art'):
+            return ''
+        try:
+            return cache.ensure(info['art']) or ''
+        except Exception:
+            return ''
     
-    def get_album_art(self, path):
-        if not MUTAGEN_AVAILABLE or MutagenFile is None:
+    def get_album_art(self, tid, variant='card'):
+        """Return the pre-rendered art file for a track, or None if it has no art."""
+        cache = self._open_art_cache()
+        if cache is None:
             return None
-        try:
-            audio = MutagenFile(path)
-            if audio is None or 'APIC:' not in audio.tags:
-                return None
-            artwork = audio.tags['APIC:'].data
-            img = Image.open(BytesIO(artwork))
-            img.thumbnail((400, 400), Image.Resampling.LANCZOS)
-            # Circular with shadow
-            size = 400
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-            img = img.convert('RGBA')
-            output = Image.composite(img, Image.new('RGBA', img.size, (0, 0, 0, 0)), mask)
-            # Add shadow
-            shadow = Image.new('RGBA', (size + 20, size + 20), (0, 0, 0, 0))
-            shadow_draw = ImageDraw.Draw(shadow)
-            shadow_draw.ellipse((10, 10, size + 10, size + 10), fill=(0, 0, 0, 80))
-            shadow = shadow.filter(ImageFilter.GaussianBlur(5))
-            return output, shadow
-        except:
-            return None, None
+        key = self.tracks.art_key(tid)
+        if key is None or (key and not cache.has(key)):
+            # Unknown or missing from disk: one inspection pass renders it again
+            key = self._cache_art(inspect_track(self.tracks.path(tid)))
+            self.tracks.set_art_key(tid, key)
+        return cache.path_for(key, variant) if key else None
     
     def load_songs(self):
-        supported_formats = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.aac')
-        self.playlist = []
-        
+        """Scan the music folder; after the first scan only changed files are processed."""
         try:
-            if os.path.exists(self.music_folder):
-                for file in os.listdir(self.music_folder):
-                    if file.lower().endswith(supported_formats):
-                        full_path = os.path.join(self.music_folder, file)
-                        self.playlist.append(full_path)
-            
-            self.playlist.sort()
-            self.filtered_playlist = self.playlist.copy()
-            # Initialize metadata placeholders quickly to keep UI responsive
-            self.song_metadata = {}
-            for p in self.playlist:
-                title = os.path.splitext(os.path.basename(p))[0]
-                self.song_metadata[p] = {'duration': 0, 'title': title, 'artist': 'Unknown Artist'}
-
-            # Build the UI first
-            self.update_playlist_grid()
+            scanner = self.library_scanner
+            fresh = scanner is None or scanner.music_folder != self.music_folder
+            if fresh:
+                scanner = LibraryScanner(self.music_folder)
+                self._use_scanner(scanner)
+            self._apply_library_changes(scanner.rescan(), fresh)
+        except Exception as e:
+            self.status_label.config(text=f"Error: {str(e)}")
+
+    def _use_scanner(self, scanner):
+        """Switch to a newly scanned folder and open its caches."""
+        previous = self.library_scanner
+        self.library_scanner = scanner
+        if previous is not None and previous.music_folder != scanner.music_folder:
+            self.art_memory.clear()
+        self._open_seek_index()
+        self._open_peak_cache()
+        self._open_liked_store()
+        self._open_history()
+
+    def refresh_library(self):
+        """Rescan the folder off the main thread and apply any differences."""
+        scanner = self.library_scanner
+        if scanner is None or scanner.music_folder != self.music_folder:
+            self.load_songs()
+            return
 
-            # Then start background thread to populate metadata (duration, tags)
-            threading.Thread(target=self._populate_metadata_background, daemon=True).start()
-            # Start background thread to lazily load album art
-            threading.Thread(target=self._populate_art_background, daemon=True).start()
-            if self.playlist:
-                self.status_label.config(text=f"Loaded {len(self.playlist)} tracks")
+        def work():
+            try:
+                changes = scanner.rescan()
+            except Exception as e:
+                print("Library rescan failed:", e)
+                return
+            if changes:
+                self.ui_bus.call(self._apply_library_changes, changes, False)
+        threading.Thread(target=work, daemon=True).start()
+
+    def _apply_library_changes(self, changes, fresh):
+        """Fold a scanner diff into the track table, search index and grid."""
+        tracks = self.tracks
+        if fresh:
+            current = None
+            tracks.clear()
+            self.search_index.clear()
+            self._art_requested = set()
+            self._metadata_pending = frozenset()
+        else:
+            # Track ids survive the update; positions are re-derived afterwards
+            current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        for p in changes.removed:
+            tid = tracks.remove(p)
+            self._art_requested.discard(tid)
+            self.shuffle.remove(tid)
+            self.search_index.remove(p)
+        for p in changes.changed:
+            self._art_requested.discard(tracks.id_of(p))
+
+        # Fill metadata from the persistent store; only new/changed files need parsing
+        new_paths = changes.added + changes.changed
+        store = self._open_metadata_store()
+        if store is not None:
+            cached, stale = store.partition(new_paths)
+        else:
+            cached, stale = {}, list(new_paths)
+        for p in new_paths:
+            # Uncached files keep placeholder columns until the worker parses them
+            tracks.add(p, cached.get(p))
+
+        self.playlist = tracks.set_order(tracks.ids_for(self.library_scanner.paths()))
+        if fresh:
+            self.shuffle.reset(self.playlist)
+        else:
+            for tid in tracks.ids_for(changes.added):
+                self.shuffle.add(tid)
+            # The queued successor may have moved or disappeared
+            self._prepare_next()
+        self.current_index = tracks.position(current)
+        if self.grid_view_name == 'liked':
+            self.grid_view = tracks.ids_for(self.liked.paths()) if self.liked is not None else []
+        elif self.grid_view is not None:
+            # Ids from a previous folder mean nothing now; removed tracks leave the view
+            self.grid_view = [] if fresh else [t for t in self.grid_view if tracks.position(t) >= 0]
+        if store is not None:
+            if fresh:
+                store.prune(self.library_scanner.snapshot)
             else:
-                self.status_label.config(text="No tracks found")
+                store.remove_many(changes.removed)
+
+        # New entries are indexed off the main thread; metadata updates keep them current
+        new_ids = tracks.ids_for(new_paths)
+        if new_ids:
+            threading.Thread(target=self._build_search_index, args=(new_ids,), daemon=True).start()
+
+        # Build the UI first (files being parsed get their art from the metadata pass)
+        self._metadata_pending = self._metadata_pending | frozenset(tracks.ids_for(stale))
+        if self.search_var.get().strip():
+            self._run_search()
+        else:
+            self.update_playlist_grid(keep_scroll=not fresh)
+
+        # Then start background thread to populate metadata for uncached files only
+        if stale:
+            threading.Thread(target=self._populate_metadata_background, args=(stale,), daemon=True).start()
+        else:
+            self._start_loudness_pass()
+        if self.peak_cache is not None:
+            self.peak_cache.request_many(new_paths, PRIORITY_LIBRARY)
+        if fresh:
+            self.status_label.config(text=f"Loaded {len(self.playlist)} tracks" if self.playlist else "No tracks found")
+        else:
+            self.status_label.config(text=f"Library updated: {len(changes.added)} added, "
+                                          f"{len(changes.removed)} removed, {len(changes.changed)} changed")
+
+    def _open_metadata_store(self):
+        """Open (or reuse) the on-disk metadata store for the current music folder."""
+        if self.metadata_store is not None and self.metadata_store.music_folder == self.music_folder:
+            return self.metadata_store
+        if self.metadata_store is not None:
+            self.metadata_store.close()
+        try:
+            self.metadata_store = MetadataStore(self.music_folder)
         except Exception as e:
-            self.status_label.config(text=f"Error: {str(e)}")
-    
+            print("Metadata cache unavailable:", e)
+            self.metadata_store = None
+        return self.metadata_store
+
+    def _open_seek_index(self):
+        """Open (or reuse) the MP3 seek index cache for the current music folder."""
+        index = self.clock.seek_index
+        if index is not None and index.music_folder == self.music_folder:
+            return index
+        try:
+            index = SeekIndex(self.music_folder)
+        except Exception as e:
+            print("Seek index unavailable:", e)
+            index = None
+        self.clock.seek_index = index
+        return index
+
+    def _open_peak_cache(self):
+        """Open (or reuse) the waveform peak cache for the current music folder."""
+        cache = self.peak_cache
+        if cache is not None and cache.music_folder == self.music_folder:
+            return cache
+        if cache is not None:
+            cache.stop()
+        try:
+            cache = PeakCache(self.music_folder,
+                              on_ready=lambda path, peaks: self.ui_bus.call(self._on_peaks_ready, path, peaks))
+        except Exception as e:
+            print("Waveform cache unavailable:", e)
+            cache = None
+        self.peak_cache = cache
+        return cache
+
+    def _open_liked_store(self):
+        """Open (or reuse) the Liked Songs journal for the current music folder."""
+        store = self.liked
+        if store is not None and store.music_folder == self.music_folder:
+            return store
+        if store is not None:
+            store.close()
+        try:
+            store = LikedStore(self.music_folder)
+        except Exception as e:
+            print("Liked songs unavailable:", e)
+            store = None
+        self.liked = store
+        return store
+
+    def _open_history(self):
+        """Open (or reuse) the play history for the current music folder."""
+        history = self.history
+        if history is not None and history.music_folder == self.music_folder:
+            return history
+        if history is not None:
+            history.close()
+        try:
+            history = PlayHistory(self.music_folder)
+        except Exception as e:
+            print("Play history unavailable:", e)
+            history = None
+        self.history = history
+        return history
+
+    def _on_peaks_ready(self, path, peaks):
+        """A waveform finished computing (Tk thread); show it if that track is playing."""
+        if 0 <= self.current_index < len(self.playlist) and self.tracks.path(self.playlist[self.current_index]) == path:
+            self.waveform.set_peaks(peaks)
+
+    def _open_art_cache(self):
+        """Open (or reuse) the rendered-art cache for the current music folder (any thread)."""
+        with self._art_cache_lock:
+            cache = self.art_cache
+            if cache is not None and cache.music_folder == self.music_folder:
+                return cache
+            try:
+                cache = ArtCache(self.music_folder)
+            except Exception as e:
+                print("Art cache unavailable:", e)
+                cache = None
+            self.art_cache = cache
+            return cache
+
     def setup_ui(self):
         # ==================== TOP BAR (SLIM) ====================
         top_bar = tk.Frame(self.root, bg=self.BG_DARK, height=50)
@@ -217,7 +533,9 @@ class SpotifyClonePlayer:
             ("🏠 Home", self.switch_to_home),
             ("🔍 Search", self.switch_to_search),
             ("📂 Library", self.switch_to_library),
-            ("❤️ Liked", self.switch_to_liked)
+            ("❤️ Liked", self.switch_to_liked),
+            ("📊 Stats", self.switch_to_stats),
+            ("🧬 Duplicates", self.switch_to_duplicates)
         ]
         
         for text, cmd in nav_items:
@@ -265,31 +583,11 @@ class SpotifyClonePlayer:
         self.header_artist = tk.Label(header_text, text="—", font=("Segoe UI", 14), fg=self.TEXT_GRAY, bg=self.BG_CARD, anchor="w")
         self.header_artist.pack(anchor="w")
         
-        # ==================== PLAYLIST GRID (Different from Treeview) ====================
-        grid_frame = tk.Frame(self.main_content, bg=self.BG_BLACK)
-        grid_frame.pack(fill=tk.BOTH, expand=True, pady=20)
-        
-        # Canvas for scrollable grid
-        self.canvas = tk.Canvas(grid_frame, bg=self.BG_BLACK, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(grid_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg=self.BG_BLACK)
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Bind mousewheel
-        self.canvas.bind_all("<MouseWheel>", lambda e: self.canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
+        # ==================== PLAYLIST GRID (Canvas-drawn, virtualized) ====================
+        self.create_playlist_grid()
         
         # ==================== BOTTOM PLAYER BAR (Ultra Slim) ====================
-        bottom_player = tk.Frame(self.root, bg=self.BG_CARD, height=70)
+        bottom_player = tk.Frame(self.root, bg=self.BG_CARD, height=78)
         bottom_player.pack(side=tk.BOTTOM, fill=tk.X)
         bottom_player.pack_propagate(False)
         
@@ -309,6 +607,10 @@ class SpotifyClonePlayer:
         self.player_artist = tk.Label(player_info, text="—", font=("Segoe UI", 11), fg=self.TEXT_GRAY, bg=self.BG_CARD, anchor="w")
         self.player_artist.pack(anchor="w")
         
+        self.like_btn = tk.Button(left_player, text="♡", font=("Segoe UI", 14), bg=self.BG_CARD, fg=self.TEXT_GRAY,
+                                  relief=tk.FLAT, command=self.toggle_like_current, activebackground=self.BG_HOVER, bd=0)
+        self.like_btn.pack(side=tk.LEFT, padx=(15, 0))
+        
         # Center: Controls + Progress
         center_player = tk.Frame(bottom_player, bg=self.BG_CARD)
         center_player.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -321,16 +623,18 @@ class SpotifyClonePlayer:
         self.prog_time.pack(side=tk.LEFT, padx=15)
         
         self.progress_var = tk.DoubleVar()
-        self.progress = ttk.Scale(prog_frame, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.progress_var,
-                                  command=self.seek_progress)
+        # Waveform seek bar, drawn from cached peaks
+        self.progress = tk.Canvas(prog_frame, height=24)
+        self.waveform = WaveformBar(self.progress, self.progress_var,
+                                    {'bg': self.BG_CARD, 'played': self.GREEN_ACCENT, 'rest': "#4D4D4D"},
+                                    on_seek=self.seek_progress)
         self.progress.pack(fill=tk.X, expand=True, padx=(10, 0))
         style = ttk.Style()
         # Use orientation-specific style name so ttk can find proper layout
         style_name = "Custom.Horizontal.TScale"
         style.configure(style_name, troughcolor=self.BG_HOVER, background=self.BG_CARD)
         style.map(style_name, background=[('active', self.GREEN_ACCENT)])
-        self.progress.configure(style=style_name)
-        
+
         self.prog_duration = tk.Label(prog_frame, text="—:—", font=("Segoe UI", 9), fg=self.TEXT_GRAY, bg=self.BG_CARD)
         self.prog_duration.pack(side=tk.RIGHT, padx=15)
         
@@ -384,12 +688,37 @@ class SpotifyClonePlayer:
         queue_btn.pack(side=tk.LEFT)
         
         devices_btn = tk.Button(icons_frame, text="📱", font=("Segoe UI", 10), bg=self.BG_CARD, fg=self.TEXT_GRAY,
-                                relief=tk.FLAT, command=lambda: messagebox.showinfo("Devices", "Devices coming soon!"), 
+                                relief=tk.FLAT, command=self.show_devices, 
                                 activebackground=self.BG_HOVER, bd=0, padx=10)
         devices_btn.pack(side=tk.LEFT)
-        
-        pygame.mixer.music.set_volume(0.7)
     
+    def show_devices(self):
+        """Start serving the library over HTTP (on first use) and show its address."""
+        if self.stream_server is None:
+            # Kept from the start, so on_close can stop it even if it is still binding
+            server = self.stream_server = stream_server.LibraryServer(self.music_folder, self.STREAM_HOST,
+                                                                      self.STREAM_PORT)
+            server.serve_in_thread(lambda url, error: self.ui_bus.call(self._on_stream_started, server, url, error))
+            self.status_label.config(text="Starting streaming...")
+            return
+        if self.stream_url is None:
+            messagebox.showinfo("Devices", "Streaming is still starting.")
+            return
+        messagebox.showinfo("Devices", f"Your library is streaming at\n{self.stream_url}\n\n"
+                                       "Open it in a browser or point a player at the /audio links.")
+
+    def _on_stream_started(self, server, url, error):
+        if server is not self.stream_server:
+            return
+        if error is not None:
+            self.stream_server = None
+            self.status_label.config(text="Ready")
+            messagebox.showerror("Devices", f"Could not start streaming: {error}")
+            return
+        self.stream_url = url
+        self.status_label.config(text="Streaming")
+        self.show_devices()
+
     def toggle_sidebar(self):
         self.sidebar_visible = not self.sidebar_visible
         if self.sidebar_visible:
@@ -406,17 +735,27 @@ class SpotifyClonePlayer:
     def switch_to_library(self):
         self.update_playlist_grid()
         self.update_main_content("Library - Your Tracks")
+        # Pick up files added/removed on disk since the last scan
+        self.refresh_library()
     
     def switch_to_liked(self):
         self.update_main_content("Liked Songs")
+        # Liked files that were added back on disk show up after the rescan
+        self.refresh_library()
+    
+    def switch_to_stats(self):
+        self.update_main_content("Stats - Your Listening")
+    
+    def switch_to_duplicates(self):
+        self.update_main_content("Duplicates - Same Song, Different Files")
     
     def update_main_content(self, title):
-        # Clear and add placeholder
-        for widget in self.main_content.winfo_children():
-            if widget != self.now_playing_header:
-                widget.destroy()
-        content_label = tk.Label(self.main_content, text=title, font=("Segoe UI", 24, "bold"), fg=self.TEXT_WHITE, bg=self.BG_BLACK)
-        content_label.pack(pady=20, padx=20, anchor="w")
+        self.grid_view = None
+        self.grid_view_name = None
+        self.view_title = title
+        # The user moved on: the startup scan must not put the last session's view back
+        self.session = None
+        self._clear_main_content(title)
 
         # Home view: animated carousel + featured
         if "Home" in title:
@@ -427,237 +766,469 @@ class SpotifyClonePlayer:
         if "Library" in title:
             self.update_playlist_grid()
 
+        if "Liked" in title:
+            self.show_liked()
+
+        if "Stats" in title:
+            self.show_stats()
+
+        if "Duplicates" in title:
+            self.find_duplicates()
+
+    def _clear_main_content(self, title):
+        """Remove everything below the now-playing header and add the view's title."""
+        for widget in self.main_content.winfo_children():
+            if widget != self.now_playing_header:
+                widget.destroy()
+        content_label = tk.Label(self.main_content, text=title, font=("Segoe UI", 24, "bold"), fg=self.TEXT_WHITE, bg=self.BG_BLACK)
+        content_label.pack(pady=20, padx=20, anchor="w")
+
+    def _set_summary(self, text):
+        """Show text between the view's title and the grid (reusing the label if it is there)."""
+        label = self.summary_label
+        if label is not None and label.winfo_exists():
+            label.config(text=text)
+            return
+        self.summary_label = tk.Label(self.main_content, text=text, font=("Segoe UI", 11), fg=self.TEXT_GRAY,
+                                      bg=self.BG_BLACK, justify=tk.LEFT, anchor="w")
+        self.summary_label.pack(padx=20, anchor="w")
+
     def create_playlist_grid(self):
         """Create the scrollable playlist grid widgets if missing or destroyed."""
-        # If canvas/scrollable_frame do not exist or were destroyed, recreate them
+        # If the canvas does not exist or was destroyed by a view switch, recreate it
         if not hasattr(self, 'canvas') or not getattr(self, 'canvas') or not self.canvas.winfo_exists():
             grid_frame = tk.Frame(self.main_content, bg=self.BG_BLACK)
             grid_frame.pack(fill=tk.BOTH, expand=True, pady=20)
 
-            # Canvas for scrollable grid
+            # Canvas for scrollable grid; cards are canvas items, not widgets
             self.canvas = tk.Canvas(grid_frame, bg=self.BG_BLACK, highlightthickness=0)
-            scrollbar = ttk.Scrollbar(grid_frame, orient="vertical", command=self.canvas.yview)
-            self.scrollable_frame = tk.Frame(self.canvas, bg=self.BG_BLACK)
-
-            self.scrollable_frame.bind(
-                "<Configure>",
-                lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-            )
-
-            self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-            self.canvas.configure(yscrollcommand=scrollbar.set)
-
+            scrollbar = ttk.Scrollbar(grid_frame, orient="vertical")
             self.canvas.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
 
-            # Bind mousewheel
-            self.canvas.bind_all("<MouseWheel>", lambda e: self.canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
+            colors = {
+                'bg': self.BG_BLACK, 'card': self.BG_CARD, 'hover': self.BG_HOVER, 'selected': self.BG_SELECTED,
+                'text': self.TEXT_WHITE, 'subtext': self.TEXT_GRAY, 'accent': self.GREEN_ACCENT,
+            }
+            self.card_grid = VirtualCardGrid(self.canvas, scrollbar, colors, describe=self._card_text,
+                                             on_activate=self._play_track, art_for=self._card_art,
+                                             on_missing_art=self._request_card_art,
+                                             on_secondary=self.toggle_like)
 
-    
-    def update_playlist_grid(self):
+            # Bind mousewheel (Windows/macOS deltas, X11 buttons 4/5)
+            self.canvas.bind_all("<MouseWheel>", lambda e: self.card_grid.yview_scroll(int(-1*(e.delta/120)), "units"))
+            self.canvas.bind_all("<Button-4>", lambda e: self.card_grid.yview_scroll(-1, "units"))
+            self.canvas.bind_all("<Button-5>", lambda e: self.card_grid.yview_scroll(1, "units"))
+
+    def update_playlist_grid(self, keep_scroll=False):
         # Ensure grid exists (recreate if user switched views and it was destroyed)
         self.create_playlist_grid()
 
-        # Clear grid and card registry
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        self.card_widgets = {}
-        
-        display_list = self.filtered_playlist if self.filtered_playlist else self.playlist
-        # if library large, switch to compact view
-        if len(display_list) > self.COMPACT_THRESHOLD:
-            self._show_compact_list(display_list)
+        if self.grid_view is not None:
+            display_list = self.grid_view
+        else:
+            display_list = self.filtered_playlist if self.search_var.get().strip() else self.playlist
+        current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        self.card_grid.set_items(display_list, current, keep_scroll=keep_scroll)
+
+    def _highlight_current(self):
+        """Restyle only the previous and new current cards; the grid itself is left alone."""
+        grid = self.card_grid
+        if grid is None or not grid.canvas.winfo_exists():
             return
-        cols = 4
-        row = 0
-        col = 0
-        
-        for idx, path in enumerate(display_list):
-            real_idx = self.playlist.index(path) if path in self.playlist else idx
-            meta = self.song_metadata.get(path, {'title': os.path.splitext(os.path.basename(path))[0], 'artist': 'Unknown Artist', 'duration': 0})
-            title = meta.get('title', os.path.splitext(os.path.basename(path))[0])
-            artist = meta.get('artist', 'Unknown Artist')
-            duration = self.format_time(meta.get('duration', 0))
-            
-            # Card frame
-            card = tk.Frame(self.scrollable_frame, bg=self.BG_CARD, relief=tk.RIDGE, bd=0)
-            card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-            
-            # Art placeholder
-            art_label = tk.Label(card, text="🎼", font=("Arial", 40), fg=self.GREEN_ACCENT, bg=self.BG_CARD)
-            art_label.pack(pady=10)
-            
-            # Title
-            t_label = tk.Label(card, text=title[:25] + "..." if len(title) > 25 else title, font=("Segoe UI", 11, "bold"), 
-                               fg=self.TEXT_WHITE, bg=self.BG_CARD, wraplength=120)
-            t_label.pack(pady=(0, 5))
-            
-            # Artist + Duration
-            info_frame = tk.Frame(card, bg=self.BG_CARD)
-            info_frame.pack()
-            a_label = tk.Label(info_frame, text=artist[:20] + "..." if len(artist) > 20 else artist, font=("Segoe UI", 9), 
-                               fg=self.TEXT_GRAY, bg=self.BG_CARD)
-            a_label.pack(anchor="w")
-            d_label = tk.Label(info_frame, text=duration, font=("Segoe UI", 9), fg=self.TEXT_GRAY, bg=self.BG_CARD)
-            d_label.pack(anchor="w")
-            # store widget refs for fast updates from background thread
-            self.card_widgets[path] = {
-                'card': card,
-                't_label': t_label,
-                'a_label': a_label,
-                'd_label': d_label,
-                'art_label': art_label,
-                'art_loaded': False
+        current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        grid.set_selected(current)
+
+    def _card_text(self, tid):
+        """Display strings (title, artist, duration) for a grid card."""
+        if tid is None:
+            return "", "", ""
+        if isinstance(tid, SessionCard):
+            return tid.title, tid.artist, tid.duration
+        tracks = self.tracks
+        title, artist = tracks.title(tid), tracks.artist(tid)
+        title = title[:25] + "..." if len(title) > 25 else title
+        if self.liked is not None and self.liked.is_liked(tracks.path(tid)):
+            title = "♥ " + title
+        return (title,
+                artist[:20] + "..." if len(artist) > 20 else artist,
+                self.format_time(tracks.duration(tid)))
+
+    # ------------------ SESSION SNAPSHOT ------------------
+    def _show_session(self):
+        """Draw the window the last session closed with, before anything has been scanned."""
+        session = load_session(self.music_folder)
+        if session is None:
+            return
+        self.session = session
+        if session.view is not None:
+            self._clear_main_content(session.view)
+            if session.summary:
+                self._set_summary(session.summary)
+        self.create_playlist_grid()
+        selected = None
+        if session.current is not None:
+            self._show_session_track(session.current)
+            selected = next((card for card in session.cards if card.path == session.current['path']), None)
+        self.card_grid.set_items(session.items(), selected)
+        self.card_grid.scroll_to_item(*session.top)
+        self.status_label.config(text="Loading library...")
+
+    def _show_session_track(self, current):
+        """Fill the header and player bar from a saved track, without loading it."""
+        self.header_title.config(text=current['title'])
+        self.header_artist.config(text=current['artist'])
+        self.player_title.config(text=current['title'])
+        self.player_artist.config(text=current['artist'])
+        photo = self._photo_for_key(current['art'])
+        if photo is not None:
+            self.current_art_photo = photo
+            self.mini_art.config(image=self.current_art_photo, text="")
+            self.header_art.config(image=self.current_art_photo, text="")
+        duration, position = current['duration'], current['position']
+        self.prog_time.config(text=self.format_time(position) if position else "0:00")
+        self.prog_duration.config(text=self.format_time(duration))
+        if duration:
+            self.progress_var.set(position / duration * 100)
+        liked = current['liked']
+        self.like_btn.config(text="♥" if liked else "♡", fg=self.GREEN_ACCENT if liked else self.TEXT_GRAY)
+
+    def _restore_session(self, session):
+        """Swap the restored window for the scanned library: same track, view and top row."""
+        if session.current is not None:
+            self._restore_current(session.current)
+        if self.session is not session or self.search_var.get().strip():
+            # The user has moved on since the window was restored
+            return
+        self.session = None
+        self.view_title = view = session.view
+        if view is not None and "Liked" in view:
+            self.show_liked()
+        elif view is not None and "Stats" in view:
+            self.show_stats()
+        self.card_grid.scroll_to_item(*session.top)
+
+    def _restore_current(self, current):
+        """Make the saved track current again (paused at its position), or clear it if it is gone."""
+        if self.is_playing:
+            return
+        tid = self.tracks.id_of(current['path'])
+        index = self.tracks.position(tid)
+        if index < 0:
+            self._show_nothing_playing()
+            return
+        self.current_index = index
+        self.current_song_length = self.tracks.duration(tid) or current['duration']
+        self._resume_at = current['position']
+        self._show_waveform(current['path'])
+        self._highlight_current()
+        self._update_like_button()
+
+    def _show_nothing_playing(self):
+        self.header_title.config(text="Nothing playing")
+        self.header_artist.config(text="—")
+        self.player_title.config(text="No track")
+        self.player_artist.config(text="—")
+        self.current_art_photo = None
+        self.mini_art.config(image="", text="♪")
+        self.header_art.config(image="", text="🎵 Select a track")
+        self.prog_time.config(text="0:00")
+        self.prog_duration.config(text="—:—")
+        self.progress_var.set(0)
+        self._update_like_button()
+
+    def _save_session(self):
+        """Write down what the window shows so the next launch can paint it before scanning."""
+        if self.library_scanner is None:
+            # Closed before the first scan: the saved session still describes the window
+            return
+        tracks, grid = self.tracks, self.card_grid
+        view, summary = self.view_title, None
+        cards, count, top = [], 0, (0, 0)
+        restorable = view is None or any(name in view for name in ("Library", "Liked", "Stats"))
+        if (restorable and not self.search_var.get().strip()
+                and grid is not None and grid.canvas.winfo_exists()):
+            for pos, tid in grid.visible_items():
+                title, artist, duration = self._card_text(tid)
+                cards.append(SessionCard(pos, tracks.path(tid), title, artist, duration, tracks.art_key(tid) or ''))
+            count, top = len(grid.items), grid.top_item()
+            if self.grid_view_name == 'stats' and self.summary_label is not None and self.summary_label.winfo_exists():
+                summary = self.summary_label.cget('text')
+        else:
+            # Searches, Home and Duplicates are not restored; the next launch opens the library
+            view = None
+        current = None
+        if 0 <= self.current_index < len(self.playlist):
+            tid = self.playlist[self.current_index]
+            path = tracks.path(tid)
+            current = {
+                'path': path,
+                'title': tracks.title(tid),
+                'artist': tracks.artist(tid),
+                'duration': self.current_song_length,
+                'art': tracks.art_key(tid) or '',
+                'position': self.clock.position() if self.is_playing else self._resume_at,
+                'liked': self.liked is not None and self.liked.is_liked(path),
             }
-            
-            # Hover effect
-            def on_enter(e, c=card, idx=real_idx):
-                c.configure(bg=self.BG_HOVER)
-            def on_leave(e, c=card):
-                c.configure(bg=self.BG_CARD if idx != self.current_index else self.BG_SELECTED)
-            def play_this(idx=real_idx):
-                self.play_song(idx)
-            
-            card.bind("<Enter>", on_enter)
-            card.bind("<Leave>", on_leave)
-            card.bind("<Button-1>", lambda e: play_this())
-            
-            if real_idx == self.current_index:
-                card.configure(bg=self.BG_SELECTED)
-            
-            col += 1
-            if col >= cols:
-                col = 0
-                row += 1
-        
-        # Configure grid weights
-        for i in range(cols):
-            self.scrollable_frame.grid_columnconfigure(i, weight=1)
-    
+        save_session(self.music_folder, SessionSnapshot(view, summary, count, top, cards, current))
+
+    # ------------------ LIKED SONGS ------------------
+    def show_liked(self):
+        """Show liked tracks, most recently liked first, in the library grid."""
+        self.grid_view_name = 'liked'
+        self.grid_view = self.tracks.ids_for(self.liked.paths()) if self.liked is not None else []
+        self.update_playlist_grid()
+        self.status_label.config(text=f"{len(self.grid_view)} liked songs")
+
+    def toggle_like(self, tid):
+        """Like or unlike a track (right-click on a card, or the heart in the player bar)."""
+        if self.liked is None or tid is None or isinstance(tid, SessionCard):
+            return
+        liked = self.liked.toggle(self.tracks.path(tid))
+        if self.grid_view_name == 'liked':
+            view = [t for t in self.grid_view if t != tid]
+            self.grid_view = [tid] + view if liked else view
+            self.update_playlist_grid(keep_scroll=True)
+        elif self.card_grid is not None and self.card_grid.canvas.winfo_exists():
+            self.card_grid.refresh(tid)
+        self._update_like_button()
+
+    def toggle_like_current(self):
+        if 0 <= self.current_index < len(self.playlist):
+            self.toggle_like(self.playlist[self.current_index])
+
+    def _update_like_button(self):
+        current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        liked = current is not None and self.liked is not None and self.liked.is_liked(self.tracks.path(current))
+        self.like_btn.config(text="♥" if liked else "♡", fg=self.GREEN_ACCENT if liked else self.TEXT_GRAY)
+
+    def _card_art(self, tid):
+        if tid is None:
+            return None
+        if isinstance(tid, SessionCard):
+            return self._photo_for_key(tid.art)
+        return self._art_photo(tid) if self.tracks.art_key(tid) else None
+
+    def _play_track(self, tid):
+        if isinstance(tid, SessionCard):
+            # Still the restored window; the card becomes playable once the scan is in
+            return
+        index = self.tracks.position(tid)
+        if index >= 0:
+            self.play_song(index)
+
     def filter_songs(self):
-        query = self.search_var.get().lower()
-        if not query:
-            self.filtered_playlist = []
-        else:
-            # Use cached metadata where possible to avoid blocking
-            self.filtered_playlist = [p for p in self.playlist if query in (self.song_metadata.get(p, {}).get('title','').lower() or '') or query in (self.song_metadata.get(p, {}).get('artist','').lower() or '')]
+        """Debounce keystrokes: the search runs once typing pauses."""
+        if self._search_after_id is not None:
+            try:
+                self.root.after_cancel(self._search_after_id)
+            except Exception:
+                pass
+        self._search_after_id = self.root.after(self.SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_after_id = None
+        query = self.search_var.get()
+        self.filtered_playlist = self.tracks.ids_for(self.search_index.search(query)) if query.strip() else []
         self.update_playlist_grid()
         self.status_label.config(text=f"Found {len(self.filtered_playlist)} tracks")
 
-    def _populate_metadata_background(self):
-        """Background worker to populate metadata for each song and update UI via main thread."""
-        for p in list(self.playlist):
-            try:
-                meta = self.get_metadata(p)
-                # Store metadata
-                self.song_metadata[p] = meta
+    def _build_search_index(self, ids):
+        """Index tracks in chunks so searches can interleave with the build."""
+        index, tracks = self.search_index, self.tracks
+        for start in range(0, len(ids), 1000):
+            # Entries are produced under the index lock, so a metadata update that
+            # lands meanwhile is never overwritten by an older placeholder
+            index.add_many((tracks.path(t), tracks.title(t), tracks.artist(t))
+                           for t in ids[start:start + 1000])
+        # Re-run an active query against the complete index (on the main thread)
+        self.ui_bus.post('search_refresh', self._refresh_search)
 
-                # Schedule UI update for this card
-                self.root.after(0, lambda path=p: self._update_card_from_metadata(path))
-            except Exception:
-                continue
+    def _refresh_search(self):
+        if self.search_var.get().strip():
+            self._run_search()
 
-    def _update_card_from_metadata(self, path):
-        """Update a single card's labels with metadata (runs on main thread)."""
-        refs = self.card_widgets.get(path)
-        meta = self.song_metadata.get(path)
-        if not refs or not meta:
-            return
+    def _populate_metadata_background(self, paths):
+        """Background worker: fan uncached songs out to the scan pool and feed results back to the UI."""
+        store, tracks = self.metadata_store, self.tracks
+        pool = ScanPool(self.music_folder, workers=self.SCAN_WORKERS, chunk_size=self.SCAN_CHUNK)
+        ids = frozenset(tracks.ids_for(paths))
+        try:
+            for batch, done, total in pool.scan(paths):
+                results = [(p, meta) for p, meta in batch if meta is not None]
+                for p, meta in results:
+                    tid = tracks.id_of(p)
+                    if tid is None:
+                        # Removed from the library while it was being scanned
+                        continue
+                    tracks.set_meta(tid, meta)
+                    self.search_index.add(p, meta['title'], meta['artist'])
+
+                    # Redraw this card on the next UI frame (repeats collapse into one)
+                    self.ui_bus.post(('card', tid), self._update_card_from_metadata, tid)
+                if store is not None and results:
+                    store.put_many(results)
+                self.ui_bus.post_config(self.status_label,
+                                        text=f"Scanning {done}/{total}" if done < total else f"Loaded {len(self.playlist)} tracks")
+        except Exception as e:
+            print("Metadata scan failed:", e)
+        self.ui_bus.call(self._metadata_scan_finished, ids)
+
+    def _metadata_scan_finished(self, ids):
+        # On the Tk thread, which also adds to the pending set while a scan runs
+        self._metadata_pending = self._metadata_pending - ids
+        # Loudness gains are stored on the rows the scan just wrote
+        self._start_loudness_pass()
 
-        title = meta.get('title', os.path.splitext(os.path.basename(path))[0])
-        artist = meta.get('artist', 'Unknown Artist')
-        dur = self.format_time(meta.get('duration', 0))
+    def _start_loudness_pass(self):
+        """Measure tracks that have no stored gain yet (resumes where a previous run stopped)."""
+        if not self.NORMALIZE or self.metadata_store is None or self.library_scanner is None:
+            return
+        if self._loudness_thread is not None and self._loudness_thread.is_alive():
+            return
+        self._loudness_thread = threading.Thread(target=self._loudness_background,
+                                                 args=(self.metadata_store, self.library_scanner.paths()),
+                                                 daemon=True)
+        self._loudness_thread.start()
 
+    def _loudness_background(self, store, paths):
+        """Background worker: measure batches and save each one as soon as it is done."""
         try:
-            refs['t_label'].config(text=title[:25] + "..." if len(title) > 25 else title)
-            refs['a_label'].config(text=artist[:20] + "..." if len(artist) > 20 else artist)
-            refs['d_label'].config(text=dur)
-        except Exception:
-            pass
+            todo = store.missing('gain', paths)
+            pool = LoudnessPool(workers=self.LOUDNESS_WORKERS, batch_size=self.LOUDNESS_BATCH,
+                                mixer=self.mixer)
+            for batch, done, total in pool.analyze(todo):
+                measured = [(p, gain) for p, gain in batch if gain is not None]
+                for p, gain in measured:
+                    tid = self.tracks.id_of(p)
+                    if tid is not None:
+                        self.tracks.set_meta(tid, {'gain': gain})
+                store.update_column('gain', measured)
+                # The playing track may just have been measured
+                self.ui_bus.post('volume', self._apply_volume)
+        except Exception as e:
+            print("Loudness analysis failed:", e)
 
-    def _show_compact_list(self, display_list):
-        """Switch to a compact Treeview list for large libraries."""
-        # Clear main content except now_playing_header
-        for widget in self.main_content.winfo_children():
-            if widget != self.now_playing_header:
-                widget.destroy()
+    # ------------------ LISTENING STATS ------------------
+    def show_stats(self):
+        """Most played tracks in the grid, with top artists and recent plays above it."""
+        history = self.history
+        self.grid_view_name = 'stats'
+        if history is None or not history.total:
+            summary = "Nothing played yet"
+            self.grid_view = []
+        else:
+            artists = ", ".join(f"{artist} ({plays})" for artist, plays in history.top_artists(5))
+            recent = " · ".join(self.tracks.title(tid) for tid in self.tracks.ids_for(history.recently_played(5)))
+            summary = f"{history.total} plays\nTop artists: {artists or '—'}\nRecently played: {recent or '—'}"
+            self.grid_view = self.tracks.ids_for(path for path, _ in history.top_tracks(self.STATS_TOP))
+        self._set_summary(summary)
+        self.update_playlist_grid()
 
-        tree_frame = tk.Frame(self.main_content, bg=self.BG_BLACK)
-        tree_frame.pack(fill=tk.BOTH, expand=True, pady=20)
+    # ------------------ DUPLICATES ------------------
+    def _open_fingerprint_store(self):
+        """Open (or reuse) the fingerprint cache for the current music folder."""
+        store = self.fingerprints
+        if store is not None and store.music_folder == self.music_folder:
+            return store
+        try:
+            store = FingerprintStore(self.music_folder)
+        except Exception as e:
+            print("Fingerprint cache unavailable:", e)
+            store = None
+        self.fingerprints = store
+        return store
 
-        cols = ("Title", "Artist", "Duration")
-        if self.compact_tree and self.compact_tree.winfo_exists():
-            self.compact_tree.destroy()
+    def find_duplicates(self):
+        """Show the Duplicates view; tracks without a cached fingerprint are analyzed first."""
+        self.grid_view_name = 'duplicates'
+        self.grid_view = []
+        self.update_playlist_grid()
+        store = self._open_fingerprint_store()
+        if store is None or self.library_scanner is None:
+            return
+        if self._duplicates_thread is not None and self._duplicates_thread.is_alive():
+            return
+        self._duplicates_thread = threading.Thread(target=self._duplicates_background,
+                                                   args=(store, self.library_scanner.paths()), daemon=True)
+        self._duplicates_thread.start()
 
-        self.compact_tree = ttk.Treeview(tree_frame, columns=cols, show='headings')
-        for c in cols:
-            self.compact_tree.heading(c, text=c)
-            if c == 'Title':
-                self.compact_tree.column(c, width=400, anchor='w')
-            else:
-                self.compact_tree.column(c, width=120, anchor='center')
-
-        vsb = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.compact_tree.yview)
-        self.compact_tree.configure(yscrollcommand=vsb.set)
-        vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        self.compact_tree.pack(fill=tk.BOTH, expand=True)
-
-        # populate
-        for idx, path in enumerate(display_list):
-            real_idx = self.playlist.index(path) if path in self.playlist else idx
-            meta = self.song_metadata.get(path, {})
-            title = meta.get('title', os.path.splitext(os.path.basename(path))[0])
-            artist = meta.get('artist', 'Unknown')
-            dur = self.format_time(meta.get('duration', 0))
-            try:
-                self.compact_tree.insert('', tk.END, iid=str(real_idx), values=(title, artist, dur))
-            except Exception:
-                pass
+    def _duplicates_background(self, store, paths):
+        """Background worker: fingerprint the library (cached per file) and group matching tracks."""
+        def progress(done, total):
+            if done < total:
+                self.ui_bus.post_config(self.status_label, text=f"Fingerprinting {done}/{total}")
+        try:
+            groups = store.find_duplicates(paths, progress)
+        except Exception as e:
+            print("Duplicate search failed:", e)
+            return
+        self.ui_bus.call(self._show_duplicates, groups)
 
-        self.compact_tree.bind('<Double-1>', lambda e: self._compact_double_click())
+    def _show_duplicates(self, groups):
+        """Fill the Duplicates view (Tk thread), each group's copies next to each other."""
+        ids = [self.tracks.ids_for(group) for group in groups]
+        ids = [group for group in ids if len(group) > 1]
+        copies = sum(len(group) for group in ids)
+        self.status_label.config(text=f"{len(ids)} duplicate groups ({copies} files)" if ids else "No duplicates found")
+        if self.grid_view_name != 'duplicates':
+            # The user left the view while the search ran
+            return
+        self.grid_view = [tid for group in ids for tid in group]
+        self.update_playlist_grid()
 
-    def _compact_double_click(self):
-        if not self.compact_tree or not self.compact_tree.winfo_exists():
+    def _update_card_from_metadata(self, tid):
+        """Redraw a single card with fresh metadata and art (runs on main thread)."""
+        grid = getattr(self, 'card_grid', None)
+        if grid is None or not grid.canvas.winfo_exists():
             return
-        sel = self.compact_tree.selection()
-        if sel:
-            try:
-                idx = int(sel[0])
-                self.play_song(idx)
-            except Exception:
-                pass
+        grid.refresh(tid)
 
-    def _populate_art_background(self):
-        """Load album art lazily for card widgets in background."""
-        for path in list(self.card_widgets.keys()):
-            refs = self.card_widgets.get(path)
-            if not refs or refs.get('art_loaded'):
-                continue
+    def _request_card_art(self, ids):
+        """Queue visible cards still showing the placeholder for the background art loader."""
+        pending = self._metadata_pending
+        # Restored session cards (and the blank rows around them) have no track row yet
+        new = [t for t in ids if isinstance(t, int)
+               and t not in pending and t not in self._art_requested and self.tracks.art_key(t) != '']
+        if not new:
+            return
+        self._art_requested.update(new)
+        for t in new:
+            self._art_queue.put(t)
+        if self._art_thread is None:
+            self._art_thread = threading.Thread(target=self._art_worker, daemon=True)
+            self._art_thread.start()
+
+    def _art_worker(self):
+        """Render/lookup art for queued cards, then let the main thread redraw them."""
+        while True:
+            tid = self._art_queue.get()
             try:
-                art_res = self.get_album_art(path)
-                if not art_res:
-                    continue
-                art, shadow = art_res
-                if art is None:
-                    continue
-                thumb = art.resize((80, 80), Image.Resampling.LANCZOS)
-
-                def _upd(p=path, t=thumb):
-                    refs = self.card_widgets.get(p)
-                    if not refs:
-                        return
-                    try:
-                        photo = ImageTk.PhotoImage(t)
-                        refs['art_label'].config(image=photo, text='')
-                        refs['art_label'].image = photo
-                        refs['art_loaded'] = True
-                    except Exception:
-                        pass
-
-                self.root.after(0, _upd)
+                if self.get_album_art(tid):
+                    self.ui_bus.post(('card', tid), self._update_card_from_metadata, tid)
             except Exception:
                 continue
 
+    def _art_photo(self, tid, variant='card'):
+        """Return a PhotoImage of the track's rendered art through the memory LRU (main thread only)."""
+        return self._photo_for_key(self.tracks.art_key(tid), variant)
+
+    def _photo_for_key(self, key, variant='card'):
+        """PhotoImage for an art cache key, or None (main thread only)."""
+        cache = self._open_art_cache()
+        if not key or cache is None:
+            return None
+        art_file = cache.path_for(key, variant)
+
+        def load():
+            return tk.PhotoImage(file=art_file)
+
+        try:
+            # Keyed by content, so tracks sharing a cover share one decoded image
+            return self.art_memory.get_or_load((key, variant), load)
+        except Exception:
+            return None
+
     # ------------------ HOME ANIMATIONS ------------------
     def create_home_carousel(self):
         # Remove existing carousel if present
@@ -723,147 +1294,176 @@ class SpotifyClonePlayer:
             self.carousel_items.append((window, item_frame))
             x += 230
 
-        # ensure scrollregion
-        self.carousel_canvas.configure(scrollregion=self.carousel_canvas.bbox('all'))
+        # ensure scrollregion; the content is measured once, not on every frame
+        bbox = self.carousel_canvas.bbox('all') or (0, 0, 0, 0)
+        self.carousel_canvas.configure(scrollregion=bbox)
+        self._carousel_width = max(1, bbox[2] - bbox[0])
+        self._carousel_offsets = [0]
+        self._carousel_shown = None
+        self.carousel_canvas.bind('<Configure>', self._layout_carousel)
 
-        # start animation
-        self.carousel_pos = 0
-        self.carousel_direction = -1
-        if hasattr(self, 'carousel_after_id'):
-            try:
-                self.root.after_cancel(self.carousel_after_id)
-            except Exception:
-                pass
-        self.carousel_after_id = self.root.after(50, self._animate_carousel_step)
-
-    def _animate_carousel_step(self):
-        # Move canvas by small amount for smooth scrolling
-        step = 4 * self.carousel_direction
-        self.carousel_canvas.xview_scroll(step, 'units')
-        # reverse direction at edges
-        x0, y0, x1, y1 = self.carousel_canvas.bbox('all')
-        view_left = self.carousel_canvas.canvasx(0)
-        view_right = view_left + self.carousel_canvas.winfo_width()
-        if view_right >= x1 - 10:
-            self.carousel_direction = -1
-        if view_left <= 0:
-            self.carousel_direction = 1
-
-        self.carousel_after_id = self.root.after(40, self._animate_carousel_step)
+        # start animation (it ends by itself when the Home view is torn down)
+        self.animations.add('carousel', self._animate_carousel_step, (self.carousel_canvas,),
+                            self.CAROUSEL_INTERVAL_MS)
+
+    def _layout_carousel(self, event):
+        """Precompute one back-and-forth pass of scroll offsets for the carousel's width."""
+        self._carousel_offsets = bounce_offsets(self._carousel_width - event.width, self.CAROUSEL_STEP_PX)
+
+    def _animate_carousel_step(self, frame):
+        offsets = self._carousel_offsets
+        offset = offsets[frame % len(offsets)]
+        if offset != self._carousel_shown:
+            self._carousel_shown = offset
+            self.carousel_canvas.xview_moveto(offset / self._carousel_width)
 
     def start_header_pulse(self):
-        # pulse the now_playing_header bg between two colors
-        if hasattr(self, 'pulse_after_id'):
+        # pulse the now_playing_header bg between two colors while the Home view is up
+        self._pulse_colors = color_cycle(self.BG_CARD, self.BG_SELECTED, self.PULSE_FRAMES)
+        self._pulse_shown = None
+        self.animations.add('header pulse', self._do_pulse, (self.now_playing_header, self.home_carousel_frame),
+                            self.PULSE_INTERVAL_MS, on_stop=lambda: self.now_playing_header.config(bg=self.BG_CARD))
+
+    def _do_pulse(self, frame):
+        color = self._pulse_colors[frame % len(self._pulse_colors)]
+        if color != self._pulse_shown:
+            self._pulse_shown = color
+            self.now_playing_header.config(bg=color)
+    
+    # ------------------ TRANSPORT STATE ------------------
+    # Kept by PlayerCore; these read and write it under the names the window code uses
+    @property
+    def playlist(self):
+        return self.core.playlist
+
+    @playlist.setter
+    def playlist(self, ids):
+        self.core.playlist = ids
+
+    @property
+    def current_index(self):
+        return self.tracks.position(self.core.current)
+
+    @current_index.setter
+    def current_index(self, index):
+        self.core.current = self.playlist[index] if 0 <= index < len(self.playlist) else None
+
+    @property
+    def is_playing(self):
+        """True while a track is loaded, paused or not."""
+        return self.core.state != STATE_STOPPED
+
+    @property
+    def is_paused(self):
+        return self.core.state == STATE_PAUSED
+
+    @property
+    def shuffle_mode(self):
+        return self.core.shuffle_mode
+
+    @property
+    def repeat_mode(self):
+        return self.core.repeat_mode
+
+    @property
+    def history(self):
+        return self.core.history
+
+    @history.setter
+    def history(self, history):
+        self.core.history = history
+
+    def _transport(self, action, *args):
+        """Run a PlayerCore call, reporting a failure in the window instead of raising."""
+        try:
+            return action(*args)
+        except FileNotFoundError as e:
+            msg = f"File not found: {e.filename}"
+            print(msg)
+            self.status_label.config(text=msg)
+        except Exception as e:
+            print(traceback.format_exc())
             try:
-                self.root.after_cancel(self.pulse_after_id)
+                self.status_label.config(text=f"Playback error: {e}")
             except Exception:
                 pass
-        self._pulse_state = 0
-        self._pulse_step = 0.05
-        self._pulse_color_a = self.BG_CARD
-        self._pulse_color_b = self.BG_SELECTED
-        self._pulse_duration = 20
-        self._do_pulse()
-
-    def _do_pulse(self):
-        # interpolate between two hex colors
-        def lerp(a, b, t):
-            return int(a + (b - a) * t)
-
-        def hex_to_rgb(h):
-            h = h.lstrip('#')
-            return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-
-        a = hex_to_rgb(self._pulse_color_a[1:]) if self._pulse_color_a.startswith('#') else hex_to_rgb(self.BG_CARD[1:])
-        b = hex_to_rgb(self._pulse_color_b[1:]) if self._pulse_color_b.startswith('#') else hex_to_rgb(self.BG_SELECTED[1:])
-        t = (1 + math.sin(self._pulse_state)) / 2
-        rgb = (lerp(a[0], b[0], t), lerp(a[1], b[1], t), lerp(a[2], b[2], t))
-        color = '#%02x%02x%02x' % rgb
-        try:
-            self.now_playing_header.config(bg=color)
-        except Exception:
-            pass
-        self._pulse_state += self._pulse_step
-        self.pulse_after_id = self.root.after(80, self._do_pulse)
-    
+            messagebox.showerror("Playback Error", f"Could not play: {e}\nSee console for details")
+        return False
+
     def play_song(self, index):
         if index < 0 or index >= len(self.playlist):
             return
-        self.current_index = index
-        path = self.playlist[index]
-        # Validate file exists
-        if not os.path.exists(path):
-            msg = f"File not found: {path}"
-            print(msg)
-            self.status_label.config(text=msg)
+        self._resume_at = 0
+        self._transport(self.core.play, self.playlist[index])
+
+    def _show_track(self, index):
+        """STARTED: bring every display along to the track now playing at index."""
+        if index < 0:
             return
+        tid = self.playlist[index]
+        path = self.tracks.path(tid)
+        self.play_small.config(text="⏸")
+        self.progress_var.set(0)
+        self._show_waveform(path)
+
+        if not self.tracks.duration(tid):
+            # One pass over the file serves both the tags and the embedded art
+            self.tracks.set_meta(tid, self._read_metadata(path))
+        title, artist = self.tracks.title(tid), self.tracks.artist(tid)
 
+        # Update all displays
         try:
-            # Ensure mixer initialized
-            if not pygame.mixer.get_init():
-                try:
-                    pygame.mixer.init()
-                except Exception as ie:
-                    print("Could not init mixer:", ie)
-
-            pygame.mixer.music.load(path)
-            pygame.mixer.music.play()
-            self.is_playing = True
-            self.is_paused = False
-            self.play_small.config(text="⏸")
-            self.current_position = 0
-            self.progress_var.set(0)
+            self.header_title.config(text=title)
+            self.header_artist.config(text=artist)
+            self.player_title.config(text=title)
+            self.player_artist.config(text=artist)
+        except Exception:
+            pass
 
-            meta = self.get_metadata(path)
-            title, artist = meta.get('title', os.path.splitext(os.path.basename(path))[0]), meta.get('artist','')
+        # Art updates (best-effort)
+        try:
+            # The header strip is as tall as a card, so both labels share the card render
+            photo = self._art_photo(tid) if self.get_album_art(tid) else None
+            if photo is not None:
+                self.current_art_photo = photo
+                self.mini_art.config(image=self.current_art_photo, text="")
+                self.header_art.config(image=self.current_art_photo, text="")
+            else:
+                self.mini_art.config(image="", text="♪")
+                self.header_art.config(image="", text="🎵 Select a track")
+        except Exception:
+            pass
 
-            # Update all displays
-            try:
-                self.header_title.config(text=title)
-                self.header_artist.config(text=artist)
-                self.player_title.config(text=title)
-                self.player_artist.config(text=artist)
-            except Exception:
-                pass
+        self.current_song_length = self.tracks.duration(tid)
+        try:
+            self.prog_duration.config(text=self.format_time(self.current_song_length))
+        except Exception:
+            pass
 
-            # Art updates (best-effort)
-            try:
-                album_art = self.get_album_art(path)
-                if album_art and album_art[0] is not None:
-                    art, shadow = album_art
-                    if art is not None:
-                        big_art = art.resize((80, 80), Image.Resampling.LANCZOS)
-                        self.current_art_photo = ImageTk.PhotoImage(big_art)
-                        self.mini_art.config(image=self.current_art_photo, text="")
-                        self.header_art.config(image=self.current_art_photo, text="")
-                    else:
-                        self.mini_art.config(image="", text="♪")
-                        self.header_art.config(image="", text="🎵 Select a track")
-                else:
-                    self.mini_art.config(image="", text="♪")
-                    self.header_art.config(image="", text="🎵 Select a track")
-            except Exception:
-                pass
+        self._highlight_current()
+        self._update_like_button()
+        self.status_label.config(text=f"Playing: {title}")
+        # The core has queued the next track already; compute its waveform too
+        self._request_next_peaks()
 
-            self.current_song_length = meta.get('duration', 0)
-            try:
-                self.prog_duration.config(text=self.format_time(self.current_song_length))
-            except Exception:
-                pass
+    # ------------------ GAPLESS ------------------
+    def _prepare_next(self):
+        """Get the predicted next track ready: queued behind the current one, waveform computed."""
+        self.core.prepare_next()
+        self._request_next_peaks()
 
-            self.update_playlist_grid()
-            self.played_indices.append(index)
-            self.status_label.config(text=f"Playing: {title}")
+    def _request_next_peaks(self):
+        tid = self.core.peek_next()
+        if tid is not None and self.peak_cache is not None:
+            self.peak_cache.request(self.tracks.path(tid), PRIORITY_NEXT)
+
+    def _show_waveform(self, path):
+        """Draw the track's cached peaks, or a flat bar until the worker has them."""
+        peaks = self.peak_cache.get(path) if self.peak_cache is not None else None
+        self.waveform.set_peaks(peaks)
+        if peaks is None and self.peak_cache is not None:
+            self.peak_cache.request(path, PRIORITY_CURRENT)
 
-        except Exception as e:
-            tb = traceback.format_exc()
-            print(tb)
-            try:
-                self.status_label.config(text=f"Playback error: {e}")
-            except Exception:
-                pass
-            messagebox.showerror("Playback Error", f"Could not play {path}: {e}\nSee console for details")
-    
     def play_pause(self):
         if not self.playlist:
             return
@@ -871,48 +1471,65 @@ class SpotifyClonePlayer:
             self.play_song(0)
             return
         if self.is_paused:
-            pygame.mixer.music.unpause()
-            self.is_paused = False
+            self.core.resume()
             self.play_small.config(text="⏸")
         elif self.is_playing:
-            pygame.mixer.music.pause()
-            self.is_paused = True
+            self.core.pause()
             self.play_small.config(text="▶")
         else:
+            # A track restored from the last session continues where it was left
+            resume = self._resume_at
             self.play_song(self.current_index)
+            if resume and self.is_playing:
+                self._seek_to(resume)
     
     def next_song(self):
-        if self.shuffle_mode:
-            next_idx = random.choice([i for i in range(len(self.playlist)) if i not in self.played_indices[-10:]])
-        else:
-            next_idx = (self.current_index + 1) % len(self.playlist)
-        self.play_song(next_idx)
+        self._transport(self.core.next)
     
     def prev_song(self):
-        if self.current_position > 3:
-            pygame.mixer.music.rewind()
-        else:
-            prev_idx = (self.current_index - 1) % len(self.playlist)
-            self.play_song(prev_idx)
+        """Restart the track past 3 s, else go back one (through the shuffle history when shuffling)."""
+        self._transport(self.core.previous)
     
     def toggle_shuffle(self):
-        self.shuffle_mode = not self.shuffle_mode
+        self.core.set_shuffle(not self.shuffle_mode)
         self.shuffle_icon.config(fg=self.GREEN_ACCENT if self.shuffle_mode else self.TEXT_GRAY)
+        self._request_next_peaks()
     
     def toggle_repeat(self):
-        self.repeat_mode = (self.repeat_mode + 1) % 3
+        self.core.set_repeat(self.repeat_mode + 1)
         icons = ["🔁", "🔂", "∞"]
         self.repeat_icon.config(text=icons[self.repeat_mode], fg=self.GREEN_ACCENT if self.repeat_mode > 0 else self.TEXT_GRAY)
+        self._request_next_peaks()
     
     def update_volume(self, val):
-        pygame.mixer.music.set_volume(float(val)/100)
+        self.core.set_volume(float(val)/100)
+
+    def _apply_volume(self):
+        """Mixer volume = the user's level times the current track's normalization gain."""
+        # Before the mixer is up this does nothing; _on_mixer_ready applies it
+        self.core.apply_volume()
     
     def seek_progress(self, val):
-        # Limited seek
-        if self.current_song_length:
-            seek = (float(val)/100) * self.current_song_length
-            # Pygame seek approx
-            pygame.mixer.music.play(loops=0, start=seek)
+        if not self.current_song_length:
+            return
+        seconds = (float(val)/100) * self.current_song_length
+        if self.is_playing:
+            self._seek_to(seconds)
+        else:
+            # Nothing loaded yet (restored track): play starts from here
+            self._resume_at = seconds
+            self.prog_time.config(text=self.format_time(seconds))
+
+    def _seek_to(self, seconds):
+        """Jump within the current track and bring the clock, queue and labels along."""
+        try:
+            # The core re-queues the successor the reload dropped
+            landed = self.core.seek(seconds)
+        except Exception as e:
+            print("Seek failed:", e)
+            return
+        if landed is not None:
+            self.prog_time.config(text=self.format_time(landed))
     
     def format_time(self, secs):
         if secs <= 0: return "—:—"
@@ -922,24 +1539,43 @@ class SpotifyClonePlayer:
     def start_update_thread(self):
         def loop():
             while True:
+                # Blocks while nothing is playing, so an idle player costs no wakeups
+                self._progress_wake.wait()
                 if self.is_playing and not self.is_paused:
-                    pos = pygame.mixer.music.get_pos() / 1000
+                    pos = self.clock.position()
                     if self.current_song_length:
                         prog = (pos / self.current_song_length) * 100
-                        self.progress_var.set(prog)
-                        self.prog_time.config(text=self.format_time(pos))
+                        self.ui_bus.post_var(self.progress_var, prog)
+                        self.ui_bus.post_config(self.prog_time, text=self.format_time(pos))
                 threading.Event().wait(0.2)
         threading.Thread(target=loop, daemon=True).start()
-    
-    def check_music_end(self):
-        if self.is_playing and not pygame.mixer.music.get_busy():
-            if self.repeat_mode == 2:
-                self.play_song(self.current_index)
-            else:
-                self.next_song()
-        self.root.after(300, self.check_music_end)
+
+    def on_close(self):
+        """Save the session, listening statistics and pending likes, then quit."""
+        try:
+            self._save_session()
+        except Exception as e:
+            print("Could not save session:", e)
+        for store in (self.history, self.liked):
+            if store is not None:
+                try:
+                    store.close()
+                except Exception as e:
+                    print("Could not close store:", e)
+        self.ui_bus.stop()
+        if self.stream_server is not None:
+            self.stream_server.stop()
+        if self.mixer.ready and pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    # --profile-startup prints how long each startup phase took
+    profiler = StartupProfiler(_STARTED_AT, enabled='--profile-startup' in sys.argv,
+                               expect=("first paint", "load_songs", "mixer init"))
+    profiler.mark("imports")
     root = tk.Tk()
-    app = SpotifyClonePlayer(root)
+    profiler.mark("tk root")
+    app = SpotifyClonePlayer(root, profiler=profiler)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
\ No newline at end of file
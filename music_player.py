@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import pygame
-import os
 import random
 from pathlib import Path
 import threading
@@ -15,6 +14,15 @@ try:
 except Exception:
     MutagenFile = None
     MUTAGEN_AVAILABLE = False
+from musicflow.library_scanner import LibraryScanner
+from musicflow.play_history import PlayHistory
+from musicflow.playback_clock import PlaybackClock
+from musicflow.playback_events import FINISHED, PAUSED, RESUMED, SEEK, STARTED, STOPPED, PlaybackEvents
+from musicflow.search_index import SearchIndex
+from musicflow.seek_index import SeekIndex
+from musicflow.shuffle import ShuffleBag
+from musicflow.track_table import TrackTable
+from musicflow.ui_bus import UIUpdateBus
 
 # ============================================================================
 # MUSICFLOW - ADVANCED SPOTIFY-LIKE MUSIC PLAYER
@@ -46,7 +54,9 @@ class ModernMusicPlayer:
         pygame.mixer.init()
         
         # ====================== VARIABLES =======================
-        self.playlist = []
+        # Songs live in a columnar track table; the playlist and filters hold track ids
+        self.tracks = TrackTable()
+        self.playlist = self.tracks.order
         self.current_index = -1
         self.is_playing = False
         self.is_paused = False
@@ -56,13 +66,32 @@ class ModernMusicPlayer:
         self.current_song_length = 0
         self.current_position = 0
         self.is_seeking = False
-        self.played_indices = []
+        # Play log with running counts and a bounded recent list, per music folder
+        self.history = None
+        # Shuffle bag over track ids (pass a seed for a reproducible order)
+        self.shuffle = ShuffleBag(no_repeat=10)
+        self.search_index = SearchIndex()
+        self.search_after_id = None
+        self.library_scanner = None
+        # The update thread hands widget changes to the Tk thread through this bus
+        self.ui_bus = UIUpdateBus(self.root)
+        # Position clock (get_pos() alone restarts on every seek)
+        self.clock = PlaybackClock(pygame.mixer.music)
+        # End of song arrives as a mixer event; the progress thread only runs while playing
+        self.events = PlaybackEvents(self.root, pygame.mixer.music, remaining=self.remaining_time)
+        self.events.subscribe(FINISHED, self.on_track_end)
+        self.progress_wake = threading.Event()
+        for kind in (STARTED, RESUMED, SEEK):
+            self.events.subscribe(kind, lambda **_: self.progress_wake.set())
+        for kind in (PAUSED, STOPPED):
+            self.events.subscribe(kind, lambda **_: self.progress_wake.clear())
         
         # Create songs folder if it doesn't exist
         Path(self.music_folder).mkdir(exist_ok=True)
         
         # ====================== UI SETUP =======================
         self.setup_ui()
+        self.ui_bus.start()
         
         # Load songs
         self.load_songs()
@@ -72,27 +101,51 @@ class ModernMusicPlayer:
         self.start_update_thread()
         
     def load_songs(self):
-        """Load all supported music files from the songs folder"""
-        supported_formats = ('.mp3', '.wav', '.flac', '.ogg', '.m4a')
-        self.playlist = []
-        
+        """Load all supported music files under the songs folder (only changes on a refresh)"""
         try:
-            if os.path.exists(self.music_folder):
-                for file in os.listdir(self.music_folder):
-                    if file.lower().endswith(supported_formats):
-                        full_path = os.path.join(self.music_folder, file)
-                        self.playlist.append(full_path)
+            tracks = self.tracks
+            scanner = self.library_scanner
+            if scanner is None or scanner.music_folder != self.music_folder:
+                # New folder: start from an empty library
+                scanner = self.library_scanner = LibraryScanner(self.music_folder)
+                try:
+                    self.clock.seek_index = SeekIndex(self.music_folder)
+                except Exception as e:
+                    print("Seek index unavailable:", e)
+                    self.clock.seek_index = None
+                if self.history is not None:
+                    self.history.close()
+                try:
+                    self.history = PlayHistory(self.music_folder)
+                except Exception as e:
+                    print("Play history unavailable:", e)
+                    self.history = None
+                tracks.clear()
+                self.playlist = tracks.order
+                self.search_index.clear()
+                self.shuffle.reset()
+            changes = scanner.rescan()
+            # Track ids survive the rescan; positions are re-derived below
+            current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
             
-            self.playlist.sort()
-            # maintain a filtered copy for search/filter operations
-            self.filtered_playlist = self.playlist.copy()
-            # precompute durations for faster UI updates
-            self.song_metadata = {}
-            for p in self.playlist:
+            for p in changes.removed:
+                self.shuffle.remove(tracks.remove(p))
+                self.search_index.remove(p)
+            # precompute durations of new or modified files for faster UI updates
+            for p in changes.added + changes.changed:
                 try:
-                    self.song_metadata[p] = self.get_duration(p)
+                    length = self.get_duration(p)
                 except Exception:
-                    self.song_metadata[p] = 0
+                    length = 0
+                tid = tracks.add(p, {'duration': length})
+                self.search_index.add(p, tracks.title(tid), '')
+                self.shuffle.add(tid)
+            
+            self.playlist = tracks.set_order(tracks.ids_for(scanner.paths()))
+            self.current_index = tracks.position(current)
+            # maintain a filtered copy for search/filter operations
+            query = self.search_var.get().strip() if hasattr(self, 'search_var') else ''
+            self.filtered_playlist = tracks.ids_for(self.search_index.search(query)) if query else list(self.playlist)
             self.update_song_list()
             
             if self.playlist:
@@ -449,15 +502,11 @@ class ModernMusicPlayer:
             self.song_tree.insert('', tk.END, iid='no_songs', values=("No songs found",))
             return
 
-        for idx, song_path in enumerate(display_list):
-            # If filtered_playlist is a subset, ensure we insert using original playlist index
-            try:
-                real_idx = self.playlist.index(song_path)
-            except ValueError:
-                real_idx = idx
-
-            song_name = os.path.basename(song_path)
-            song_name_clean = os.path.splitext(song_name)[0]
+        tracks = self.tracks
+        for tid in display_list:
+            # Rows are keyed by position in the full playlist, also when filtered
+            real_idx = tracks.position(tid)
+            song_name_clean = tracks.title(tid)
 
             display_text = song_name_clean
             if real_idx == self.current_index:
@@ -474,12 +523,22 @@ class ModernMusicPlayer:
                 pass
 
     def filter_songs(self):
+        """Debounce the search entry so the list is filtered once typing pauses"""
+        if self.search_after_id is not None:
+            try:
+                self.root.after_cancel(self.search_after_id)
+            except Exception:
+                pass
+        self.search_after_id = self.root.after(150, self.apply_filter)
+
+    def apply_filter(self):
         """Filter songs based on search entry"""
-        query = getattr(self, 'search_var', tk.StringVar()).get().strip().lower()
+        self.search_after_id = None
+        query = getattr(self, 'search_var', tk.StringVar()).get().strip()
         if not query:
-            self.filtered_playlist = self.playlist.copy()
+            self.filtered_playlist = list(self.playlist)
         else:
-            self.filtered_playlist = [p for p in self.playlist if query in os.path.basename(p).lower()]
+            self.filtered_playlist = self.tracks.ids_for(self.search_index.search(query))
 
         self.update_song_list()
         # update status
@@ -494,13 +553,17 @@ class ModernMusicPlayer:
         
         if self.is_paused:
             pygame.mixer.music.unpause()
+            self.clock.resume()
             self.is_paused = False
             self.is_playing = True
             self.play_btn.config(text="⏸️  PAUSE")
+            self.events.emit(RESUMED)
         elif self.is_playing:
             pygame.mixer.music.pause()
+            self.clock.pause()
             self.is_paused = True
             self.play_btn.config(text="▶️  PLAY")
+            self.events.emit(PAUSED)
         else:
             # Start playing
             if self.current_index < 0:
@@ -515,29 +578,31 @@ class ModernMusicPlayer:
         self.current_index = index
         
         try:
-            song_path = self.playlist[index]
+            tid = self.playlist[index]
+            song_path = self.tracks.path(tid)
             pygame.mixer.music.load(song_path)
             pygame.mixer.music.play()
+            self.clock.start(song_path)
             
             self.is_playing = True
             self.is_paused = False
             self.play_btn.config(text="⏸️  PAUSE")
             
             # Update display
-            song_name = os.path.basename(song_path)
-            song_name_clean = os.path.splitext(song_name)[0]
-            self.song_title.config(text=song_name_clean)
+            self.song_title.config(text=self.tracks.title(tid))
             self.song_info.config(text=f"Track {index + 1} of {len(self.playlist)}")
             
             self.update_song_list()
+            if self.history is not None:
+                self.history.record(song_path)
             self.update_stats()
 
             # set current song length (seconds) and update duration label
             try:
-                length = self.song_metadata.get(song_path, None)
+                length = self.tracks.duration(tid)
                 if not length:
                     length = self.get_duration(song_path)
-                    self.song_metadata[song_path] = length
+                    self.tracks.set_meta(tid, {'duration': length or 0})
                 self.current_song_length = length or 0
                 self.duration_label.config(text=self.format_time(self.current_song_length) if self.current_song_length > 0 else "--:--")
                 self.time_label.config(text="00:00")
@@ -545,9 +610,8 @@ class ModernMusicPlayer:
             except Exception:
                 self.current_song_length = 0
             
-            # Add to played history for shuffle
-            if index not in self.played_indices:
-                self.played_indices.append(index)
+            self.shuffle.played(tid)
+            self.events.emit(STARTED, index=index, track=tid)
                 
         except Exception as e:
             messagebox.showerror("Playback Error", f"Could not play song: {str(e)}")
@@ -558,15 +622,8 @@ class ModernMusicPlayer:
             return
         
         if self.shuffle_mode:
-            # Shuffle mode - pick random song
-            if len(self.played_indices) >= len(self.playlist):
-                self.played_indices = []  # Reset if all songs played
-            
-            while True:
-                idx = random.randint(0, len(self.playlist) - 1)
-                if idx not in self.played_indices:
-                    self.play_song(idx)
-                    break
+            # Shuffle mode - next song from the shuffle bag
+            self.play_song(self.tracks.position(self.shuffle.next()))
         else:
             # Sequential mode
             next_idx = (self.current_index + 1) % len(self.playlist)
@@ -577,6 +634,13 @@ class ModernMusicPlayer:
         if not self.playlist:
             return
         
+        if self.shuffle_mode:
+            # Step back through the shuffle history
+            prev_tid = self.shuffle.previous()
+            if prev_tid is not None:
+                self.play_song(self.tracks.position(prev_tid))
+            return
+        
         prev_idx = (self.current_index - 1) % len(self.playlist)
         self.play_song(prev_idx)
     
@@ -633,7 +697,11 @@ class ModernMusicPlayer:
         try:
             pos = float(value) / 100.0 * self.current_song_length
             if pos >= 0:
-                pygame.mixer.music.set_pos(pos)
+                pos = self.clock.seek(pos)
+                self.current_position = pos
+                self.time_label.config(text=self.format_time(pos))
+                if not self.is_paused:
+                    self.events.emit(SEEK, position=pos)
         except:
             pass
     
@@ -656,9 +724,11 @@ class ModernMusicPlayer:
     def update_stats(self):
         """Update statistics display"""
         if self.playlist and self.current_index >= 0:
-            current_song = os.path.splitext(os.path.basename(self.playlist[self.current_index]))[0]
+            tid = self.playlist[self.current_index]
+            current_song = self.tracks.title(tid)
+            plays = self.history.play_count(self.tracks.path(tid)) if self.history is not None else 0
             self.stats_label.config(
-                text=f"Songs: {len(self.playlist)} | Currently: {current_song}"
+                text=f"Songs: {len(self.playlist)} | Currently: {current_song} ({plays} plays)"
             )
         else:
             self.stats_label.config(text=f"Songs: {len(self.playlist)} | Currently: No song")
@@ -693,38 +763,53 @@ class ModernMusicPlayer:
         """Start thread for real-time updates"""
         def update_loop():
             while self.update_thread_active:
+                # Sleep until a song starts or resumes (no wakeups while idle)
+                self.progress_wake.wait()
                 try:
                     if self.is_playing and not self.is_paused:
                         # Update progress
                         if pygame.mixer.music.get_busy():
                             # Get current position
-                            pos = pygame.mixer.music.get_pos() / 1000.0  # Convert to seconds
+                            pos = self.clock.position()
                             
                             if pos >= 0:
                                 self.current_position = pos
-                                self.time_label.config(text=self.format_time(pos))
+                                self.ui_bus.post_config(self.time_label, text=self.format_time(pos))
                                 
                                 if self.current_song_length > 0:
                                     progress = (pos / self.current_song_length) * 100
                                     if 0 <= progress <= 100:
-                                        self.progress_var.set(progress)
-                        else:
-                            # Song ended, play next
-                            if self.repeat_mode == 2:  # Repeat one
-                                self.play_song(self.current_index)
-                            else:
-                                self.next_song()
+                                        self.ui_bus.post_var(self.progress_var, progress)
                     
-                    self.root.after(100, lambda: None)
+                    threading.Event().wait(0.1)
                 except:
                     pass
         
         self.update_thread = threading.Thread(target=update_loop, daemon=True)
         self.update_thread.start()
     
+    def remaining_time(self):
+        """Seconds left in the current song, or None if unknown (paces the event pump)"""
+        if self.current_song_length <= 0:
+            return None
+        return self.current_song_length - self.clock.position()
+    
+    def on_track_end(self, queued=False):
+        """Advance after the current song finished (mixer end event, Tk thread)"""
+        if queued or not self.is_playing or self.is_paused:
+            return
+        if self.repeat_mode == 2:  # Repeat one
+            self.play_song(self.current_index)
+        else:
+            self.next_song()
+    
     def on_closing(self):
         """Handle window closing"""
         self.update_thread_active = False
+        self.progress_wake.set()
+        self.ui_bus.stop()
+        if self.history is not None:
+            self.history.close()
         pygame.mixer.music.stop()
         self.root.destroy()
 
@@ -0,0 +1 @@
+"""Shared building blocks for the MusicFlow players (caching, scanning, playback)."""
@@ -0,0 +1,193 @@
+import math
+import time
+import tkinter as tk
+
+# ============================================================================
+# ANIMATION SCHEDULER
+# Every UI animation registers here instead of running its own after() loop.
+# One timer drives them all: it never fires faster than MAX_FPS, runs each
+# animation at its own interval, and stops stepping for the tick once the
+# frame budget is spent (the rest go first on the next tick). Animations are
+# bound to their widgets: they are skipped while those are not on screen and
+# removed when one is destroyed. While the window is minimized or unfocused,
+# or nothing is on screen, the timer is not rescheduled at all, so an idle
+# window costs no wakeups.
+# ============================================================================
+
+
+def color_cycle(color_a, color_b, frames):
+    """Hex colours easing from color_a to color_b and back over frames steps (sine curve)."""
+    a = [int(color_a[i:i + 2], 16) for i in (1, 3, 5)]
+    b = [int(color_b[i:i + 2], 16) for i in (1, 3, 5)]
+    table = []
+    for i in range(frames):
+        t = (1 - math.cos(2 * math.pi * i / frames)) / 2
+        table.append('#%02x%02x%02x' % tuple(int(x + (y - x) * t) for x, y in zip(a, b)))
+    return table
+
+
+def bounce_offsets(distance, step):
+    """Offsets 0 → distance → 0 in step increments: one back-and-forth pass."""
+    if distance <= 0:
+        return [0]
+    forward = list(range(0, distance, step)) + [distance]
+    return forward + forward[-2:0:-1]
+
+
+class Animation:
+    def __init__(self, name, step, widgets, interval_ms, on_stop=None):
+        """
+        step(frame) draws frame number `frame` (counting from 0)
+        widgets: the animation runs while all of them are on screen and ends when one is destroyed
+        on_stop() is called once the animation is removed, to put its widgets back to rest
+        """
+        self.name = name
+        self.step = step
+        self.widgets = tuple(widgets)
+        self.interval = interval_ms / 1000.0
+        self.on_stop = on_stop
+        self.frame = 0
+        self.due = 0.0
+
+    def alive(self):
+        return all(w.winfo_exists() for w in self.widgets)
+
+    def on_screen(self):
+        return all(w.winfo_viewable() for w in self.widgets)
+
+
+class AnimationScheduler:
+    # Upper bound on ticks per second, whatever intervals the animations ask for
+    MAX_FPS = 30
+    # Step work per tick; animations still due after it wait for the next tick
+    FRAME_BUDGET_MS = 8
+
+    def __init__(self, root, max_fps=MAX_FPS, budget_ms=FRAME_BUDGET_MS):
+        self.root = root
+        self.min_delay = 1.0 / max_fps
+        self.budget = budget_ms / 1000.0
+        self._animations = []
+        self._bound = set()         # widgets that already carry our <Map>/<Destroy> bindings
+        self._after_id = None
+        self._start = 0             # rotates so a slow animation cannot starve the others
+        self._mapped = True
+        self._focused = True
+        root.bind('<Map>', self._on_root_map, add='+')
+        root.bind('<Unmap>', self._on_root_unmap, add='+')
+        root.bind('<FocusIn>', self._on_focus_change, add='+')
+        root.bind('<FocusOut>', self._on_focus_change, add='+')
+
+    # ------------------ PUBLIC API ------------------
+    def add(self, name, step, widgets, interval_ms, on_stop=None):
+        """Start an animation (replacing one registered under the same name)."""
+        self.remove(name)
+        anim = Animation(name, step, widgets, interval_ms, on_stop)
+        anim.due = time.perf_counter()
+        self._animations.append(anim)
+        for w in anim.widgets:
+            if str(w) in self._bound:
+                continue
+            self._bound.add(str(w))
+            # A widget coming back on screen restarts a timer that went quiet
+            w.bind('<Map>', lambda e: self._wake(), add='+')
+            w.bind('<Destroy>', self._on_destroy, add='+')
+        self._wake()
+        return anim
+
+    def remove(self, name):
+        for anim in [a for a in self._animations if a.name == name]:
+            self._stop(anim)
+
+    def active(self):
+        """True while the timer is scheduled."""
+        return self._after_id is not None
+
+    # ------------------ SUSPEND / RESUME ------------------
+    def _suspended(self):
+        return not (self._mapped and self._focused)
+
+    def _on_root_map(self, event):
+        if event.widget is self.root:
+            self._mapped = True
+            self._wake()
+
+    def _on_root_unmap(self, event):
+        if event.widget is self.root:
+            self._mapped = False
+            self._cancel()
+
+    def _on_focus_change(self, event):
+        # Focus moving between two widgets of the window sends FocusOut then FocusIn;
+        # only where it ends up counts
+        self.root.after_idle(self._check_focus)
+
+    def _check_focus(self):
+        try:
+            focused = self.root.focus_get() is not None
+        except (KeyError, tk.TclError):
+            focused = True          # focus is on a widget Tkinter does not know (e.g. a ttk popdown)
+        if focused == self._focused:
+            return
+        self._focused = focused
+        if focused:
+            self._wake()
+        else:
+            self._cancel()
+
+    def _on_destroy(self, event):
+        self._bound.discard(str(event.widget))
+        for anim in [a for a in self._animations if event.widget in a.widgets]:
+            self._stop(anim)
+
+    def _stop(self, anim):
+        self._animations.remove(anim)
+        if anim.on_stop is not None:
+            try:
+                anim.on_stop()
+            except tk.TclError:
+                pass
+
+    # ------------------ TIMER ------------------
+    def _wake(self):
+        if self._after_id is None and not self._suspended() and self._animations:
+            self._after_id = self.root.after_idle(self._tick)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        self._after_id = None
+        if self._suspended():
+            return
+        now = time.perf_counter()
+        deadline = now + self.budget
+        anims = self._animations
+        count = len(anims)
+        order = [anims[(self._start + i) % count] for i in range(count)] if count else []
+        self._start = self._start + 1 if count else 0
+        next_due = None
+        for anim in order:
+            if anim not in self._animations:
+                continue            # stopped by an earlier step
+            if not anim.alive():
+                self._stop(anim)
+                continue
+            if not anim.on_screen():
+                continue            # its <Map> binding wakes the timer again
+            if anim.due <= now and time.perf_counter() < deadline:
+                try:
+                    anim.step(anim.frame)
+                except tk.TclError:
+                    self._stop(anim)
+                    continue
+                anim.frame += 1
+                # Late frames are dropped rather than replayed in a burst
+                anim.due = max(anim.due + anim.interval, now)
+            if next_due is None or anim.due < next_due:
+                next_due = anim.due
+        if next_due is None:
+            return                  # nothing on screen: no timer until something is mapped again
+        delay = max(self.min_delay, next_due - time.perf_counter())
+        self._after_id = self.root.after(int(delay * 1000), self._tick)
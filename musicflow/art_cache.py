@@ -0,0 +1,179 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from musicflow.lazy import lazy_import
+from musicflow.metadata_store import cache_dir_for, write_atomic
+
+# Rendering only happens on worker threads, long after startup
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageOps = lazy_import('PIL.ImageOps')
+
+# ============================================================================
+# CONTENT-ADDRESSED ALBUM ART CACHE
+# Rendered thumbnails are stored once per distinct embedded image (tracks that
+# share a cover share the entry), already sized and circle-masked, as PNGs Tk
+# can load directly.
+# ============================================================================
+
+ART_DIR_NAME = "art"
+
+# Pre-rendered variants: name -> edge length in pixels
+ART_SIZES = {
+    'card': 80,
+    'header': 400,
+}
+
+
+def art_key(data):
+    """Stable content hash of the embedded image bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _circle_mask(size):
+    mask = Image.new('L', (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+    return mask
+
+
+class ArtCache:
+    def __init__(self, music_folder):
+        self.music_folder = music_folder
+        self.root_dir = os.path.join(cache_dir_for(music_folder), ART_DIR_NAME)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._masks = {}
+
+    def path_for(self, key, variant='card'):
+        return os.path.join(self.root_dir, key[:2], f"{key}_{ART_SIZES[variant]}.png")
+
+    def has(self, key):
+        return all(os.path.exists(self.path_for(key, v)) for v in ART_SIZES)
+
+    def ensure(self, data):
+        """Return the key for `data`, rendering its variants first if they are not cached."""
+        if not data:
+            return None
+        key = art_key(data)
+        if not self.has(key):
+            self._render(key, data)
+        return key
+
+    def _mask(self, size):
+        mask = self._masks.get(size)
+        if mask is None:
+            mask = self._masks[size] = _circle_mask(size)
+        return mask
+
+    def _render(self, key, data):
+        img = Image.open(BytesIO(data))
+        # Let the JPEG decoder downscale by 1/2..1/8 while decoding instead of
+        # inflating a full-resolution cover we are about to shrink anyway.
+        largest = max(ART_SIZES.values())
+        img.draft('RGB', (largest, largest))
+        img = img.convert('RGB')
+        # Largest first, each smaller variant resampled from the previous square
+        for variant, size in sorted(ART_SIZES.items(), key=lambda item: -item[1]):
+            img = ImageOps.fit(img, (size, size), Image.Resampling.LANCZOS)
+            out = img.copy()
+            out.putalpha(self._mask(size))
+            buf = BytesIO()
+            # Fast zlib level: entries are tiny and written once, but read on every view
+            out.save(buf, format='PNG', compress_level=1)
+            # Write-then-rename so concurrent workers never expose a partial file
+            write_atomic(self.path_for(key, variant), buf.getvalue())
+
+
+# ============================================================================
+# IN-MEMORY LRU
+# Decoded art (Tk PhotoImages or PIL images) bounded by a byte budget, so grid
+# rebuilds, view switches and replays hit memory instead of decoding again.
+# ============================================================================
+
+def image_nbytes(img):
+    """Approximate decoded size of a PIL image or Tk PhotoImage (RGBA)."""
+    if hasattr(img, 'width') and callable(img.width):
+        return img.width() * img.height() * 4
+    return img.width * img.height * 4
+
+
+class ArtLRU:
+    def __init__(self, max_bytes=48 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every entry (the hit/miss counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = image_nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.bytes_used += nbytes
+            # Never evict the entry just added, even if it alone exceeds the budget
+            while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_bytes
+                self.evictions += 1
+        return value
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and caching its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.bytes_used > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self):
+        """Counters for sizing the budget: hits, misses, evictions, entries and bytes."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+        }
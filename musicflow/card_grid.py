@@ -0,0 +1,303 @@
+# ============================================================================
+# VIRTUALIZED CARD GRID
+# Cards are drawn as canvas items, and only rows inside the viewport (plus a
+# small overscan) get items at all. Scrolling recycles a fixed pool of card
+# slots, so the item count stays flat whether the library has 10 tracks or 10k.
+# ============================================================================
+
+
+class VirtualCardGrid:
+    CARD_W = 170
+    CARD_H = 200
+    GAP = 20
+    ART_TOP = 12
+    OVERSCAN_ROWS = 2
+
+    def __init__(self, canvas, scrollbar, colors, describe, on_activate, art_for=None, on_missing_art=None,
+                 on_secondary=None):
+        """
+        colors: dict with 'bg', 'card', 'hover', 'selected', 'text', 'subtext', 'accent'
+        Items are opaque hashable keys (track ids in the player) handed back to the callbacks.
+        describe(item) -> (title, artist, duration) display strings
+        on_activate(item) is called when a card is clicked
+        on_secondary(item) is called when a card is right-clicked
+        art_for(item) -> PhotoImage or None; on_missing_art(items) is told which
+        visible cards still show the placeholder
+        """
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.colors = colors
+        self.describe = describe
+        self.on_activate = on_activate
+        self.art_for = art_for
+        self.on_missing_art = on_missing_art
+        self.on_secondary = on_secondary
+
+        self.items = []
+        self.selected_item = None
+        self.cols = 1
+        self._positions = {}  # item -> position in items
+        self._visible = {}    # position -> slot
+        self._free = []
+        self._slot_count = 0
+        self._hover_slot = None
+        self._rendering = False
+        self._anchor = None   # (position, pixels) to keep at the top until the user scrolls
+
+        # The right mouse button is 3 on Windows/X11 but 2 on macOS
+        self._secondary_button = '<Button-2>' if canvas.tk.call('tk', 'windowingsystem') == 'aqua' else '<Button-3>'
+        canvas.configure(yscrollcommand=self._on_yscroll)
+        scrollbar.configure(command=self.yview)
+        canvas.bind('<Configure>', self._on_configure)
+
+    # ------------------ PUBLIC API ------------------
+    def set_items(self, items, selected_item=None, keep_scroll=False):
+        """Replace the grid contents; only visible cards are (re)drawn.
+
+        keep_scroll leaves the view where it is (library refreshes) instead of
+        jumping back to the top (new views and searches).
+        """
+        items = list(items)
+        if len(items) == len(self.items) and items == self.items:
+            # Same list: keep scroll position and drawn cards, just move the highlight
+            self.set_selected(selected_item)
+            return
+        self.items = items
+        self._positions = {key: i for i, key in enumerate(self.items)}
+        self.selected_item = selected_item
+        # Slots keep their position; _render only refills those whose item changed
+        self._update_scrollregion()
+        if not keep_scroll:
+            self._anchor = None
+            self.canvas.yview_moveto(0)
+        self._render()
+
+    def set_selected(self, item):
+        """Move the "current" highlight, restyling only the old and new cards."""
+        old = self.selected_item
+        if old == item:
+            return
+        self.selected_item = item
+        for key in (old, item):
+            slot = self._slot_for(key)
+            if slot is not None:
+                self.canvas.itemconfigure(slot['rect'], fill=self._card_color(slot))
+
+    def refresh(self, item):
+        """Redraw a single card's labels and art if it is on screen."""
+        slot = self._slot_for(item)
+        if slot is not None:
+            self._fill(slot)
+
+    def is_visible(self, item):
+        return self._slot_for(item) is not None
+
+    def visible_keys(self):
+        return [slot['item'] for slot in self._visible.values()]
+
+    def visible_items(self):
+        """[(position, item)] for every drawn card, in view order."""
+        return sorted((pos, slot['item']) for pos, slot in self._visible.items())
+
+    def top_item(self):
+        """(position, pixels) of the first row on screen: its first item and how far it is scrolled past."""
+        row, offset = divmod(max(0, int(self.canvas.canvasy(0))), self._row_height())
+        return row * self.cols, offset
+
+    def scroll_to_item(self, pos, offset=0):
+        """Scroll the row holding pos to the top, and keep it there through resizes until the user scrolls."""
+        self._anchor = (pos, offset)
+        self._apply_anchor()
+        self._render()
+
+    def yview(self, *args):
+        self._anchor = None
+        self.canvas.yview(*args)
+        self._render()
+
+    def yview_scroll(self, number, what):
+        self._anchor = None
+        self.canvas.yview_scroll(number, what)
+        self._render()
+
+    def item_count(self):
+        """Number of canvas items currently allocated (constant w.r.t. library size)."""
+        return len(self.canvas.find_all())
+
+    # ------------------ LAYOUT ------------------
+    def _row_height(self):
+        return self.CARD_H + self.GAP
+
+    def _origin(self, pos):
+        row, col = divmod(pos, self.cols)
+        width = max(self.canvas.winfo_width(), self.CARD_W + 2 * self.GAP)
+        col_w = (width - self.GAP) / self.cols
+        x0 = self.GAP + col * col_w + (col_w - self.GAP - self.CARD_W) / 2
+        y0 = self.GAP + row * self._row_height()
+        return x0, y0
+
+    def _update_scrollregion(self):
+        rows = (len(self.items) + self.cols - 1) // self.cols
+        height = max(self.GAP + rows * self._row_height(), self.canvas.winfo_height())
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+        return height
+
+    def _apply_anchor(self):
+        pos, offset = self._anchor
+        height = self._update_scrollregion()
+        # The row's offset depends on the column count, so it is recomputed on every resize
+        self.canvas.yview_moveto((pos // self.cols * self._row_height() + offset) / height)
+
+    def _on_configure(self, event):
+        cols = max(1, (event.width - self.GAP) // (self.CARD_W + self.GAP))
+        if cols != self.cols:
+            self.cols = cols
+            self._release_all()
+        else:
+            # Same column count but a new width: re-centre what is already drawn
+            for pos, slot in self._visible.items():
+                self._place(slot, pos)
+        if self._anchor is not None:
+            self._apply_anchor()
+        else:
+            self._update_scrollregion()
+        self._render()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+
+    # ------------------ SLOTS ------------------
+    def _slot_for(self, item):
+        pos = self._positions.get(item)
+        if pos is None:
+            return None
+        slot = self._visible.get(pos)
+        if slot is None or slot['item'] != item:
+            return None
+        return slot
+
+    def _new_slot(self):
+        c = self.canvas
+        tag = f"card{self._slot_count}"
+        self._slot_count += 1
+        colors = self.colors
+        slot = {
+            'tag': tag,
+            'item': None,
+            'rect': c.create_rectangle(0, 0, 0, 0, fill=colors['card'], outline='', tags=(tag,)),
+            'art': c.create_image(0, 0, anchor='n', tags=(tag,)),
+            'placeholder': c.create_text(0, 0, text="🎼", font=("Arial", 40), fill=colors['accent'],
+                                         anchor='n', tags=(tag,)),
+            'title': c.create_text(0, 0, font=("Segoe UI", 11, "bold"), fill=colors['text'], anchor='n',
+                                   justify='center', width=self.CARD_W - 30, tags=(tag,)),
+            'artist': c.create_text(0, 0, font=("Segoe UI", 9), fill=colors['subtext'], anchor='nw', tags=(tag,)),
+            'duration': c.create_text(0, 0, font=("Segoe UI", 9), fill=colors['subtext'], anchor='nw', tags=(tag,)),
+        }
+        c.tag_bind(tag, '<Button-1>', lambda e, s=slot: self._activate(s))
+        c.tag_bind(tag, self._secondary_button, lambda e, s=slot: self._secondary(s))
+        c.tag_bind(tag, '<Enter>', lambda e, s=slot: self._set_hover(s))
+        c.tag_bind(tag, '<Leave>', lambda e, s=slot: self._clear_hover(s))
+        return slot
+
+    def _release(self, pos):
+        slot = self._visible.pop(pos)
+        slot['item'] = None
+        self.canvas.itemconfigure(slot['tag'], state='hidden')
+        if self._hover_slot is slot:
+            self._hover_slot = None
+        self._free.append(slot)
+
+    def _release_all(self):
+        for pos in list(self._visible):
+            self._release(pos)
+
+    def _place(self, slot, pos):
+        c = self.canvas
+        x0, y0 = self._origin(pos)
+        cx = x0 + self.CARD_W / 2
+        c.coords(slot['rect'], x0, y0, x0 + self.CARD_W, y0 + self.CARD_H)
+        c.coords(slot['art'], cx, y0 + self.ART_TOP)
+        c.coords(slot['placeholder'], cx, y0 + self.ART_TOP)
+        c.coords(slot['title'], cx, y0 + 104)
+        c.coords(slot['artist'], x0 + 15, y0 + self.CARD_H - 46)
+        c.coords(slot['duration'], x0 + 15, y0 + self.CARD_H - 26)
+
+    def _card_color(self, slot):
+        if slot['item'] is not None and slot['item'] == self.selected_item:
+            return self.colors['selected']
+        if slot is self._hover_slot:
+            return self.colors['hover']
+        return self.colors['card']
+
+    def _fill(self, slot):
+        """Write texts, art and colour for the slot's current item; returns False if art is missing."""
+        c = self.canvas
+        item = slot['item']
+        title, artist, duration = self.describe(item)
+        c.itemconfigure(slot['tag'], state='normal')
+        c.itemconfigure(slot['title'], text=title)
+        c.itemconfigure(slot['artist'], text=artist)
+        c.itemconfigure(slot['duration'], text=duration)
+        c.itemconfigure(slot['rect'], fill=self._card_color(slot))
+        photo = self.art_for(item) if self.art_for else None
+        if photo is not None:
+            c.itemconfigure(slot['art'], image=photo)
+            c.itemconfigure(slot['placeholder'], state='hidden')
+            return True
+        c.itemconfigure(slot['art'], image='', state='hidden')
+        return False
+
+    # ------------------ RENDER ------------------
+    def _render(self):
+        if self._rendering or not self.canvas.winfo_exists():
+            return
+        self._rendering = True
+        try:
+            c = self.canvas
+            row_h = self._row_height()
+            top = c.canvasy(0)
+            bottom = top + c.winfo_height()
+            first_row = max(0, int((top - self.GAP) // row_h) - self.OVERSCAN_ROWS)
+            last_row = int(bottom // row_h) + self.OVERSCAN_ROWS
+            first = first_row * self.cols
+            last = min(len(self.items), (last_row + 1) * self.cols)
+
+            for pos in [p for p in self._visible if p < first or p >= last]:
+                self._release(pos)
+
+            missing = []
+            for pos in range(first, last):
+                item = self.items[pos]
+                slot = self._visible.get(pos)
+                if slot is not None and slot['item'] == item:
+                    continue
+                if slot is None:
+                    slot = self._free.pop() if self._free else self._new_slot()
+                    self._visible[pos] = slot
+                slot['item'] = item
+                self._place(slot, pos)
+                if not self._fill(slot):
+                    missing.append(item)
+            if missing and self.on_missing_art:
+                self.on_missing_art(missing)
+        finally:
+            self._rendering = False
+
+    # ------------------ INTERACTION ------------------
+    def _activate(self, slot):
+        if slot['item'] is not None:
+            self.on_activate(slot['item'])
+
+    def _secondary(self, slot):
+        if slot['item'] is not None and self.on_secondary is not None:
+            self.on_secondary(slot['item'])
+
+    def _set_hover(self, slot):
+        self._hover_slot = slot
+        self.canvas.itemconfigure(slot['rect'], fill=self._card_color(slot))
+
+    def _clear_hover(self, slot):
+        if self._hover_slot is slot:
+            self._hover_slot = None
+        self.canvas.itemconfigure(slot['rect'], fill=self._card_color(slot))
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import deque
+
+# ============================================================================
+# GAPLESS HANDOFF
+# The predicted next track is handed to pygame.mixer.music.queue() while the
+# current one is still playing, so the mixer switches streams inside its own
+# audio callback instead of waiting for the UI to notice the end, load a file
+# and start it. The queued file is read ahead into the OS page cache so the
+# switch never waits on the disk.
+# ============================================================================
+
+WARM_CHUNK = 1 << 20
+
+
+def warm_file(path):
+    """Pull path's pages into the OS page cache ahead of playback."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, WARM_CHUNK):
+                pass
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class GaplessQueue:
+    def __init__(self, music, frequency=44100, buffer=512):
+        """
+        music: the pygame.mixer.music module
+        frequency/buffer: mixer settings; one buffer is the worst-case handoff delay
+        """
+        self.music = music
+        # Nominal, not measured: the switch happens inside SDL's audio callback, out of our sight
+        self.handoff_ms = buffer * 1000.0 / frequency
+        self.queued = None          # (key, path) waiting behind the current track
+        self.handoffs = 0           # track changes taken from the mixer's queue
+        self.gaps = deque(maxlen=64)    # measured reload gaps (ms)
+        self._reload_started = None
+
+    def prepare(self, key, path):
+        """Queue path to start as soon as the current track ends; returns True if queued."""
+        if self.queued is not None and self.queued[0] == key:
+            return True
+        try:
+            # Replaces whatever was queued before
+            self.music.queue(path)
+        except Exception:
+            self.queued = None
+            return False
+        self.queued = (key, path)
+        threading.Thread(target=warm_file, args=(path,), daemon=True).start()
+        return True
+
+    def clear(self):
+        """Forget the queued track (music.load() drops pygame's queue)."""
+        self.queued = None
+
+    def take(self):
+        """The mixer has switched to the queued track: return its key."""
+        if self.queued is None:
+            return None
+        key = self.queued[0]
+        self.queued = None
+        self.handoffs += 1
+        return key
+
+    # ------------------ GAP MEASUREMENT ------------------
+    def reload_started(self):
+        """The track ended without a queued successor; time the load+play that follows."""
+        self._reload_started = time.perf_counter()
+
+    def reload_finished(self):
+        if self._reload_started is not None:
+            self.gaps.append((time.perf_counter() - self._reload_started) * 1000.0)
+            self._reload_started = None
+
+    def stats(self):
+        """Track changes so far: queued handoffs with their nominal delay, and measured reload gaps in ms."""
+        gaps = list(self.gaps)
+        return {
+            'handoffs': self.handoffs,
+            'handoff_nominal_ms': self.handoff_ms,
+            'reloads': len(gaps),
+            'last_ms': gaps[-1] if gaps else 0.0,
+            'max_ms': max(gaps) if gaps else 0.0,
+            'avg_ms': sum(gaps) / len(gaps) if gaps else 0.0,
+        }
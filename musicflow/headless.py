@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+
+from musicflow.metadata_store import cache_dir_for
+from musicflow.player_core import PlayerCore
+
+# ============================================================================
+# HEADLESS PLAYER
+# PlayerCore on an asyncio loop, without Tk, controlled over a local socket:
+# a Unix domain socket next to the music (localhost TCP with --port, or where
+# Unix sockets are unavailable). The protocol is one JSON object per line each
+# way, e.g. {"cmd": "play", "index": 3} -> {"ok": true, "status": {...}}.
+# Commands run directly on the loop thread, so a round trip is the command's
+# own cost plus two socket writes; an idle player has no timers running.
+#
+#   python -m musicflow.headless [--folder ./songs] [--socket PATH | --port N]
+#   python -m musicflow.headless --send play index=3
+# ============================================================================
+
+SOCKET_NAME = "control.sock"
+DEFAULT_FOLDER = "./songs"
+# Requests longer than this are rejected rather than buffered
+MAX_LINE = 64 * 1024
+
+
+class LoopTimers:
+    """Tk's after()/after_cancel() on an asyncio loop, for helpers written against a Tk root."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def after(self, ms, fn, *args):
+        return self.loop.call_later(ms / 1000.0, fn, *args)
+
+    def after_cancel(self, handle):
+        handle.cancel()
+
+
+def default_socket_path(music_folder):
+    return os.path.join(cache_dir_for(music_folder), SOCKET_NAME)
+
+
+class ControlServer:
+    def __init__(self, core, socket_path=None, host='127.0.0.1', port=None):
+        """
+        socket_path: Unix socket to listen on (ignored when port is given)
+        port: listen on host:port over TCP instead
+        """
+        self.core = core
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.stopped = asyncio.Event()
+        self._server = None
+        self._clients = {}          # connection task -> its writer
+        self._commands = {
+            'play': self._play,
+            'pause': lambda req: core.pause(),
+            'resume': lambda req: core.resume(),
+            'toggle': lambda req: core.toggle(),
+            'stop': lambda req: core.stop(),
+            'next': lambda req: core.next(),
+            'previous': lambda req: core.previous(),
+            'seek': lambda req: core.seek(req['position']),
+            'queue': self._queue,
+            'clear_queue': lambda req: core.clear_queue(),
+            'search': lambda req: core.search(str(req.get('query', '')), int(req.get('limit', 20))),
+            'volume': lambda req: core.set_volume(req['level']),
+            'shuffle': lambda req: core.set_shuffle(req.get('on', not core.shuffle_mode)),
+            'repeat': lambda req: core.set_repeat(req.get('mode', core.repeat_mode + 1)),
+            'status': lambda req: None,
+            'quit': lambda req: self.stopped.set(),
+        }
+
+    async def start(self):
+        if self.port is not None or not hasattr(socket, 'AF_UNIX'):
+            self._server = await asyncio.start_server(self._serve, self.host, self.port or 0, limit=MAX_LINE)
+            self.port = self._server.sockets[0].getsockname()[1]
+            return f"{self.host}:{self.port}"
+        if os.path.exists(self.socket_path):
+            # Left behind by a player that did not shut down cleanly
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, self.socket_path, limit=MAX_LINE)
+        os.chmod(self.socket_path, 0o600)
+        return self.socket_path
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Hang up on connected clients and let their handlers finish before the loop goes away
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        if self.port is None and self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _serve(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            # Replies are single small writes; don't let Nagle hold them back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                if not line:
+                    break
+                writer.write(json.dumps(self.dispatch(line)).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    def dispatch(self, line):
+        """Run one request line and return the reply."""
+        try:
+            request = json.loads(line)
+            handler = self._commands.get(request.get('cmd'))
+        except (ValueError, AttributeError):
+            return {'ok': False, 'error': "expected a JSON object with a 'cmd'"}
+        if handler is None:
+            return {'ok': False, 'error': f"unknown command: {request.get('cmd')!r}",
+                    'commands': sorted(self._commands)}
+        try:
+            result = handler(request)
+        except KeyError as e:
+            return {'ok': False, 'error': f"missing argument: {e.args[0]}"}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+        reply = {'ok': result is not False, 'status': self.core.status()}
+        if request['cmd'] == 'search':
+            reply['results'] = result
+        return reply
+
+    def _target(self, request):
+        tid = self.core.resolve(request.get('index'), request.get('path'), request.get('track'))
+        if tid is None and any(k in request for k in ('index', 'path', 'track')):
+            raise ValueError("no such track")
+        return tid
+
+    def _play(self, request):
+        return self.core.play(self._target(request))
+
+    def _queue(self, request):
+        tid = self._target(request)
+        if tid is None:
+            raise KeyError('index')
+        return self.core.enqueue(tid)
+
+
+async def serve(music_folder, socket_path=None, port=None):
+    loop = asyncio.get_running_loop()
+    core = PlayerCore(music_folder, LoopTimers(loop))
+    count = await loop.run_in_executor(None, core.load)
+    # Commands run on this loop; a first play must not sit there waiting for the audio device
+    await loop.run_in_executor(None, core.mixer.wait)
+    server = ControlServer(core, socket_path or default_socket_path(music_folder), port=port)
+    address = await server.start()
+    print(f"MusicFlow headless: {count} tracks, listening on {address}")
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, server.stopped.set)
+        except (NotImplementedError, RuntimeError):
+            pass                    # Windows: Ctrl+C still raises KeyboardInterrupt
+    try:
+        await server.stopped.wait()
+    finally:
+        await server.close()
+        core.close()
+
+
+def send(request, socket_path=None, port=None, host='127.0.0.1'):
+    """Send one request to a running headless player and return its reply."""
+    if port is not None:
+        conn = socket.create_connection((host, port))
+    else:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+    with conn, conn.makefile('rwb') as f:
+        f.write(json.dumps(request).encode('utf-8') + b'\n')
+        f.flush()
+        return json.loads(f.readline())
+
+
+def _parse_send(words):
+    """['play', 'index=3'] -> {'cmd': 'play', 'index': 3}; values are JSON where they parse."""
+    request = {'cmd': words[0]}
+    for word in words[1:]:
+        key, _, value = word.partition('=')
+        try:
+            request[key] = json.loads(value)
+        except ValueError:
+            request[key] = value
+    return request
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m musicflow.headless',
+                                     description="MusicFlow player without a window, controlled over a local socket")
+    parser.add_argument('--folder', default=DEFAULT_FOLDER, help="music folder (default: %(default)s)")
+    parser.add_argument('--socket', help="Unix socket path (default: <folder>/.musicflow/control.sock)")
+    parser.add_argument('--port', type=int, help="use localhost TCP on this port instead of a Unix socket")
+    parser.add_argument('--send', nargs='+', metavar='CMD', help="send CMD [key=value ...] to a running player")
+    args = parser.parse_args(argv)
+    socket_path = args.socket or default_socket_path(args.folder)
+    if args.send:
+        print(json.dumps(send(_parse_send(args.send), socket_path, args.port), indent=2))
+        return 0
+    # The mixer end event needs SDL's event queue, which works without a display this way
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    try:
+        asyncio.run(serve(args.folder, socket_path, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import importlib
+import importlib.util
+
+# ============================================================================
+# LAZY IMPORTS
+# pygame (which drags in numpy and pkg_resources), PIL and mutagen cost a few
+# hundred milliseconds to import, far more than drawing the window. Modules
+# that only need them inside functions bind a LazyModule instead: the real
+# import happens on first attribute access, after which the module's names
+# are copied onto the proxy so later lookups cost the same as on the module.
+# ============================================================================
+
+
+def is_available(name):
+    """True if name can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_lazy_name'])
+            self.__dict__.update(module.__dict__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        # Only reached for names not copied yet: the first access, or a submodule
+        # imported after the copy (e.g. pygame.mixer once the mixer starts)
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_lazy_module'] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
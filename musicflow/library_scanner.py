@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import namedtuple
+
+from musicflow.metadata_store import CACHE_DIR_NAME
+
+# ============================================================================
+# INCREMENTAL LIBRARY SCANNER
+# Walks the music folder recursively with os.scandir and keeps a snapshot of
+# path -> (size, mtime_ns). A rescan compares against the snapshot and reports
+# only what was added, removed or changed, so a refresh of an unchanged library
+# costs one stat per file and nothing else.
+# ============================================================================
+
+SUPPORTED_FORMATS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.aac')
+
+
+class LibraryChanges(namedtuple('LibraryChanges', 'added removed changed')):
+    """Sorted path lists produced by a rescan; falsy when nothing changed."""
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def walk_library(music_folder, formats=SUPPORTED_FORMATS):
+    """Return {path: (size, mtime_ns)} for every supported file under music_folder."""
+    found = {}
+    stack = [music_folder]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Hidden folders include our own cache directory
+                        if not name.startswith('.') and name != CACHE_DIR_NAME:
+                            stack.append(entry.path)
+                    elif name.lower().endswith(formats):
+                        st = entry.stat()
+                        found[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    return found
+
+
+class LibraryScanner:
+    def __init__(self, music_folder, formats=SUPPORTED_FORMATS):
+        self.music_folder = music_folder
+        self.formats = tuple(formats)
+        self.snapshot = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def paths(self):
+        """All known tracks in library (path) order."""
+        return sorted(self.snapshot)
+
+    def rescan(self):
+        """Walk the folder again and return the LibraryChanges since the previous scan."""
+        with self._lock:
+            current = walk_library(self.music_folder, self.formats) if os.path.isdir(self.music_folder) else {}
+            old = self.snapshot
+            added = [p for p in current if p not in old]
+            removed = [p for p in old if p not in current]
+            changed = [p for p, sig in current.items() if p in old and old[p] != sig]
+            self.snapshot = current
+        return LibraryChanges(sorted(added), sorted(removed), sorted(changed))
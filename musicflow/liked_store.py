@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+
+from musicflow.metadata_store import cache_dir_for
+
+# ============================================================================
+# LIKED SONGS
+# Likes are kept as an append-only journal of "+path" / "-path" lines, so a
+# toggle is one buffered append; fsync runs on a background thread, at most
+# once per FSYNC_INTERVAL_S however many toggles arrived. When the journal
+# grows well past the number of liked tracks it is compacted in the
+# background: a new journal generation is started, the current set is
+# written as a snapshot tagged with that generation, and older journals are
+# deleted. Loading reads the snapshot and replays only newer journals, so
+# startup work is proportional to the number of likes, not to their history.
+# ============================================================================
+
+LIKED_DIR_NAME = "liked"
+SNAPSHOT_NAME = "snapshot.json"
+SNAPSHOT_VERSION = 1
+
+_JOURNAL_PREFIX = "journal."
+
+
+class LikedStore:
+    # Longest a toggle waits before it is fsynced to disk
+    FSYNC_INTERVAL_S = 0.5
+    # Compact once the journal holds this many more entries than there are likes
+    COMPACT_SLACK = 256
+
+    def __init__(self, music_folder):
+        self.music_folder = music_folder
+        self.root_dir = os.path.join(cache_dir_for(music_folder), LIKED_DIR_NAME)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._liked = {}                    # relative path -> None, in the order liked
+        self._journal = None
+        self._journal_entries = 0
+        self._generation = 0
+        self._dirty = False
+        self._compacting = False
+        self._closed = False
+        self._load()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    # ------------------ PUBLIC API ------------------
+    def __len__(self):
+        return len(self._liked)
+
+    def is_liked(self, path):
+        return self._key(path) in self._liked
+
+    def paths(self):
+        """Liked tracks as full paths, most recently liked first."""
+        with self._lock:
+            keys = list(self._liked)
+        folder = self.music_folder
+        # Keys use '/' on every platform so the store survives moving the library between systems
+        return [os.path.join(folder, key.replace('/', os.sep)) for key in reversed(keys)]
+
+    def set_liked(self, path, liked):
+        """Like or unlike path; returns True if that changed anything."""
+        key = self._key(path)
+        with self._lock:
+            if self._closed or (key in self._liked) == liked:
+                return False
+            if liked:
+                self._liked[key] = None
+            else:
+                del self._liked[key]
+            self._append(('+' if liked else '-') + key)
+            compact = (not self._compacting
+                       and self._journal_entries > len(self._liked) + self.COMPACT_SLACK)
+            if compact:
+                self._compacting = True
+        if compact:
+            threading.Thread(target=self._compact, daemon=True).start()
+        return True
+
+    def toggle(self, path):
+        """Flip path's like; returns the new state."""
+        liked = not self.is_liked(path)
+        self.set_liked(path, liked)
+        return liked
+
+    def close(self):
+        """Flush and fsync pending toggles and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._sync()
+            self._journal.close()
+            self._cond.notify()
+
+    # ------------------ JOURNAL ------------------
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.music_folder)).replace(os.sep, '/')
+
+    def _journal_path(self, generation):
+        return os.path.join(self.root_dir, f"{_JOURNAL_PREFIX}{generation}")
+
+    def _journals(self):
+        """(generation, path) of the journal files on disk, oldest first."""
+        found = []
+        for name in os.listdir(self.root_dir):
+            if name.startswith(_JOURNAL_PREFIX) and name[len(_JOURNAL_PREFIX):].isdigit():
+                found.append((int(name[len(_JOURNAL_PREFIX):]), os.path.join(self.root_dir, name)))
+        return sorted(found)
+
+    def _load(self):
+        generation = 0
+        try:
+            with open(os.path.join(self.root_dir, SNAPSHOT_NAME), encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') == SNAPSHOT_VERSION:
+                generation = int(snapshot['generation'])
+                self._liked = dict.fromkeys(snapshot['liked'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        entries = 0
+        for gen, path in self._journals():
+            if gen < generation:
+                # Already folded into the snapshot; left behind by an interrupted compaction
+                self._remove(path)
+                continue
+            with open(path, 'rb') as f:
+                for line in f:
+                    # A torn last line (crash mid-append) has no newline and is ignored
+                    if not line.endswith(b'\n'):
+                        break
+                    entry = line[:-1].decode('utf-8', 'surrogateescape')
+                    if entry[:1] == '+':
+                        self._liked.pop(entry[1:], None)
+                        self._liked[entry[1:]] = None
+                    elif entry[:1] == '-':
+                        self._liked.pop(entry[1:], None)
+                    entries += 1
+            generation = max(generation, gen)
+        self._generation = generation
+        self._journal_entries = entries
+        self._journal = open(self._journal_path(generation), 'ab')
+        # Chop a torn tail so new entries start on a fresh line
+        self._journal.truncate(self._valid_length(self._journal_path(generation)))
+
+    @staticmethod
+    def _valid_length(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return data.rfind(b'\n') + 1
+
+    def _append(self, entry):
+        """Write one entry (caller holds the lock); the flusher makes it durable."""
+        self._journal.write(entry.encode('utf-8', 'surrogateescape') + b'\n')
+        # Flushed to the OS right away, so only a power loss can cost the last interval
+        self._journal.flush()
+        self._journal_entries += 1
+        if not self._dirty:
+            self._dirty = True
+            self._cond.notify()
+
+    def _sync(self):
+        if self._dirty:
+            self._dirty = False
+            try:
+                os.fsync(self._journal.fileno())
+            except OSError as e:
+                print("Could not sync liked songs:", e)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                # Let more toggles pile up, then sync them all at once
+                self._cond.wait(self.FSYNC_INTERVAL_S)
+                if self._closed:
+                    return
+                self._dirty = False
+                # A private descriptor: the sync runs unlocked while compaction may swap journals
+                fd = os.dup(self._journal.fileno())
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                print("Could not sync liked songs:", e)
+            finally:
+                os.close(fd)
+
+    # ------------------ COMPACTION ------------------
+    def _compact(self):
+        try:
+            with self._lock:
+                if self._closed:
+                    return
+                # Later toggles go to a fresh journal; the snapshot covers everything before it
+                self._sync()
+                self._journal.close()
+                self._generation += 1
+                generation = self._generation
+                self._journal = open(self._journal_path(generation), 'ab')
+                self._journal_entries = 0
+                liked = list(self._liked)
+            snapshot_path = os.path.join(self.root_dir, SNAPSHOT_NAME)
+            tmp = snapshot_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': SNAPSHOT_VERSION, 'generation': generation, 'liked': liked}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, snapshot_path)
+            for gen, path in self._journals():
+                if gen < generation:
+                    self._remove(path)
+        except Exception as e:
+            print("Liked songs compaction failed:", e)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
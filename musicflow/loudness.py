@@ -0,0 +1,183 @@
+import math
+import os
+import shutil
+from collections import deque
+
+from musicflow.pcm import NUMPY_AVAILABLE, np, pcm_chunks
+
+# ============================================================================
+# LOUDNESS ANALYSIS (EBU R128 / ITU-R BS.1770)
+# Integrated loudness per track: K-weighted mean square over 400 ms blocks
+# (75% overlap), gated at -70 LUFS and then 10 LU below the ungated mean.
+# The K-weighting filter is applied in the frequency domain, one vectorised
+# FFT over all blocks of a chunk at a time. The result is stored as a gain
+# in dB that brings the track to TARGET_LUFS; playback only has to multiply
+# it into the mixer volume.
+# ============================================================================
+
+TARGET_LUFS = -18.0
+ANALYSIS_RATE = 48000
+
+_BLOCK_S = 0.4
+_HOP_S = 0.1
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+
+
+def _biquad_power(b, a, freqs, rate):
+    """|H(f)|^2 of a biquad at freqs (Hz)."""
+    z = np.exp(-1j * 2 * np.pi * freqs / rate)
+    num = b[0] + b[1] * z + b[2] * z * z
+    den = a[0] + a[1] * z + a[2] * z * z
+    return np.abs(num / den) ** 2
+
+
+def k_weighting(freqs, rate):
+    """Power response of the BS.1770 K-weighting (high shelf + high pass) at freqs."""
+    # Stage 1: high shelf, +4 dB above ~1.7 kHz
+    gain_db, f0, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0)
+    shelf_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    # Stage 2: high pass at ~38 Hz
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1 + k / q + k * k
+    hp_b = (1.0, -2.0, 1.0)
+    hp_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    return _biquad_power(shelf_b, shelf_a, freqs, rate) * _biquad_power(hp_b, hp_a, freqs, rate)
+
+
+class LoudnessMeter:
+    """Streaming integrated-loudness meter; feed int16 (frames x channels) chunks."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.block = int(round(_BLOCK_S * rate))
+        self.hop = int(round(_HOP_S * rate))
+        weights = k_weighting(np.fft.rfftfreq(self.block, 1.0 / rate), rate)
+        # Parseval for a real FFT: interior bins stand for two (positive and negative)
+        weights[1:(self.block + 1) // 2] *= 2
+        self._weights = weights / (self.block * self.block)
+        self._carry = None
+        self._powers = []
+
+    def feed(self, pcm):
+        samples = pcm.astype(np.float32) / 32768.0
+        if self._carry is not None:
+            samples = np.concatenate((self._carry, samples))
+        count = (len(samples) - self.block) // self.hop + 1 if len(samples) >= self.block else 0
+        if count > 0:
+            # blocks x block-length x channels views, no copy
+            windows = np.lib.stride_tricks.sliding_window_view(samples, self.block, axis=0)[::self.hop][:count]
+            spectrum = np.fft.rfft(windows, axis=-1)
+            energy = (spectrum.real ** 2 + spectrum.imag ** 2) @ self._weights
+            # Channel mean squares summed with unit weights (L, R)
+            self._powers.append(energy.sum(axis=1))
+        self._carry = samples[count * self.hop:]
+
+    def integrated(self):
+        """Gated integrated loudness in LUFS, or None for silence / too little audio."""
+        if not self._powers:
+            return None
+        powers = np.concatenate(self._powers)
+        with np.errstate(divide='ignore'):
+            loudness = -0.691 + 10 * np.log10(powers)
+        gated = powers[loudness > _ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+        relative = -0.691 + 10 * math.log10(gated.mean()) + _RELATIVE_GATE
+        gated = powers[(loudness > _ABSOLUTE_GATE) & (loudness > relative)]
+        return -0.691 + 10 * math.log10(gated.mean())
+
+
+def track_gain(path, ffmpeg=None, target=TARGET_LUFS):
+    """Gain in dB that brings path to target loudness (None if it could not be measured)."""
+    meter = None
+    for rate, pcm in pcm_chunks(path, ffmpeg, rate=ANALYSIS_RATE, channels=2):
+        if meter is None:
+            meter = LoudnessMeter(rate)
+        meter.feed(pcm)
+    loudness = meter.integrated() if meter is not None else None
+    if loudness is None:
+        return None
+    return round(target - loudness, 2)
+
+
+def _measure_batch(paths, ffmpeg):
+    """Measure a batch, never raising for a single bad file."""
+    results = []
+    for p in paths:
+        try:
+            results.append((p, track_gain(p, ffmpeg)))
+        except Exception:
+            results.append((p, None))
+    return results
+
+
+def _analyze_batch(paths, ffmpeg):
+    """Worker process entry point: open a decode-only mixer, then measure a batch."""
+    import pygame
+    if not pygame.mixer.get_init():
+        # A spawned worker has no mixer of its own and must not grab the audio device
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        try:
+            pygame.mixer.init(frequency=ANALYSIS_RATE, size=-16, channels=2)
+        except Exception:
+            pass
+    return _measure_batch(paths, ffmpeg)
+
+
+class LoudnessPool:
+    def __init__(self, workers=1, batch_size=8, mixer=None):
+        """
+        workers: processes measuring in parallel (1 = in the calling thread)
+        batch_size: tracks per task; each finished batch can be saved, so an
+        interrupted pass loses at most one batch
+        mixer: the app's MixerBoot; in the calling thread, tracks ffmpeg cannot
+        decode go through that mixer, so the pass waits for it to start
+        """
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.mixer = mixer
+        self.ffmpeg = shutil.which('ffmpeg')
+
+    def analyze(self, paths):
+        """Yield (batch, done, total); batch is a list of (path, gain_db or None)."""
+        if not NUMPY_AVAILABLE:
+            return
+        paths = list(paths)
+        total = len(paths)
+        batches = [paths[i:i + self.batch_size] for i in range(0, total, self.batch_size)]
+        done = 0
+        if self.workers <= 1:
+            # Never open a mixer here: this process's only mixer belongs to playback
+            if self.mixer is not None:
+                self.mixer.wait()
+            for batch in batches:
+                results = _measure_batch(batch, self.ffmpeg)
+                done += len(results)
+                yield results, done, total
+            return
+
+        # Only the multi-process path needs these (and they are slow to import)
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            pending = deque()
+            queued = iter(batches)
+            for batch in queued:
+                pending.append(pool.submit(_analyze_batch, batch, self.ffmpeg))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                results = pending.popleft().result()
+                next_batch = next(queued, None)
+                if next_batch is not None:
+                    pending.append(pool.submit(_analyze_batch, next_batch, self.ffmpeg))
+                done += len(results)
+                yield results, done, total
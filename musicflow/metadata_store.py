@@ -0,0 +1,198 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+# ============================================================================
+# PERSISTENT METADATA STORE
+# SQLite file next to the music, keyed by (path, size, mtime_ns) so unchanged
+# files are never parsed twice.
+# ============================================================================
+
+CACHE_DIR_NAME = ".musicflow"
+DB_NAME = "library.db"
+
+# Metadata fields persisted per track, with their SQLite column types.
+META_COLUMNS = (
+    ("title", "TEXT"),
+    ("artist", "TEXT"),
+    ("duration", "REAL"),
+    ("art_key", "TEXT"),
+    ("gain", "REAL"),       # loudness normalization in dB, NULL until analyzed
+)
+
+
+def cache_dir_for(music_folder):
+    """Return (and create) the hidden cache directory for a music folder."""
+    path = os.path.join(music_folder, CACHE_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_signature(path):
+    """Return the (size, mtime_ns) pair used to detect changed files."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_cache_key(path):
+    """Hex key for data derived from a file's contents; it changes whenever the file does."""
+    size, mtime_ns = file_signature(path)
+    raw = f"{os.path.abspath(path)}\0{size}\0{mtime_ns}".encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write bytes to path through a temp file and a rename, so readers never see a partial file.
+
+    The temp name is unique to this process and thread: the GUI's workers, the
+    headless player and the stream server may all build the same entry at once.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class MetadataStore:
+    def __init__(self, music_folder):
+        self.music_folder = music_folder
+        self.db_path = os.path.join(cache_dir_for(music_folder), DB_NAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)"
+        )
+        self._ensure_columns()
+        self._conn.commit()
+
+    def _ensure_columns(self):
+        """Add metadata columns missing from databases written by older versions."""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(tracks)")}
+        for name, sql_type in META_COLUMNS:
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE tracks ADD COLUMN {name} {sql_type}")
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def partition(self, paths):
+        """Split paths into ({path: meta} still valid on disk, [paths needing a parse])."""
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM tracks")
+            fields = [d[0] for d in cur.description][3:]
+            stored = {row[0]: row for row in cur.fetchall()}
+
+        cached, stale = {}, []
+        for p in paths:
+            row = stored.get(self._key(p))
+            try:
+                signature = file_signature(p)
+            except OSError:
+                stale.append(p)
+                continue
+            if row is None or (row[1], row[2]) != signature:
+                stale.append(p)
+                continue
+            cached[p] = {f: v for f, v in zip(fields, row[3:]) if v is not None}
+        return cached, stale
+
+    def put_many(self, items):
+        """Store an iterable of (path, meta) pairs, stamping each with its current signature."""
+        records = []
+        for path, meta in items:
+            try:
+                size, mtime_ns = file_signature(path)
+            except OSError:
+                continue
+            records.append((self._key(path), size, mtime_ns) + tuple(meta.get(name) for name, _ in META_COLUMNS))
+        if not records:
+            return
+        cols = ["path", "size", "mtime_ns"] + [name for name, _ in META_COLUMNS]
+        sql = f"INSERT OR REPLACE INTO tracks ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        with self._lock:
+            self._conn.executemany(sql, records)
+            self._conn.commit()
+
+    def put(self, path, meta):
+        self.put_many([(path, meta)])
+
+    def prune(self, keep_paths):
+        """Drop entries for files that are no longer part of the library."""
+        keep = {self._key(p) for p in keep_paths}
+        with self._lock:
+            gone = [(row[0],) for row in self._conn.execute("SELECT path FROM tracks") if row[0] not in keep]
+            if gone:
+                self._conn.executemany("DELETE FROM tracks WHERE path = ?", gone)
+                self._conn.commit()
+        return len(gone)
+
+    def update_column(self, name, items):
+        """Set one metadata column from (path, value) pairs, only on rows that are still current.
+
+        Unlike put_many this leaves the other columns alone, so background
+        analyzers can fill in their field without rewriting the track.
+        """
+        if name not in {n for n, _ in META_COLUMNS}:
+            raise ValueError(f"Unknown metadata column: {name}")
+        records = []
+        for path, value in items:
+            try:
+                size, mtime_ns = file_signature(path)
+            except OSError:
+                continue
+            records.append((value, self._key(path), size, mtime_ns))
+        if not records:
+            return
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE tracks SET {name} = ? WHERE path = ? AND size = ? AND mtime_ns = ?", records)
+            self._conn.commit()
+
+    def missing(self, name, paths):
+        """The paths whose current row has no value in column name (or no row yet)."""
+        if name not in {n for n, _ in META_COLUMNS}:
+            raise ValueError(f"Unknown metadata column: {name}")
+        with self._lock:
+            stored = {row[0]: row[1:] for row in
+                      self._conn.execute(f"SELECT path, size, mtime_ns, {name} IS NOT NULL FROM tracks")}
+        todo = []
+        for p in paths:
+            row = stored.get(self._key(p))
+            if row is None or not row[2]:
+                todo.append(p)
+                continue
+            try:
+                if (row[0], row[1]) != file_signature(p):
+                    todo.append(p)
+            except OSError:
+                continue
+        return todo
+
+    def remove_many(self, paths):
+        """Forget the given tracks (files deleted since the last scan)."""
+        gone = [(self._key(p),) for p in paths]
+        if not gone:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM tracks WHERE path = ?", gone)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+from musicflow.lazy import lazy_import
+
+pygame = lazy_import('pygame')
+
+# ============================================================================
+# BACKGROUND MIXER START
+# Importing pygame and opening the audio device take longer than building the
+# whole UI, and nothing needs sound before the user presses play. MixerBoot
+# does both on a worker thread while the window comes up. Objects that drive
+# playback get a MusicProxy in place of pygame.mixer.music: it forwards every
+# call, waiting for the mixer only if it is used before it is ready.
+# ============================================================================
+
+
+class MusicProxy:
+    """Stands in for pygame.mixer.music until (and after) the mixer is up."""
+
+    def __init__(self, boot):
+        self._boot = boot
+
+    def __getattr__(self, attr):
+        self._boot.wait()
+        return getattr(pygame.mixer.music, attr)
+
+
+class MixerBoot:
+    def __init__(self, frequency=44100, buffer=512, channels=2, on_ready=None):
+        """
+        frequency/buffer/channels: passed to pygame.mixer.init
+        on_ready(error) is called from the worker thread once the mixer is up
+        (error is None) or failed to start
+        """
+        self.frequency = frequency
+        self.buffer = buffer
+        self.channels = channels
+        self.on_ready = on_ready
+        self.music = MusicProxy(self)
+        self.error = None
+        self.import_s = None
+        self.init_s = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the mixer is up (starting it here if start() was never called)."""
+        if self._thread is None:
+            self.start()
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+            mixer = pygame.mixer
+            self.import_s = time.perf_counter() - started
+            if not mixer.get_init():
+                mixer.init(frequency=self.frequency, size=-16, channels=self.channels, buffer=self.buffer)
+        except Exception as e:
+            print("Could not init mixer:", e)
+            self.error = e
+        self.init_s = time.perf_counter() - started - (self.import_s or 0)
+        self._ready.set()
+        if self.on_ready is not None:
+            try:
+                self.on_ready(self.error)
+            except Exception as e:
+                print("Mixer ready callback failed:", e)
@@ -0,0 +1,69 @@
+import subprocess
+
+from musicflow.lazy import is_available, lazy_import
+
+# Both load on first use, so importing an analyzer costs nothing at startup
+pygame = lazy_import('pygame')
+np = lazy_import('numpy')
+NUMPY_AVAILABLE = is_available('numpy')
+
+# ============================================================================
+# PCM DECODING FOR ANALYSIS
+# Background analyzers (waveform peaks, loudness) read tracks as int16 PCM in
+# chunks. ffmpeg, when available, streams the decode through a pipe; pygame
+# can only decode a whole file into memory, so its fallback hands out views
+# of that buffer in chunks instead.
+# ============================================================================
+
+_FFMPEG_READ = 1 << 16
+# Frames per chunk when pygame decoded the whole file
+_PYGAME_CHUNK = 1 << 16
+
+
+def _ffmpeg_chunks(path, ffmpeg, rate, channels):
+    cmd = [ffmpeg, '-nostdin', '-v', 'error', '-i', path,
+           '-f', 's16le', '-ac', str(channels), '-ar', str(rate), '-']
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    frame_bytes = 2 * channels
+    try:
+        pending = b''
+        while True:
+            data = proc.stdout.read(_FFMPEG_READ)
+            if not data:
+                break
+            data = pending + data
+            cut = len(data) - len(data) % frame_bytes
+            pending = data[cut:]
+            yield np.frombuffer(data[:cut], np.int16).reshape(-1, channels)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def _pygame_chunks(path):
+    init = pygame.mixer.get_init()
+    if not init or init[1] != -16:
+        return
+    sound = pygame.mixer.Sound(path)
+    pcm = np.frombuffer(sound.get_raw(), np.int16).reshape(-1, init[2])
+    del sound
+    for start in range(0, len(pcm), _PYGAME_CHUNK):
+        yield pcm[start:start + _PYGAME_CHUNK]
+
+
+def pcm_chunks(path, ffmpeg=None, rate=44100, channels=2):
+    """Yield (sample_rate, pcm) for path, pcm being int16 arrays of shape (frames, channels).
+
+    ffmpeg (a path to the binary) decodes at the requested rate and channel
+    count; otherwise pygame decodes at whatever the mixer was opened with.
+    """
+    if ffmpeg:
+        produced = False
+        for pcm in _ffmpeg_chunks(path, ffmpeg, rate, channels):
+            produced = True
+            yield rate, pcm
+        if produced:
+            return
+    init = pygame.mixer.get_init()
+    for pcm in _pygame_chunks(path):
+        yield init[0], pcm
@@ -0,0 +1,227 @@
+import heapq
+import itertools
+import os
+import shutil
+import struct
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+
+from musicflow.metadata_store import cache_dir_for, file_cache_key, write_atomic
+from musicflow.pcm import NUMPY_AVAILABLE, np, pcm_chunks
+
+# ============================================================================
+# WAVEFORM PEAKS
+# A background worker decodes each track in chunks, folds every chunk into
+# per-block min/max with NumPy as it arrives, and finally merges the blocks
+# into a fixed number of buckets. The result (one signed byte per bucket edge)
+# is written to a small binary file per track, so the UI only ever reads a few
+# KB from disk. Requests are prioritised: the playing track, then the next
+# one, then the rest of the library.
+# ============================================================================
+
+PEAKS_DIR_NAME = "peaks"
+PEAKS_VERSION = 1
+PEAK_BUCKETS = 1024
+
+PRIORITY_CURRENT = 0
+PRIORITY_NEXT = 1
+PRIORITY_LIBRARY = 2
+
+_HEADER = struct.Struct('<4sHHf')   # magic, version, buckets, duration
+_MAGIC = b'MFPK'
+
+# Samples folded into one min/max pair while streaming
+_BLOCK = 256
+# Rate ffmpeg decodes at; peaks need far less than the playback rate
+_FFMPEG_RATE = 11025
+
+
+class Peaks(namedtuple('Peaks', 'mins maxs duration')):
+    """Per-bucket minimum and maximum (array('b'), -127..127) over a track of duration seconds."""
+    __slots__ = ()
+
+    def to_bytes(self):
+        return (_HEADER.pack(_MAGIC, PEAKS_VERSION, len(self.mins), self.duration)
+                + self.mins.tobytes() + self.maxs.tobytes())
+
+    @classmethod
+    def from_bytes(cls, blob):
+        magic, version, buckets, duration = _HEADER.unpack_from(blob)
+        body = blob[_HEADER.size:]
+        if magic != _MAGIC or version != PEAKS_VERSION or len(body) != 2 * buckets:
+            return None
+        mins, maxs = array('b'), array('b')
+        mins.frombytes(body[:buckets])
+        maxs.frombytes(body[buckets:])
+        return cls(mins, maxs, duration)
+
+
+class PeakReducer:
+    """Folds streamed int16 PCM (frames x channels) into min/max buckets."""
+
+    def __init__(self):
+        self._mins = []
+        self._maxs = []
+        self._carry_lo = np.empty(0, np.int16)
+        self._carry_hi = np.empty(0, np.int16)
+        self.samples = 0
+
+    def feed(self, pcm):
+        if pcm.shape[1] > 1:
+            lo, hi = pcm.min(axis=1), pcm.max(axis=1)
+        else:
+            lo = hi = pcm[:, 0]
+        self.samples += len(lo)
+        if len(self._carry_lo):
+            lo = np.concatenate((self._carry_lo, lo))
+            hi = np.concatenate((self._carry_hi, hi))
+        whole = len(lo) - len(lo) % _BLOCK
+        if whole:
+            self._mins.append(lo[:whole].reshape(-1, _BLOCK).min(axis=1))
+            self._maxs.append(hi[:whole].reshape(-1, _BLOCK).max(axis=1))
+        self._carry_lo, self._carry_hi = lo[whole:].copy(), hi[whole:].copy()
+
+    def finish(self, buckets, rate):
+        mins = self._mins + ([self._carry_lo.min(keepdims=True)] if len(self._carry_lo) else [])
+        maxs = self._maxs + ([self._carry_hi.max(keepdims=True)] if len(self._carry_hi) else [])
+        if not mins:
+            return None
+        mins, maxs = np.concatenate(mins), np.concatenate(maxs)
+        buckets = min(buckets, len(mins))
+        edges = np.linspace(0, len(mins), buckets + 1).astype(np.intp)[:-1]
+        mins = np.minimum.reduceat(mins, edges).astype(np.int32) * 127 // 32768
+        maxs = np.maximum.reduceat(maxs, edges).astype(np.int32) * 127 // 32767
+        return Peaks(array('b', mins.astype(np.int8).tobytes()), array('b', maxs.astype(np.int8).tobytes()),
+                     self.samples / float(rate))
+
+
+def compute_peaks(path, buckets=PEAK_BUCKETS, ffmpeg=None):
+    """Decode path and reduce it to Peaks (None if it could not be decoded)."""
+    reducer = PeakReducer()
+    rate = _FFMPEG_RATE
+    for rate, pcm in pcm_chunks(path, ffmpeg, rate=_FFMPEG_RATE, channels=1):
+        reducer.feed(pcm)
+    return reducer.finish(buckets, rate)
+
+
+class PeakCache:
+    # Peaks kept in memory (about 2 KB each)
+    MEMORY_ENTRIES = 64
+    # Pause between library tracks so background work leaves the CPU to playback
+    LIBRARY_PAUSE_S = 0.2
+
+    def __init__(self, music_folder, on_ready=None, buckets=PEAK_BUCKETS):
+        """
+        on_ready(path, peaks) is called from the worker thread as tracks finish
+        buckets: resolution stored per track
+        """
+        self.music_folder = music_folder
+        self.root_dir = os.path.join(cache_dir_for(music_folder), PEAKS_DIR_NAME)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self.on_ready = on_ready
+        self.buckets = buckets
+        self.ffmpeg = shutil.which('ffmpeg')
+        self._memory = OrderedDict()
+        self._heap = []
+        self._queued = {}                   # path -> best priority waiting
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _cache_path(self, path):
+        key = file_cache_key(path)
+        return os.path.join(self.root_dir, key[:2], key + '.pk')
+
+    def get(self, path):
+        """Peaks already computed for path (memory or disk), else None. Never decodes."""
+        with self._cond:
+            peaks = self._memory.get(path)
+            if peaks is not None:
+                self._memory.move_to_end(path)
+                return peaks
+        try:
+            with open(self._cache_path(path), 'rb') as f:
+                peaks = Peaks.from_bytes(f.read())
+        except (OSError, struct.error):
+            return None
+        if peaks is not None:
+            self._remember(path, peaks)
+        return peaks
+
+    def request(self, path, priority=PRIORITY_LIBRARY):
+        """Queue path for the worker; a higher priority (lower number) jumps ahead."""
+        if not NUMPY_AVAILABLE or not path:
+            return
+        with self._cond:
+            if self._stopped or self._queued.get(path, priority + 1) <= priority:
+                return
+            self._queued[path] = priority
+            heapq.heappush(self._heap, (priority, next(self._seq), path))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def request_many(self, paths, priority=PRIORITY_LIBRARY):
+        for path in paths:
+            self.request(path, priority)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._queued.clear()
+            self._cond.notify()
+
+    # ------------------ INTERNALS ------------------
+    def _remember(self, path, peaks):
+        with self._cond:
+            self._memory[path] = peaks
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None, None
+                while self._heap:
+                    priority, _, path = heapq.heappop(self._heap)
+                    if self._queued.get(path) == priority:
+                        del self._queued[path]
+                        return path, priority
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            path, priority = self._next_job()
+            if path is None:
+                return
+            peaks = self.get(path)
+            if peaks is None:
+                peaks = self._compute(path)
+                if priority >= PRIORITY_LIBRARY:
+                    threading.Event().wait(self.LIBRARY_PAUSE_S)
+            if peaks is not None and self.on_ready is not None:
+                try:
+                    self.on_ready(path, peaks)
+                except Exception as e:
+                    print("Peaks callback failed:", e)
+
+    def _compute(self, path):
+        try:
+            peaks = compute_peaks(path, self.buckets, self.ffmpeg)
+        except Exception as e:
+            print("Waveform failed:", os.path.basename(path), e)
+            return None
+        if peaks is None:
+            return None
+        self._remember(path, peaks)
+        try:
+            write_atomic(self._cache_path(path), peaks.to_bytes())
+        except OSError as e:
+            print("Could not cache waveform:", e)
+        return peaks
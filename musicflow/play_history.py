@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+from musicflow.metadata_store import cache_dir_for
+
+# ============================================================================
+# PLAY HISTORY AND LISTENING STATISTICS
+# Every play is appended to an event log next to the music (one line per
+# play) and folded into running aggregates as it happens: play counts per
+# track and per artist, plus a fixed-size ring of the most recent plays.
+# Memory depends on the library, never on how long the session runs, and no
+# statistic ever rescans the history. The aggregates are saved as a snapshot
+# together with the log offset they cover, so a restart replays only the few
+# plays logged after the last snapshot.
+# ============================================================================
+
+HISTORY_LOG_NAME = "history.log"
+STATS_NAME = "history_stats.json"
+STATS_VERSION = 1
+
+
+class CountRanking:
+    """Counters with top-k in O(k log n): a max-heap whose outdated entries are dropped lazily."""
+
+    def __init__(self, counts=None):
+        self._counts = {}
+        self._heap = []                     # (-count, seq, key); stale when count moved on
+        self._seq = itertools.count()
+        for key, count in (counts or {}).items():
+            self._counts[key] = count
+        self._rebuild()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __getitem__(self, key):
+        return self._counts.get(key, 0)
+
+    def add(self, key, amount=1):
+        count = self._counts.get(key, 0) + amount
+        self._counts[key] = count
+        heapq.heappush(self._heap, (-count, next(self._seq), key))
+        # Each add leaves one stale entry behind; rebuilding once they dominate keeps
+        # the heap within a constant factor of the number of keys
+        if len(self._heap) > 2 * len(self._counts) + 64:
+            self._rebuild()
+
+    def top(self, k):
+        """[(key, count)] for the k highest counts, highest first."""
+        heap, counts = self._heap, self._counts
+        found, valid = [], []
+        while heap and len(found) < k:
+            entry = heapq.heappop(heap)
+            count, key = -entry[0], entry[2]
+            if counts.get(key) != count:
+                continue                    # superseded by a later add
+            found.append((key, count))
+            valid.append(entry)
+        for entry in valid:
+            heapq.heappush(heap, entry)
+        return found
+
+    def as_dict(self):
+        return dict(self._counts)
+
+    def _rebuild(self):
+        seq = self._seq
+        self._heap = [(-count, next(seq), key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+
+class PlayHistory:
+    # Plays kept in memory for "recently played" (and previous-track lookups)
+    RECENT = 200
+    # Save the aggregates after this many plays (and on close)
+    SNAPSHOT_EVERY = 25
+
+    def __init__(self, music_folder):
+        self.music_folder = music_folder
+        root_dir = cache_dir_for(music_folder)
+        self.log_path = os.path.join(root_dir, HISTORY_LOG_NAME)
+        self.stats_path = os.path.join(root_dir, STATS_NAME)
+        self.tracks = CountRanking()
+        self.artists = CountRanking()
+        self.recent = deque(maxlen=self.RECENT)     # (timestamp, key), oldest first
+        self.total = 0
+        self._since_snapshot = 0
+        self._load()
+        self._trim_torn_tail()
+        self._log = open(self.log_path, 'ab')
+
+    # ------------------ RECORDING ------------------
+    def record(self, path, artist=None, when=None):
+        """Log one play of path (by artist) and fold it into the statistics."""
+        when = time.time() if when is None else when
+        key = self._key(path)
+        artist = (artist or '').replace('\t', ' ').replace('\n', ' ')
+        line = f"{when:.0f}\t{artist}\t{key}\n".encode('utf-8', 'surrogateescape')
+        try:
+            self._log.write(line)
+            self._log.flush()
+        except (OSError, ValueError) as e:
+            print("Could not log play:", e)
+        self._apply(when, artist, key)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.SNAPSHOT_EVERY:
+            self.save()
+
+    def _apply(self, when, artist, key):
+        self.total += 1
+        self.tracks.add(key)
+        if artist:
+            self.artists.add(artist)
+        self.recent.append((when, key))
+
+    # ------------------ QUERIES ------------------
+    def play_count(self, path):
+        return self.tracks[self._key(path)]
+
+    def top_tracks(self, k=10):
+        """[(path, plays)] for the k most played tracks."""
+        return [(self._path(key), count) for key, count in self.tracks.top(k)]
+
+    def top_artists(self, k=10):
+        """[(artist, plays)] for the k most played artists."""
+        return self.artists.top(k)
+
+    def recently_played(self, k=10):
+        """Up to k distinct paths, most recently played first."""
+        seen, paths = set(), []
+        for _, key in reversed(self.recent):
+            if key not in seen:
+                seen.add(key)
+                paths.append(self._path(key))
+                if len(paths) >= k:
+                    break
+        return paths
+
+    def last(self):
+        """Path played most recently, or None."""
+        return self._path(self.recent[-1][1]) if self.recent else None
+
+    # ------------------ PERSISTENCE ------------------
+    def save(self):
+        """Write the aggregates with the log offset they cover."""
+        self._since_snapshot = 0
+        try:
+            self._log.flush()
+            stats = {
+                'version': STATS_VERSION,
+                'log_offset': self._log.tell(),
+                'total': self.total,
+                'tracks': self.tracks.as_dict(),
+                'artists': self.artists.as_dict(),
+                'recent': list(self.recent),
+            }
+            tmp = self.stats_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+            os.replace(tmp, self.stats_path)
+        except (OSError, ValueError) as e:
+            print("Could not save listening statistics:", e)
+
+    def close(self):
+        if self._log.closed:
+            return
+        self.save()
+        self._log.close()
+
+    def _load(self):
+        offset = 0
+        try:
+            with open(self.stats_path, encoding='utf-8') as f:
+                stats = json.load(f)
+            if stats.get('version') == STATS_VERSION:
+                loaded = (int(stats['log_offset']), int(stats['total']), CountRanking(stats['tracks']),
+                          CountRanking(stats['artists']), [(when, key) for when, key in stats['recent']])
+                offset, self.total, self.tracks, self.artists, recent = loaded
+                self.recent.extend(recent)
+        except (OSError, ValueError, KeyError, TypeError):
+            offset = 0
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            size = 0
+        if offset > size:
+            # The log was replaced or truncated: rebuild everything from what is there
+            offset = 0
+            self.total = 0
+            self.tracks, self.artists = CountRanking(), CountRanking()
+            self.recent.clear()
+        if offset < size:
+            self._replay(offset)
+
+    def _replay(self, offset):
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break                   # torn last write
+                parts = line[:-1].decode('utf-8', 'surrogateescape').split('\t', 2)
+                if len(parts) != 3:
+                    continue
+                try:
+                    when = float(parts[0])
+                except ValueError:
+                    continue
+                self._apply(when, parts[1], parts[2])
+                self._since_snapshot += 1
+
+    def _trim_torn_tail(self):
+        """Cut a half-written last line so the next play starts on a line of its own."""
+        try:
+            with open(self.log_path, 'r+b') as f:
+                end = f.seek(0, os.SEEK_END)
+                if not end:
+                    return
+                f.seek(end - 1)
+                if f.read(1) == b'\n':
+                    return
+                # Walk back in blocks to the last newline; a torn line can be longer than one block
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    cut = f.read(end - start).rfind(b'\n')
+                    if cut >= 0:
+                        f.truncate(start + cut + 1)
+                        return
+                    end = start
+                f.truncate(0)
+        except OSError:
+            pass
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.music_folder)).replace(os.sep, '/')
+
+    def _path(self, key):
+        return os.path.join(self.music_folder, key.replace('/', os.sep))
@@ -0,0 +1,96 @@
+from musicflow.seek_index import FileSlice
+
+# ============================================================================
+# PLAYBACK CLOCK
+# pygame's get_pos() is "milliseconds since play()", not a song position: it
+# restarts on every play(start=...), ignores set_pos()/rewind() and knows
+# nothing about where a seek landed. The clock keeps the song time of the last
+# (re)start and adds get_pos() progress to it, freezing while paused.
+# Seeks in MP3s go through the frame index: the decoder is handed the file
+# starting at the target frame, so they land on the frame, fast, even in VBR
+# files. Other formats use the mixer's own seek.
+# ============================================================================
+
+
+class PlaybackClock:
+    def __init__(self, music, seek_index=None):
+        """
+        music: the pygame.mixer.music module
+        seek_index: SeekIndex used for frame-accurate MP3 seeks (optional)
+        """
+        self.music = music
+        self.seek_index = seek_index
+        self.path = None
+        self._offset = 0.0      # song time when get_pos() read _origin_ms
+        self._origin_ms = 0
+        self._paused_at = None
+        self._source = None     # FileSlice the mixer is reading after an indexed seek
+
+    def start(self, path, offset=0.0):
+        """path just started playing (play(), or a queued track took over) at offset."""
+        self._close_source()
+        self.path = path
+        self._offset = offset
+        self._origin_ms = 0
+        self._paused_at = None
+        if self.seek_index is not None:
+            # Have the index ready before the user reaches for the seek bar
+            self.seek_index.warm(path)
+
+    def position(self):
+        """Seconds into the current track."""
+        if self._paused_at is not None:
+            return self._paused_at
+        ms = self.music.get_pos()
+        if ms < 0:
+            return self._offset
+        return self._offset + max(0, ms - self._origin_ms) / 1000.0
+
+    def pause(self):
+        self._paused_at = self.position()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._offset = self._paused_at
+            self._origin_ms = max(0, self.music.get_pos())
+            self._paused_at = None
+
+    def seek(self, seconds):
+        """Move playback to seconds; returns the position it actually landed on.
+
+        A paused track stays paused. Loading drops anything queued behind the
+        current track, so callers re-queue their gapless successor afterwards.
+        """
+        if self.path is None:
+            return self.position()
+        seconds = max(0.0, seconds)
+        paused = self._paused_at is not None
+        index = None
+        if self.seek_index is not None and seconds > 0:
+            index = self.seek_index.get(self.path)
+        if index is not None:
+            offset, landed = index.locate(seconds)
+            source = FileSlice(self.path, offset)
+            self.music.load(source, 'mp3')
+            self.music.play()
+        else:
+            source = None
+            landed = seconds
+            if self._source is not None:
+                # The mixer is reading a slice: go back to the whole file
+                self.music.load(self.path)
+            self.music.play(start=seconds)
+        self._close_source()
+        self._source = source
+        self._offset = landed
+        self._origin_ms = 0
+        self._paused_at = None
+        if paused:
+            self.music.pause()
+            self._paused_at = landed
+        return landed
+
+    def _close_source(self):
+        if self._source is not None:
+            self._source.close()
+            self._source = None
@@ -0,0 +1,165 @@
+import traceback
+
+from musicflow.lazy import lazy_import
+
+pygame = lazy_import('pygame')
+
+# ============================================================================
+# PLAYBACK EVENTS
+# pygame.mixer.music posts an end event when a track finishes (or when a queued
+# track takes over). One pump on the Tk thread drains pygame's event queue and
+# turns it into callbacks; players emit started/paused/resumed/seek through the
+# same hub. The pump only runs while music is playing, sleeps until shortly
+# before the expected end, then checks every few milliseconds.
+# ============================================================================
+
+FINISHED = 'finished'   # info: queued=True if the mixer moved on to a queued track
+STARTED = 'started'
+PAUSED = 'paused'
+RESUMED = 'resumed'
+SEEK = 'seek'
+STOPPED = 'stopped'
+
+
+class PlaybackEvents:
+    # Pump period once the track is about to end (auto-advance latency bound)
+    FAST_MS = 5
+    # Longest sleep between pumps while playing, and when the end time is unknown
+    SLOW_MS = 1000
+    UNKNOWN_MS = 100
+    # Switch to fast pumping this long before the expected end
+    LEAD_S = 0.5
+
+    def __init__(self, root, music, remaining=None):
+        """
+        music: the pygame.mixer.music module
+        remaining() -> seconds left in the current track, or None if unknown
+        """
+        self.root = root
+        self.music = music
+        self.remaining = remaining
+        self._subscribers = {}
+        self._after_id = None
+        self._armed = False
+        self._last_pos = 0
+        self.end_type = None
+        self._attached = False
+
+    def _attach(self):
+        """Hook the mixer's end event; deferred to the first play so startup never waits on pygame."""
+        self._attached = True
+        try:
+            # The event queue lives in SDL's video subsystem; no window is opened
+            if not pygame.display.get_init():
+                pygame.display.init()
+            self.end_type = pygame.event.custom_type()
+            self.music.set_endevent(self.end_type)
+        except Exception as e:
+            print("Mixer end events unavailable, polling instead:", e)
+            self.end_type = None
+
+    # ------------------ SUBSCRIPTIONS ------------------
+    def subscribe(self, kind, callback):
+        self._subscribers.setdefault(kind, []).append(callback)
+
+    def unsubscribe(self, kind, callback):
+        try:
+            self._subscribers.get(kind, []).remove(callback)
+        except ValueError:
+            pass
+
+    def emit(self, kind, **info):
+        """Deliver an event to its subscribers (Tk thread) and re-plan the pump."""
+        if kind in (STARTED, SEEK):
+            # play()/play(start=...) restart get_pos()
+            self._last_pos = 0
+        if kind in (STARTED, RESUMED, SEEK):
+            self._arm()
+        elif kind in (PAUSED, STOPPED):
+            self._disarm()
+        if kind == STOPPED:
+            self._discard_ended()
+        for callback in list(self._subscribers.get(kind, ())):
+            try:
+                callback(**info)
+            except Exception:
+                traceback.print_exc()
+
+    # ------------------ PUMP ------------------
+    def _arm(self):
+        if not self._attached:
+            self._attach()
+        self._armed = True
+        self._schedule(0)
+
+    def _disarm(self):
+        self._armed = False
+        self._cancel()
+
+    def _discard_ended(self):
+        """Drop end events still queued: stopping the mixer posts one, and the next play must not see it."""
+        if self.end_type is not None:
+            try:
+                pygame.event.clear(self.end_type)
+            except Exception:
+                pass
+
+    def _cancel(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _schedule(self, delay_ms):
+        self._cancel()
+        if self._armed:
+            try:
+                self._after_id = self.root.after(delay_ms, self._pump)
+            except Exception:
+                self._after_id = None
+
+    def _next_delay(self):
+        remaining = None
+        if self.remaining is not None:
+            try:
+                remaining = self.remaining()
+            except Exception:
+                remaining = None
+        if remaining is None:
+            return self.UNKNOWN_MS
+        if remaining <= self.LEAD_S:
+            return self.FAST_MS
+        return int(min(self.SLOW_MS, (remaining - self.LEAD_S) * 1000))
+
+    def _pump(self):
+        self._after_id = None
+        if self.end_type is not None:
+            ended = False
+            for event in pygame.event.get():
+                if event.type == self.end_type:
+                    ended = True
+            if ended:
+                self._finished(queued=self.music.get_busy())
+        else:
+            self._poll()
+        self._schedule(self._next_delay())
+
+    def _poll(self):
+        """Fallback without an event queue: infer the end from the mixer state."""
+        pos = self.music.get_pos()
+        if not self.music.get_busy():
+            self._finished(queued=False)
+        elif 0 <= pos < self._last_pos:
+            # get_pos() restarts when a queued track takes over
+            self._last_pos = pos
+            self._finished(queued=True)
+        else:
+            self._last_pos = pos
+
+    def _finished(self, queued):
+        if not queued:
+            # Nothing is playing until someone starts the next track
+            self._armed = False
+        self.emit(FINISHED, queued=queued)
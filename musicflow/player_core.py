@@ -0,0 +1,369 @@
+import os
+import threading
+from collections import deque
+
+from musicflow.gapless import GaplessQueue
+from musicflow.lazy import lazy_import
+from musicflow.library_scanner import LibraryScanner
+from musicflow.metadata_store import MetadataStore
+from musicflow.mixer_boot import MixerBoot
+from musicflow.play_history import PlayHistory
+from musicflow.playback_clock import PlaybackClock
+from musicflow.playback_events import FINISHED, PAUSED, RESUMED, SEEK, STARTED, STOPPED, PlaybackEvents
+from musicflow.search_index import SearchIndex
+from musicflow.seek_index import SeekIndex
+from musicflow.shuffle import ShuffleBag
+from musicflow.track_inspector import UNKNOWN_ARTIST, inspect_track, metadata_from_info
+from musicflow.track_table import TrackTable
+
+pygame = lazy_import('pygame')
+
+# ============================================================================
+# PLAYER CORE
+# Playback without a window: track table, play queue, shuffle/repeat, gapless
+# handoff, seeking, loudness gains and play history. SpotifyClonePlayer owns
+# one and drives it from its buttons, filling the library itself and drawing
+# whatever the STARTED/PAUSED/... events announce; the headless player calls
+# load() to scan the folder and takes commands from a socket. Timers come
+# from whatever owns the thread (a Tk root, or LoopTimers on an asyncio
+# loop); every method must be called on that thread. Album art is never
+# rendered here, so PIL is never imported.
+# ============================================================================
+
+STATE_STOPPED = 'stopped'
+STATE_PLAYING = 'playing'
+STATE_PAUSED = 'paused'
+
+
+class PlayerCore:
+    # Repeat modes, as in the GUI: the whole library wraps either way, ONE repeats the track
+    REPEAT_OFF, REPEAT_ALL, REPEAT_ONE = 0, 1, 2
+
+    def __init__(self, music_folder, timers, frequency=44100, buffer=512, normalize=True, shuffle_seed=None,
+                 shuffle_no_repeat=10, gapless=True, mixer=None):
+        """
+        timers: object with after(ms, fn) and after_cancel(id), e.g. a Tk root
+        frequency/buffer: mixer settings (see SpotifyClonePlayer)
+        normalize: apply the per-track loudness gains the GUI measured
+        shuffle_seed/shuffle_no_repeat: see ShuffleBag
+        gapless: queue the predicted next track behind the current one
+        mixer: a MixerBoot the caller starts itself (one is started here otherwise)
+        """
+        self.music_folder = music_folder
+        self.normalize = normalize
+        self.use_gapless = gapless
+        self.mixer = mixer if mixer is not None else MixerBoot(frequency, buffer).start()
+        self.tracks = TrackTable()
+        self.playlist = self.tracks.order
+        self.search_index = SearchIndex()
+        self.shuffle = ShuffleBag(seed=shuffle_seed, no_repeat=shuffle_no_repeat, artist_of=self.tracks.artist)
+        self.up_next = deque()              # track ids queued by the user, played before anything else
+        self.current = None                 # track id
+        self.state = STATE_STOPPED
+        self.shuffle_mode = False
+        self.repeat_mode = self.REPEAT_OFF
+        self.volume = 0.7
+        self.scanner = None
+        self.store = None
+        self.history = None
+        self.gapless = GaplessQueue(self.mixer.music, frequency, buffer)
+        self.clock = PlaybackClock(self.mixer.music)
+        self.events = PlaybackEvents(timers, self.mixer.music, remaining=self._remaining_time)
+        self.events.subscribe(FINISHED, self._on_finished)
+
+    # ------------------ LIBRARY ------------------
+    def load(self):
+        """Scan the folder and fill the table from the metadata cache; returns the track count.
+
+        Files the cache does not know yet are parsed on a background thread and
+        show their file name until then.
+        """
+        self.scanner = LibraryScanner(self.music_folder)
+        changes = self.scanner.rescan()
+        try:
+            self.store = MetadataStore(self.music_folder)
+            cached, stale = self.store.partition(changes.added)
+        except Exception as e:
+            print("Metadata cache unavailable:", e)
+            self.store, cached, stale = None, {}, list(changes.added)
+        for p in changes.added:
+            self.tracks.add(p, cached.get(p))
+        self.playlist = self.tracks.set_order(self.tracks.ids_for(self.scanner.paths()))
+        self.shuffle.reset(self.playlist)
+        self.search_index.add_many((self.tracks.path(t), self.tracks.title(t), self.tracks.artist(t))
+                                   for t in self.playlist)
+        try:
+            self.clock.seek_index = SeekIndex(self.music_folder)
+        except Exception as e:
+            print("Seek index unavailable:", e)
+        try:
+            self.history = PlayHistory(self.music_folder)
+        except Exception as e:
+            print("Play history unavailable:", e)
+        if stale:
+            threading.Thread(target=self._parse_background, args=(stale,), daemon=True).start()
+        return len(self.playlist)
+
+    def _parse_background(self, paths):
+        """Background worker: read tags for uncached files (no art, so the GUI renders it later)."""
+        parsed = []
+        for p in paths:
+            try:
+                meta = metadata_from_info(inspect_track(p, with_art=False))
+            except Exception:
+                continue
+            tid = self.tracks.id_of(p)
+            if tid is not None:
+                self.tracks.set_meta(tid, meta)
+                self.search_index.add(p, meta['title'], meta['artist'])
+            parsed.append((p, meta))
+        if self.store is not None and parsed:
+            self.store.put_many(parsed)
+
+    def resolve(self, index=None, path=None, track=None):
+        """Track id from a library position, a path or an id; None if it is not in the library."""
+        if track is not None:
+            tid = int(track)
+        elif path is not None:
+            tid = self.tracks.id_of(path)
+        elif index is not None:
+            index = int(index)
+            tid = self.playlist[index] if 0 <= index < len(self.playlist) else None
+        else:
+            return None
+        return tid if self.tracks.position(tid) >= 0 else None
+
+    def search(self, query, limit=20):
+        ids = self.tracks.ids_for(self.search_index.search(query)) if query.strip() else []
+        return [self.describe(tid) for tid in ids[:limit]]
+
+    def describe(self, tid):
+        tracks = self.tracks
+        return {
+            'id': tid,
+            'index': tracks.position(tid),
+            'path': tracks.path(tid),
+            'title': tracks.title(tid),
+            'artist': tracks.artist(tid),
+            'duration': tracks.duration(tid),
+        }
+
+    # ------------------ TRANSPORT ------------------
+    def play(self, tid=None):
+        """Start tid from the top; without one, resume a paused track or start the current/first one.
+
+        Raises FileNotFoundError if the file is gone, and pygame.error if it cannot be played.
+        """
+        if tid is None:
+            if self.state == STATE_PAUSED:
+                return self.resume()
+            tid = self.current if self.current is not None else (self.playlist[0] if self.playlist else None)
+            if tid is None:
+                return False
+        path = self.tracks.path(tid)
+        if not os.path.exists(path):
+            raise FileNotFoundError(2, "File not found", path)
+        # The mixer starts in the background; a very early first play waits for it
+        self.mixer.wait()
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init(frequency=self.mixer.frequency, size=-16, channels=self.mixer.channels,
+                                  buffer=self.mixer.buffer)
+            except Exception as e:
+                print("Could not init mixer:", e)
+        music = pygame.mixer.music
+        music.load(path)
+        self.gapless.clear()
+        music.play()
+        self.gapless.reload_finished()
+        self._started(tid)
+        return True
+
+    def pause(self):
+        if self.state != STATE_PLAYING:
+            return False
+        pygame.mixer.music.pause()
+        self.clock.pause()
+        self.state = STATE_PAUSED
+        self.events.emit(PAUSED)
+        return True
+
+    def resume(self):
+        if self.state != STATE_PAUSED:
+            return False
+        pygame.mixer.music.unpause()
+        self.clock.resume()
+        self.state = STATE_PLAYING
+        self.events.emit(RESUMED)
+        return True
+
+    def toggle(self):
+        return self.pause() if self.state == STATE_PLAYING else self.play()
+
+    def stop(self):
+        if self.state == STATE_STOPPED:
+            return False
+        if self.mixer.ready:
+            pygame.mixer.music.stop()
+        self.gapless.clear()
+        self.state = STATE_STOPPED
+        self.events.emit(STOPPED)
+        return True
+
+    def next(self):
+        tid = self._next_track(consume=True, follow_repeat=False)
+        return self.play(tid) if tid is not None else False
+
+    def previous(self):
+        """Restart the track if it is past 3 s, else go back one (through shuffle history when shuffling)."""
+        if self.current is None:
+            return False
+        if self.state != STATE_STOPPED and self.clock.position() > 3:
+            self.seek(0)
+            return True
+        if self.shuffle_mode:
+            tid = self.shuffle.previous()
+            if tid is None:
+                self.seek(0)
+                return True
+            return self.play(tid)
+        pos = self.tracks.position(self.current)
+        return self.play(self.playlist[(pos - 1) % len(self.playlist)]) if pos >= 0 else False
+
+    def seek(self, seconds):
+        """Jump within the current track; returns where it landed (None if nothing is loaded)."""
+        if self.state == STATE_STOPPED:
+            return None
+        landed = self.clock.seek(float(seconds))
+        # Seeking reloads the stream, which drops the queued successor
+        self.gapless.clear()
+        self.prepare_next()
+        if self.state == STATE_PLAYING:
+            self.events.emit(SEEK, position=landed)
+        return landed
+
+    def enqueue(self, tid):
+        """Play tid after the current track (after anything queued before it)."""
+        self.up_next.append(tid)
+        self.prepare_next()
+        return len(self.up_next)
+
+    def clear_queue(self):
+        self.up_next.clear()
+        self.prepare_next()
+
+    def set_volume(self, level):
+        self.volume = min(1.0, max(0.0, float(level)))
+        self.apply_volume()
+
+    def set_shuffle(self, on):
+        self.shuffle_mode = bool(on)
+        self.prepare_next()
+
+    def set_repeat(self, mode):
+        self.repeat_mode = int(mode) % 3
+        self.prepare_next()
+
+    def peek_next(self):
+        """The track expected to play after the current one (None if there is none)."""
+        if self.state == STATE_STOPPED:
+            return None
+        return self._next_track(consume=False, follow_repeat=True)
+
+    def prepare_next(self):
+        """Queue the predicted next track behind the current one for a gapless handoff."""
+        tid = self.peek_next()
+        if tid is not None and self.use_gapless:
+            self.gapless.prepare(tid, self.tracks.path(tid))
+
+    def apply_volume(self):
+        """Mixer volume = the user's level times the current track's normalization gain."""
+        volume = self.volume
+        if self.normalize and self.current is not None:
+            gain = self.tracks.gain(self.current)
+            if gain is not None:
+                volume *= 10 ** (gain / 20.0)
+        if self.mixer.ready:
+            pygame.mixer.music.set_volume(min(1.0, volume))
+
+    def status(self):
+        duration = self.tracks.duration(self.current) if self.current is not None else 0
+        return {
+            'state': self.state,
+            'track': self.describe(self.current) if self.current is not None else None,
+            'position': round(self.clock.position(), 3) if self.state != STATE_STOPPED else 0.0,
+            'duration': duration,
+            'volume': self.volume,
+            'shuffle': self.shuffle_mode,
+            'repeat': self.repeat_mode,
+            'queue': [self.describe(tid) for tid in self.up_next if self.tracks.position(tid) >= 0],
+            'tracks': len(self.playlist),
+        }
+
+    def close(self):
+        """Stop playback and save the play history."""
+        self.stop()
+        for store in (self.history, self.store):
+            if store is not None:
+                try:
+                    store.close()
+                except Exception as e:
+                    print("Could not close store:", e)
+
+    # ------------------ INTERNALS ------------------
+    def _started(self, tid):
+        """tid is now playing (started here, or taken over from the gapless queue)."""
+        self.current = tid
+        self.state = STATE_PLAYING
+        path = self.tracks.path(tid)
+        self.clock.start(path)
+        self.apply_volume()
+        self.shuffle.played(tid)
+        self.prepare_next()
+        self.events.emit(STARTED, index=self.tracks.position(tid), track=tid)
+        # Recorded after the subscribers ran: the GUI reads the tags of a track the scan has not reached yet
+        if self.history is not None:
+            artist = self.tracks.artist(tid)
+            self.history.record(path, artist if artist != UNKNOWN_ARTIST else None)
+
+    def _next_track(self, consume, follow_repeat):
+        """The track after the current one: user queue first, then repeat-one, shuffle or library order."""
+        while self.up_next and self.tracks.position(self.up_next[0]) < 0:
+            self.up_next.popleft()          # removed from the library since it was queued
+        if self.up_next:
+            return self.up_next.popleft() if consume else self.up_next[0]
+        if not self.playlist:
+            return None
+        if follow_repeat and self.repeat_mode == self.REPEAT_ONE and self.current is not None:
+            return self.current
+        if self.shuffle_mode:
+            return self.shuffle.next() if consume else self.shuffle.peek()
+        pos = self.tracks.position(self.current)
+        return self.playlist[(pos + 1) % len(self.playlist)]
+
+    def _on_finished(self, queued):
+        if queued:
+            tid = self.gapless.take()
+            if tid is None:
+                return
+            # Consume whatever the prediction peeked at
+            if self.up_next and self.up_next[0] == tid:
+                self.up_next.popleft()
+            elif self.shuffle_mode and not (self.repeat_mode == self.REPEAT_ONE and tid == self.current):
+                self.shuffle.next()
+            self._started(tid)
+            return
+        if self.state != STATE_PLAYING:
+            return
+        self.state = STATE_STOPPED
+        self.gapless.reload_started()
+        tid = self._next_track(consume=True, follow_repeat=True)
+        if tid is not None:
+            self.play(tid)
+
+    def _remaining_time(self):
+        if self.current is None:
+            return None
+        duration = self.tracks.duration(self.current)
+        return duration - self.clock.position() if duration else None
+
@@ -0,0 +1,101 @@
+import os
+from collections import deque
+
+from musicflow.track_inspector import inspect_track, metadata_from_info
+
+# ============================================================================
+# PROCESS-POOL METADATA SCAN
+# Tag parsing and art rendering are pure-Python/CPU bound, so a thread cannot
+# use more than one core. Chunks of paths go to worker processes, which return
+# compact metadata dicts (art is rendered to the disk cache, not shipped back).
+# ============================================================================
+
+# Per-process art cache, created lazily inside each worker
+_worker_art_cache = None
+
+
+def _art_cache_for(music_folder):
+    global _worker_art_cache
+    if _worker_art_cache is None or _worker_art_cache.music_folder != music_folder:
+        try:
+            from musicflow.art_cache import ArtCache
+            _worker_art_cache = ArtCache(music_folder)
+        except Exception:
+            _worker_art_cache = None
+    return _worker_art_cache
+
+
+def scan_track(path, art_cache=None):
+    """Inspect one file and return the compact metadata kept per track."""
+    info = inspect_track(path, with_art=art_cache is not None)
+    meta = metadata_from_info(info)
+    meta['art_key'] = ''
+    if art_cache is not None and info.get('art'):
+        try:
+            meta['art_key'] = art_cache.ensure(info['art']) or ''
+        except Exception:
+            pass
+    return meta
+
+
+def _scan_chunk(music_folder, paths):
+    """Worker entry point: scan a chunk, never raising for a single bad file."""
+    art_cache = _art_cache_for(music_folder)
+    results = []
+    for p in paths:
+        try:
+            results.append((p, scan_track(p, art_cache)))
+        except Exception:
+            results.append((p, None))
+    return results
+
+
+class ScanPool:
+    def __init__(self, music_folder, workers=None, chunk_size=32, min_parallel=64):
+        """
+        workers: process count (default: all cores but one)
+        chunk_size: paths per task; larger chunks mean less IPC, coarser progress
+        min_parallel: below this many paths, scan in the calling thread instead of
+        paying the process start-up cost
+        """
+        self.music_folder = music_folder
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.chunk_size = max(1, chunk_size)
+        self.min_parallel = min_parallel
+
+    def scan(self, paths):
+        """Yield (batch, done, total) in track order; batch is a list of (path, meta).
+
+        meta is None for files that could not be read at all.
+        """
+        paths = list(paths)
+        total = len(paths)
+        chunks = [paths[i:i + self.chunk_size] for i in range(0, total, self.chunk_size)]
+        done = 0
+        if self.workers <= 1 or total < self.min_parallel:
+            for chunk in chunks:
+                batch = _scan_chunk(self.music_folder, chunk)
+                done += len(batch)
+                yield batch, done, total
+            return
+
+        # Spawned (not forked) workers: the parent runs Tk and other threads
+        # Only the multi-process path needs these (and they are slow to import)
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            pending = deque()
+            queued = iter(chunks)
+            # Keep a bounded window of chunks in flight; results are consumed in order
+            for chunk in queued:
+                pending.append(pool.submit(_scan_chunk, self.music_folder, chunk))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                batch = pending.popleft().result()
+                next_chunk = next(queued, None)
+                if next_chunk is not None:
+                    pending.append(pool.submit(_scan_chunk, self.music_folder, next_chunk))
+                done += len(batch)
+                yield batch, done, total
@@ -0,0 +1,183 @@
+import os
+import threading
+from array import array
+
+# ============================================================================
+# TRIGRAM SEARCH INDEX
+# Inverted index from casefolded trigrams of title, artist and filename to
+# compact integer posting arrays. A query intersects the postings of its
+# trigrams and verifies only those candidates, and a query that extends the
+# previous one only re-checks the previous matches, so typing narrows results
+# without rescanning the library.
+# ============================================================================
+
+GRAM = 3
+# Above this many matches results keep library order instead of being ranked
+RANK_LIMIT = 2000
+
+
+def _trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def normalize_query(query):
+    return ' '.join(query.casefold().split())
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._ids = {}        # path -> id
+            self._paths = []      # id -> path (None once removed)
+            self._docs = []       # id -> (full text, title, artist) casefolded, or None
+            self._postings = {}   # trigram -> array of ids (may hold stale ids until compaction)
+            self._stale = 0
+            self._last_query = None
+            self._last_ids = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ------------------ UPDATES ------------------
+    def add(self, path, title='', artist=''):
+        """Index path (or re-index it after its metadata changed)."""
+        with self._lock:
+            self._add(path, title, artist)
+
+    def add_many(self, entries):
+        """Index an iterable of (path, title, artist) under a single lock acquisition."""
+        with self._lock:
+            for path, title, artist in entries:
+                self._add(path, title, artist)
+
+    def _add(self, path, title, artist):
+        title_cf = title.casefold()
+        artist_cf = artist.casefold()
+        stem_cf = os.path.splitext(os.path.basename(path))[0].casefold()
+        # Untagged files use the filename as title; don't index the same text twice
+        text = f"{title_cf}\x00{artist_cf}" if stem_cf == title_cf else f"{title_cf}\x00{artist_cf}\x00{stem_cf}"
+        doc_id = self._ids.get(path)
+        if doc_id is None:
+            doc_id = len(self._paths)
+            self._ids[path] = doc_id
+            self._paths.append(path)
+            self._docs.append(None)
+            old_grams = set()
+        else:
+            old = self._docs[doc_id]
+            if old is not None and old[0] == text:
+                return
+            old_grams = _trigrams(old[0]) if old is not None else set()
+        new_grams = _trigrams(text)
+        if old_grams - new_grams:
+            # Postings of vanished grams still list this id; verification skips it
+            self._stale += 1
+        self._docs[doc_id] = (text, title_cf, artist_cf)
+        postings = self._postings
+        for gram in new_grams - old_grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(doc_id)
+        self._last_query = None
+        self._maybe_compact()
+
+    def remove(self, path):
+        with self._lock:
+            doc_id = self._ids.pop(path, None)
+            if doc_id is None:
+                return
+            self._paths[doc_id] = None
+            self._docs[doc_id] = None
+            self._stale += 1
+            self._last_query = None
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Rebuild postings once stale entries outnumber live documents."""
+        if self._stale <= max(1024, len(self._ids)):
+            return
+        live = sorted(self._ids.items(), key=lambda item: item[1])
+        docs = self._docs
+        self._ids, self._paths, self._docs, self._postings = {}, [], [], {}
+        for path, old_id in live:
+            doc = docs[old_id]
+            doc_id = len(self._paths)
+            self._ids[path] = doc_id
+            self._paths.append(path)
+            self._docs.append(doc)
+            for gram in _trigrams(doc[0]):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                posting.append(doc_id)
+        self._stale = 0
+
+    # ------------------ QUERIES ------------------
+    def search(self, query):
+        """Return the paths matching every word of query, best matches first."""
+        q = normalize_query(query)
+        if not q:
+            return []
+        tokens = q.split(' ')
+        with self._lock:
+            docs = self._docs
+            if self._last_query is not None and q.startswith(self._last_query):
+                # Query only grew: matches are a subset of the previous ones, and only
+                # the last (possibly extended) word and any new words need checking
+                ids = self._last_ids
+                check = tokens[self._last_query.count(' '):]
+            else:
+                ids = self._candidates(tokens)
+                check = tokens
+            for t in check:
+                ids = [i for i in ids if (d := docs[i]) is not None and t in d[0]]
+            self._last_query, self._last_ids = q, ids
+            if len(ids) <= RANK_LIMIT:
+                ids = sorted(ids, key=lambda i: self._rank(docs[i], q, i))
+            paths = self._paths
+            return [paths[i] for i in ids]
+
+    def _candidates(self, tokens):
+        """Ids containing every trigram of every query word, in library order."""
+        postings = []
+        for token in tokens:
+            for gram in _trigrams(token):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+        if not postings:
+            # Only 1-2 character words: nothing to look up, verify every document
+            return range(len(self._docs))
+        postings.sort(key=len)
+        if len(postings[0]) * 2 > len(self._ids):
+            # Broad query: a straight pass is as cheap as intersecting and stays ordered
+            return range(len(self._docs))
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                return []
+        return sorted(found)
+
+    @staticmethod
+    def _rank(doc, q, doc_id):
+        _, title, artist = doc
+        if title.startswith(q):
+            tier = 0
+        elif f" {q}" in title:
+            tier = 1
+        elif q in title:
+            tier = 2
+        elif artist.startswith(q) or f" {q}" in artist:
+            tier = 3
+        elif q in artist:
+            tier = 4
+        else:
+            tier = 5
+        return tier, len(title), doc_id
@@ -0,0 +1,263 @@
+import io
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+from musicflow.metadata_store import cache_dir_for, file_cache_key, write_atomic
+
+# ============================================================================
+# MP3 SEEK INDEX
+# The byte offset of every MP3 frame, found by walking the frame headers once
+# and cached next to the music. A seek turns into "time -> frame number ->
+# byte offset", so the decoder can start right at the wanted frame instead of
+# guessing from the bitrate (wrong for VBR) or decoding from the beginning.
+# The Xing/VBRI TOC only has 100 points (several seconds apart on a normal
+# song), so it is not used for seeking; its LAME tag supplies the encoder delay.
+# ============================================================================
+
+SEEK_DIR_NAME = "seek"
+INDEX_VERSION = 1
+
+# Samples a Layer III decoder emits before the first frame's audio; decoders trim
+# them at the start of a file but not when fed a stream that starts mid-file
+DECODER_DELAY = 529
+
+# Layer III bitrates in kbit/s, by bitrate index: MPEG-1, then MPEG-2/2.5
+_BITRATES = (
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+)
+# Sample rates by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+_HEADER = struct.Struct('<4sHIHHI')   # magic, version, rate, samples/frame, delay, frames
+_MAGIC = b'MFSI'
+
+
+def _frame_info(data, i):
+    """(frame size, samples, sample rate) of the Layer III header at data[i], or None."""
+    b1, b2 = data[i + 1], data[i + 2]
+    if data[i] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 3
+    if version == 1 or ((b1 >> 1) & 3) != 1:
+        return None
+    bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+    if bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    rate = _SAMPLE_RATES[version][rate_idx]
+    kbps = _BITRATES[0 if version == 3 else 1][bitrate_idx]
+    samples = 1152 if version == 3 else 576
+    size = (samples // 8) * kbps * 1000 // rate + ((b2 >> 1) & 1)
+    return size, samples, rate
+
+
+def _id3_size(data):
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size + (10 if data[5] & 0x10 else 0)
+    return 0
+
+
+def _encoder_delay(frame):
+    """Samples of encoder delay from a LAME tag inside a Xing/Info frame (0 if absent)."""
+    for tag in (b'Xing', b'Info'):
+        at = frame.find(tag)
+        if at >= 0:
+            # Optional fields (frames, bytes, TOC, quality) precede the LAME tag
+            flags = int.from_bytes(frame[at + 4:at + 8], 'big')
+            lame = at + 8
+            for bit, size in ((1, 4), (2, 4), (4, 100), (8, 4)):
+                if flags & bit:
+                    lame += size
+            if frame[lame:lame + 4] in (b'LAME', b'Lavf', b'Lavc'):
+                delay = frame[lame + 21:lame + 24]
+                if len(delay) == 3:
+                    return (delay[0] << 4) | (delay[1] >> 4)
+            return 0
+    return 0
+
+
+def scan_frames(path):
+    """Walk the frame headers of an MP3 file.
+
+    Returns (offsets, samples_per_frame, sample_rate, delay) where offsets is an
+    array of audio frame byte offsets; None if this is not a Layer III stream.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    end = len(data) - 4
+    i = _id3_size(data)
+    offsets = array('I')
+    first = None
+    delay = 0
+    while i <= end:
+        info = _frame_info(data, i)
+        # Only trust a header whose successor also lines up (or that ends the file)
+        if info is not None and (first is None or info[1:] == first[1:]):
+            nxt = i + info[0]
+            if nxt > end or _frame_info(data, nxt) is not None or data[nxt:nxt + 3] == b'TAG':
+                if first is None:
+                    first = info
+                    frame = data[i:nxt]
+                    if b'Xing' in frame or b'Info' in frame or frame[36:40] == b'VBRI':
+                        # Tag frame: decoders skip it, it holds no audio
+                        delay = _encoder_delay(frame)
+                        i = nxt
+                        continue
+                offsets.append(i)
+                i = nxt
+                continue
+        if data[i:i + 3] == b'TAG':
+            break
+        i += 1
+    if first is None or not offsets:
+        return None
+    return offsets, first[1], first[2], delay
+
+
+class FrameIndex:
+    """Frame offsets of one file, with time <-> frame conversions."""
+
+    def __init__(self, offsets, samples_per_frame, sample_rate, delay=0):
+        self.offsets = offsets
+        self.samples_per_frame = samples_per_frame
+        self.sample_rate = sample_rate
+        self.delay = delay
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self):
+        """Song length in seconds (the encoder delay is not part of the song)."""
+        return max(0.0, (len(self.offsets) * self.samples_per_frame - self.delay) / self.sample_rate)
+
+    def locate(self, seconds):
+        """(byte offset, song time) where decoding from the frame nearest to seconds starts."""
+        if not self.offsets:
+            return 0, 0.0
+        exact = (seconds * self.sample_rate + self.delay + DECODER_DELAY) / self.samples_per_frame
+        n = min(len(self.offsets) - 1, max(0, int(exact + 0.5)))
+        start = (n * self.samples_per_frame - self.delay - DECODER_DELAY) / self.sample_rate
+        return self.offsets[n], max(0.0, start)
+
+    # ------------------ SERIALIZATION ------------------
+    def to_bytes(self):
+        header = _HEADER.pack(_MAGIC, INDEX_VERSION, self.sample_rate, self.samples_per_frame,
+                              self.delay, len(self.offsets))
+        return header + self.offsets.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        magic, version, rate, spf, delay, count = _HEADER.unpack_from(blob)
+        if magic != _MAGIC or version != INDEX_VERSION:
+            return None
+        offsets = array('I')
+        offsets.frombytes(blob[_HEADER.size:])
+        if len(offsets) != count:
+            return None
+        return cls(offsets, spf, rate, delay)
+
+
+class FileSlice(io.RawIOBase):
+    """Read-only view of a file from byte `start` on, so a decoder begins at that frame."""
+
+    def __init__(self, path, start):
+        super().__init__()
+        self._file = open(path, 'rb', buffering=0)
+        self._start = start
+        self._file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self._start
+        return max(0, self._file.seek(offset, whence) - self._start)
+
+    def tell(self):
+        return self._file.tell() - self._start
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class SeekIndex:
+    # Indexes kept in memory (about 4 bytes per 26 ms of audio each)
+    MEMORY_ENTRIES = 16
+
+    def __init__(self, music_folder):
+        self.music_folder = music_folder
+        self.root_dir = os.path.join(cache_dir_for(music_folder), SEEK_DIR_NAME)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_path(self, path):
+        key = file_cache_key(path)
+        return os.path.join(self.root_dir, key[:2], key + '.idx')
+
+    def get(self, path):
+        """FrameIndex for an MP3 file, building and caching it on first use; None otherwise."""
+        if not path.lower().endswith('.mp3'):
+            return None
+        try:
+            cache_path = self._cache_path(path)
+        except OSError:
+            return None
+        with self._lock:
+            index = self._memory.get(cache_path)
+            if index is not None:
+                self._memory.move_to_end(cache_path)
+                return index
+        index = self._load(cache_path)
+        if index is None:
+            index = self._build(path, cache_path)
+        if index is not None:
+            with self._lock:
+                self._memory[cache_path] = index
+                while len(self._memory) > self.MEMORY_ENTRIES:
+                    self._memory.popitem(last=False)
+        return index
+
+    def warm(self, path):
+        """Build path's index in the background so the first seek is already fast."""
+        threading.Thread(target=self.get, args=(path,), daemon=True).start()
+
+    def _load(self, cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                return FrameIndex.from_bytes(f.read())
+        except (OSError, struct.error):
+            return None
+
+    def _build(self, path, cache_path):
+        try:
+            scanned = scan_frames(path)
+        except Exception as e:
+            print("Seek index failed:", path, e)
+            return None
+        if scanned is None:
+            return None
+        index = FrameIndex(*scanned)
+        try:
+            write_atomic(cache_path, index.to_bytes())
+        except OSError as e:
+            print("Could not cache seek index:", e)
+        return index
@@ -0,0 +1,101 @@
+import json
+import os
+from collections import namedtuple
+
+from musicflow.metadata_store import CACHE_DIR_NAME, cache_dir_for
+
+# ============================================================================
+# SESSION SNAPSHOT
+# On exit the player writes down what the window showed: the view, which row
+# was at the top, the now-playing track with its position, and the cards that
+# were drawn, with their rendered labels and art keys. On the next launch that
+# is enough to paint the same window before the library has been scanned; the
+# real scan then replaces the snapshot in the background. Only the cards that
+# were on screen are kept, so the file stays small for any library size.
+# ============================================================================
+
+SESSION_NAME = "session.json"
+SESSION_VERSION = 1
+
+# A card as it was drawn: its position in the view, track path and display strings
+SessionCard = namedtuple('SessionCard', 'pos path title artist duration art')
+
+
+class SessionSnapshot:
+    def __init__(self, view=None, summary=None, count=0, top=(0, 0), cards=(), current=None):
+        """
+        view: title of the main view (None for the grid shown at startup)
+        summary: text shown between the title and the grid, or None
+        count: number of cards in the view
+        top: (position, pixels) of the first row on screen, as VirtualCardGrid.top_item() returns it
+        cards: SessionCard for each card that was drawn
+        current: dict with path, title, artist, duration, art, position and liked, or None
+        """
+        self.view = view
+        self.summary = summary
+        self.count = count
+        self.top = tuple(top)
+        self.cards = list(cards)
+        self.current = current
+
+    def items(self):
+        """The view as grid items: the saved cards at their positions, None everywhere else."""
+        items = [None] * self.count
+        for card in self.cards:
+            if 0 <= card.pos < self.count:
+                items[card.pos] = card
+        return items
+
+    def to_dict(self):
+        return {
+            'version': SESSION_VERSION,
+            'view': self.view,
+            'summary': self.summary,
+            'count': self.count,
+            'top': list(self.top),
+            'cards': [list(card) for card in self.cards],
+            'current': self.current,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        current = data.get('current')
+        if current is not None:
+            current = {
+                'path': str(current['path']),
+                'title': str(current['title']),
+                'artist': str(current['artist']),
+                'duration': float(current['duration']),
+                'art': str(current.get('art') or ''),
+                'position': float(current.get('position') or 0),
+                'liked': bool(current.get('liked')),
+            }
+        pos, offset = data['top']
+        return cls(view=data.get('view'), summary=data.get('summary'), count=int(data['count']),
+                   top=(int(pos), int(offset)), cards=[SessionCard(*card) for card in data['cards']],
+                   current=current)
+
+
+def load_session(music_folder):
+    """The snapshot saved for music_folder, or None if there is none (or it is unreadable)."""
+    # Not cache_dir_for: looking for a snapshot should not create the cache directory
+    path = os.path.join(music_folder, CACHE_DIR_NAME, SESSION_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != SESSION_VERSION:
+            return None
+        return SessionSnapshot.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_session(music_folder, snapshot):
+    try:
+        path = os.path.join(cache_dir_for(music_folder), SESSION_NAME)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except (OSError, ValueError) as e:
+        print("Could not save session:", e)
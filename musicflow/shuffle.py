@@ -0,0 +1,187 @@
+import random
+from collections import deque
+
+# ============================================================================
+# SHUFFLE BAG
+# Tracks not yet played this cycle sit in a "bag" list; each step swaps a random
+# entry to the end and pops it (an incremental Fisher-Yates shuffle), so a draw
+# is O(1) and every track plays once per cycle. Recently played tracks and
+# artists are avoided with a bounded number of redraws, and a history with a
+# cursor makes previous/next O(1). Tracks can join or leave mid-cycle without
+# reshuffling the rest.
+# ============================================================================
+
+
+class ShuffleBag:
+    # Redraws per step when a candidate breaks the no-repeat/artist rules
+    MAX_TRIES = 8
+
+    def __init__(self, items=(), seed=None, no_repeat=10, artist_of=None, artist_gap=1, history=500):
+        """
+        no_repeat: a track is not replayed within this many steps (across cycles)
+        artist_of(item) -> artist; with artist_gap=N the next track avoids the
+        artists of the last N tracks
+        seed: fixes the order for a reproducible session
+        history: how many steps previous() can go back
+        """
+        self.rng = random.Random(seed)
+        self.no_repeat = no_repeat
+        self.artist_of = artist_of
+        self.artist_gap = artist_gap
+        self._history = deque(maxlen=max(1, history))
+        self.reset(items)
+
+    def reset(self, items=()):
+        """Start a new session over items (keeps the RNG state)."""
+        self._items = dict.fromkeys(items)   # insertion ordered, so seeded runs repeat
+        self._bag = []
+        self._slot = {}                      # item -> index in _bag
+        self._recent = deque()
+        self._recent_count = {}
+        self._recent_artists = deque(maxlen=max(0, self.artist_gap))
+        self._history.clear()
+        self._cursor = -1
+        self._refill()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    # ------------------ LIBRARY CHANGES ------------------
+    def add(self, item):
+        """New track: it joins the current cycle at a random point."""
+        if item in self._items:
+            return
+        self._items[item] = None
+        self._slot[item] = len(self._bag)
+        self._bag.append(item)
+
+    def remove(self, item):
+        if item not in self._items:
+            return
+        del self._items[item]
+        self._take(item)
+
+    # ------------------ NAVIGATION ------------------
+    def next(self):
+        """Advance to the next track (replaying forward history after previous())."""
+        if self._cursor + 1 >= len(self._history):
+            item = self._draw()
+            if item is None:
+                return None
+            self._history.append(item)
+            self._cursor = len(self._history) - 1
+        else:
+            self._cursor += 1
+        item = self._history[self._cursor]
+        if item not in self._items:
+            # Removed since it was drawn: skip over it
+            del self._history[self._cursor]
+            self._cursor -= 1
+            return self.next()
+        return item
+
+    def peek(self):
+        """The track next() will return, drawn now so it can be prepared ahead."""
+        if self._cursor + 1 >= len(self._history):
+            item = self._draw()
+            if item is None:
+                return None
+            self._history.append(item)
+            # Cursor stays on the current track (which shifted if the history was full)
+            self._cursor = len(self._history) - 2
+        item = self._history[self._cursor + 1]
+        if item not in self._items:
+            del self._history[self._cursor + 1]
+            return self.peek()
+        return item
+
+    def previous(self):
+        """Step back through what was played; None at the start of history."""
+        while self._cursor > 0:
+            self._cursor -= 1
+            item = self._history[self._cursor]
+            if item in self._items:
+                return item
+        return None
+
+    def current(self):
+        return self._history[self._cursor] if 0 <= self._cursor < len(self._history) else None
+
+    def played(self, item):
+        """Record a track the user picked directly, so shuffle carries on from it."""
+        if item not in self._items or self.current() == item:
+            return
+        # A manual pick replaces any forward history; those tracks go back in the bag
+        while len(self._history) > self._cursor + 1:
+            skipped = self._history.pop()
+            if skipped in self._items and skipped not in self._slot:
+                self._slot[skipped] = len(self._bag)
+                self._bag.append(skipped)
+        self._take(item)
+        self._note_played(item)
+        self._history.append(item)
+        self._cursor = len(self._history) - 1
+
+    # ------------------ INTERNALS ------------------
+    def _refill(self):
+        self._bag = list(self._items)
+        self._slot = {item: i for i, item in enumerate(self._bag)}
+
+    def _take(self, item):
+        """Remove item from the bag in O(1) by moving the last entry into its slot."""
+        i = self._slot.pop(item, None)
+        if i is None:
+            return
+        last = self._bag.pop()
+        if i < len(self._bag):
+            self._bag[i] = last
+            self._slot[last] = i
+
+    def _acceptable(self, item):
+        if self._recent_count.get(item):
+            return False
+        if self.artist_of is not None and self._recent_artists:
+            try:
+                return self.artist_of(item) not in self._recent_artists
+            except Exception:
+                return True
+        return True
+
+    def _draw(self):
+        if not self._bag:
+            self._refill()
+            if not self._bag:
+                return None
+        bag, rng = self._bag, self.rng
+        pick = None
+        for _ in range(self.MAX_TRIES):
+            candidate = bag[rng.randrange(len(bag))]
+            if pick is None:
+                pick = candidate
+            if self._acceptable(candidate):
+                pick = candidate
+                break
+        self._take(pick)
+        self._note_played(pick)
+        return pick
+
+    def _note_played(self, item):
+        # Window never covers the whole library, or a small one could not repeat at all
+        window = min(self.no_repeat, len(self._items) - 1)
+        self._recent.append(item)
+        self._recent_count[item] = self._recent_count.get(item, 0) + 1
+        while len(self._recent) > max(0, window):
+            old = self._recent.popleft()
+            n = self._recent_count[old] - 1
+            if n:
+                self._recent_count[old] = n
+            else:
+                del self._recent_count[old]
+        if self.artist_of is not None and self._recent_artists.maxlen:
+            try:
+                self._recent_artists.append(self.artist_of(item))
+            except Exception:
+                pass
@@ -0,0 +1,61 @@
+import time
+
+# ============================================================================
+# STARTUP PROFILE
+# With --profile-startup the entry point marks the end of each startup phase
+# (imports, Tk root, UI build, first paint, library load); background work
+# such as the mixer start is added with its own duration. The report goes to
+# stdout once every expected phase has arrived. Disabled, mark() does nothing.
+# ============================================================================
+
+# The window should be on screen within this long of process start
+FIRST_PAINT_BUDGET_S = 0.3
+
+
+class StartupProfiler:
+    def __init__(self, started_at, enabled=False, expect=()):
+        """
+        started_at: time.perf_counter() taken as early as possible in the entry module
+        expect: phase names that must be recorded before the report is printed
+        """
+        self.enabled = enabled
+        self.started_at = started_at
+        self._last = started_at
+        self._phases = []           # (name, seconds, ended at, background)
+        self._waiting = set(expect)
+        self._reported = False
+
+    def mark(self, phase):
+        """Close the phase that ran since the previous mark."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._phases.append((phase, now - self._last, now - self.started_at, False))
+        self._last = now
+        self._arrived(phase)
+
+    def add(self, phase, seconds):
+        """Record work that ran off the critical path (e.g. on a worker thread)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._phases.append((phase, seconds or 0.0, now - self.started_at, True))
+        self._arrived(phase)
+
+    def _arrived(self, phase):
+        self._waiting.discard(phase)
+        if not self._waiting and not self._reported:
+            self._reported = True
+            self.report()
+
+    def report(self):
+        print("Startup profile (ms)")
+        print(f"  {'phase':<22}{'took':>8}{'done at':>10}")
+        for name, seconds, ended, background in self._phases:
+            label = name + (" (bg)" if background else "")
+            print(f"  {label:<22}{seconds * 1000:8.1f}{ended * 1000:10.1f}")
+        for name, _, ended, _ in self._phases:
+            if name == "first paint":
+                verdict = "ok" if ended <= FIRST_PAINT_BUDGET_S else "over budget"
+                print(f"  window visible after {ended * 1000:.0f} ms "
+                      f"({verdict}, budget {FIRST_PAINT_BUDGET_S * 1000:.0f} ms)")
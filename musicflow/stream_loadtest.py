@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from musicflow.stream_server import DEFAULT_PORT
+
+# ============================================================================
+# STREAMING LOAD TEST
+# Opens many keep-alive connections to a running stream server and has each
+# one loop over requests the way players do: mostly byte-range reads of
+# random tracks, with the occasional listing fetch or whole-file download.
+# At the end it reports requests per second, throughput and latency
+# percentiles. --serve starts a server for the folder first.
+#
+#   python -m musicflow.stream_loadtest [--clients 300] [--duration 10] [--serve ./songs]
+# ============================================================================
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.bytes = 0
+        self.errors = {}
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def _request(reader, writer, path, range_header=None, keep_body=False):
+    """One GET on an open connection; returns (status, headers, body length, or the body with keep_body)."""
+    lines = [f'GET {path} HTTP/1.1', 'Host: localhost']
+    if range_header:
+        lines.append('Range: ' + range_header)
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split(' ')[1])
+    headers = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    remaining = int(headers.get('content-length', 0))
+    if keep_body:
+        return status, headers, await reader.readexactly(remaining)
+    received = 0
+    while remaining:
+        chunk = await reader.read(min(remaining, 256 * 1024))
+        if not chunk:
+            raise ConnectionError("connection closed mid-body")
+        received += len(chunk)
+        remaining -= len(chunk)
+    return status, headers, received
+
+
+async def _client(host, port, tracks, deadline, stats, range_bytes, full_ratio):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        stats.error(type(e).__name__)
+        return
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            track = rng.choice(tracks)
+            if roll < 0.02:
+                path, range_header, expect = '/tracks', None, 200
+            elif roll < 0.02 + full_ratio:
+                path, range_header, expect = track['url'], None, 200
+            else:
+                # A seek: some window of the file, as players request it
+                start = rng.randrange(0, max(1, track['size'] - range_bytes))
+                path, range_header, expect = track['url'], f'bytes={start}-{start + range_bytes - 1}', 206
+            began = time.perf_counter()
+            status, headers, received = await _request(reader, writer, path, range_header)
+            stats.latencies.append(time.perf_counter() - began)
+            stats.bytes += received
+            if status != expect:
+                stats.error(f'HTTP {status}')
+            if headers.get('connection') == 'close':
+                break
+    except (OSError, asyncio.IncompleteReadError, ConnectionError) as e:
+        stats.error(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def _tracks(host, port):
+    """The server's listing, with each file's size (from a one-byte range request)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, _, body = await _request(reader, writer, '/tracks', keep_body=True)
+        tracks = json.loads(body)['tracks']
+        for track in tracks:
+            status, headers, _ = await _request(reader, writer, track['url'], 'bytes=0-0')
+            track['size'] = int(headers['content-range'].rsplit('/', 1)[1]) if status == 206 else 1
+        return tracks
+    finally:
+        writer.close()
+
+
+async def run(host, port, clients, duration, range_bytes, full_ratio):
+    tracks = await _tracks(host, port)
+    if not tracks:
+        raise SystemExit("The server lists no tracks")
+    stats = Stats()
+    began = time.perf_counter()
+    deadline = began + duration
+    await asyncio.gather(*(_client(host, port, tracks, deadline, stats, range_bytes, full_ratio)
+                           for _ in range(clients)))
+    return stats, time.perf_counter() - began, len(tracks)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _wait_for_server(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1.0).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m musicflow.stream_loadtest',
+                                     description="Load-test a MusicFlow stream server over localhost")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--clients', type=int, default=300, help="concurrent connections (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds (default: %(default)s)")
+    parser.add_argument('--range-bytes', type=int, default=64 * 1024,
+                        help="size of each range request (default: %(default)s)")
+    parser.add_argument('--full', type=float, default=0.02,
+                        help="share of requests that download a whole file (default: %(default)s)")
+    parser.add_argument('--serve', metavar='FOLDER', help="start a stream server for FOLDER first")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.serve:
+        server = subprocess.Popen([sys.executable, '-m', 'musicflow.stream_server', '--folder', args.serve,
+                                   '--host', args.host, '--port', str(args.port)])
+        if not _wait_for_server(args.host, args.port):
+            server.terminate()
+            raise SystemExit("The stream server did not start")
+    try:
+        stats, elapsed, count = asyncio.run(run(args.host, args.port, args.clients, args.duration,
+                                                args.range_bytes, args.full))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(stats.latencies)
+    print(f"{args.clients} clients, {count} tracks, {elapsed:.1f} s")
+    print(f"  requests: {len(latencies)} ({len(latencies) / elapsed:.0f}/s)")
+    print(f"  received: {stats.bytes / 1e6:.1f} MB ({stats.bytes / 1e6 / elapsed:.1f} MB/s)")
+    print("  latency ms: p50 %.2f  p90 %.2f  p99 %.2f  max %.2f" % tuple(
+        1000 * _percentile(latencies, q) for q in (0.5, 0.9, 0.99, 1.0)))
+    if stats.errors:
+        print("  errors:", ", ".join(f"{kind} x{n}" for kind, n in sorted(stats.errors.items())))
+    return 1 if stats.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from urllib.parse import quote, unquote, urlsplit, parse_qs
+
+from musicflow.art_cache import ART_SIZES, ArtCache
+from musicflow.library_scanner import LibraryScanner
+from musicflow.metadata_store import MetadataStore
+from musicflow.track_inspector import UNKNOWN_ARTIST, default_title
+
+# ============================================================================
+# LIBRARY STREAMING SERVER
+# A small HTTP/1.1 server on asyncio that serves the music folder to other
+# devices. GET /tracks is a JSON listing built from the metadata store (no
+# file is parsed to answer it). /audio/<path> streams a file with byte-range
+# support, and the body goes out with loop.sendfile, which is os.sendfile
+# on plain sockets: file pages go from the page cache to the socket without
+# passing through Python. /art/<key> serves the pre-rendered thumbnails. Every file
+# response carries an ETag made from size and mtime and answers
+# If-None-Match / If-Range. Connections are kept alive. One event loop on one
+# core serves hundreds of concurrent clients, because no request blocks it.
+#
+#   python -m musicflow.stream_server [--folder ./songs] [--host 127.0.0.1] [--port 8700]
+# ============================================================================
+
+DEFAULT_PORT = 8700
+
+_STATUS = {
+    200: 'OK', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 416: 'Range Not Satisfiable', 431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+_AUDIO_TYPES = {
+    '.mp3': 'audio/mpeg', '.flac': 'audio/flac', '.ogg': 'audio/ogg', '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4', '.aac': 'audio/aac',
+}
+_ART_KEY = re.compile(r'^[0-9a-f]{32}$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """(start, end), inclusive, for a single 'bytes=' range; None to send the whole file.
+
+    Multiple ranges and malformed headers are answered with the whole file, as
+    RFC 9110 allows; a range starting past the end raises RangeNotSatisfiable.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start, end = int(first), int(last) if last else size - 1
+            if last and start > end:
+                return None
+            if start >= size:
+                raise RangeNotSatisfiable()
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+    return start, end
+
+
+def file_etag(st):
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    return header.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in header.split(',')]
+
+
+class LibraryServer:
+    # A /tracks request rescans the folder if the listing is older than this
+    LISTING_TTL_S = 5.0
+    # Idle keep-alive connections are closed after this long
+    KEEPALIVE_S = 15.0
+    MAX_HEADER = 16 * 1024
+    BACKLOG = 1024
+
+    def __init__(self, music_folder, host='127.0.0.1', port=DEFAULT_PORT):
+        self.music_folder = music_folder
+        self.host = host
+        self.port = port
+        self.scanner = LibraryScanner(music_folder)
+        self.art_cache = ArtCache(music_folder)
+        self._files = {}            # listing key -> path
+        self._listing = None        # (body, etag)
+        self._listed_at = None
+        self._listing_lock = None
+        self._server = None
+        self._clients = {}          # connection task -> its writer
+        self._loop = None
+        self._stopped = None
+        self._stop_requested = False
+
+    # ------------------ LIFECYCLE ------------------
+    async def start(self):
+        self._listing_lock = asyncio.Lock()
+        self._stopped = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._connection, self.host, self.port,
+                                                  limit=self.MAX_HEADER, backlog=self.BACKLOG)
+        self.port = self._server.sockets[0].getsockname()[1]
+        # The listing is built by the first request that needs it, so a large library does not delay startup
+        return f"http://{self.host}:{self.port}/tracks"
+
+    async def run(self, on_started=None):
+        """Serve until stop() is called; on_started(url) runs once the socket is bound."""
+        url = await self.start()
+        if self._stop_requested:
+            self._stopped.set()     # stopped while it was still binding
+        if on_started is not None:
+            on_started(url)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Hang up on connected clients and let their handlers finish before the loop goes away.
+        # The sockets are shut down rather than the transports closed: a transport closed in
+        # the middle of loop.sendfile fails on its own pending waiter. Each handler then sees
+        # EOF or a broken pipe and closes its writer itself
+        for writer in self._clients.values():
+            try:
+                writer.get_extra_info('socket').shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        await asyncio.gather(*self._clients, return_exceptions=True)
+
+    def stop(self):
+        """Stop serving (from any thread, also before the server has finished starting)."""
+        self._stop_requested = True
+        loop, stopped = self._loop, self._stopped
+        if loop is not None and stopped is not None:
+            loop.call_soon_threadsafe(stopped.set)
+
+    def serve_in_thread(self, on_started=None):
+        """Run the server on a daemon thread with its own event loop, without waiting for it.
+
+        on_started(url, error) is called from that thread once the socket is
+        bound (error is None) or binding failed (url is None).
+        """
+        bound = []
+
+        def started(url):
+            bound.append(url)
+            if on_started is not None:
+                on_started(url, None)
+
+        def run():
+            try:
+                asyncio.run(self.run(started))
+            except Exception as e:
+                print("Streaming server stopped:", e)
+                if on_started is not None and not bound:
+                    on_started(None, e)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    # ------------------ LISTING ------------------
+    async def _refresh_listing(self):
+        async with self._listing_lock:
+            if self._listed_at is not None and time.monotonic() - self._listed_at < self.LISTING_TTL_S:
+                return
+            # Stats and the metadata query would stall every other client; they run on a worker thread
+            files, body = await self._loop.run_in_executor(None, self._build_listing)
+            self._files = files
+            self._listing = (body, '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest())
+            self._listed_at = time.monotonic()
+
+    def _build_listing(self):
+        self.scanner.rescan()
+        paths = self.scanner.paths()
+        try:
+            store = MetadataStore(self.music_folder)
+            try:
+                cached, _ = store.partition(paths)
+            finally:
+                store.close()
+        except Exception as e:
+            print("Metadata cache unavailable:", e)
+            cached = {}
+        root = os.path.abspath(self.music_folder)
+        files, tracks = {}, []
+        for p in paths:
+            key = os.path.relpath(os.path.abspath(p), root).replace(os.sep, '/')
+            files[key] = p
+            meta = cached.get(p, {})
+            art = meta.get('art_key')
+            tracks.append({
+                'id': key,
+                'title': meta.get('title') or default_title(p),
+                'artist': meta.get('artist') or UNKNOWN_ARTIST,
+                'duration': meta.get('duration') or 0,
+                'url': '/audio/' + quote(key),
+                'art': f'/art/{art}' if art else None,
+            })
+        return files, json.dumps({'tracks': tracks}, ensure_ascii=False).encode('utf-8')
+
+    # ------------------ HTTP ------------------
+    async def _connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.KEEPALIVE_S)
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                if not await self._request(head, writer):
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def _request(self, head, writer):
+        """Answer one request; returns whether the connection stays open."""
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ')
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            await self._respond(writer, 400, keep_alive=False)
+            return False
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        if method not in ('GET', 'HEAD') or 'content-length' in headers or 'transfer-encoding' in headers:
+            # No endpoint takes a body; rather than skip one, hang up
+            await self._respond(writer, 405, {'Allow': 'GET, HEAD'}, keep_alive=False)
+            return False
+        url = urlsplit(target)
+        route = url.path
+        head_only = method == 'HEAD'
+        try:
+            if route in ('/', '/tracks'):
+                await self._send_listing(writer, headers, keep_alive, head_only)
+            elif route.startswith('/audio/'):
+                key = unquote(route[len('/audio/'):])
+                path = self._files.get(key)
+                if path is None:
+                    # Not listed (yet): rescan, at most once per TTL, in case the file was added since
+                    await self._refresh_listing()
+                    path = self._files.get(key)
+                if path is None:
+                    await self._respond(writer, 404, keep_alive=keep_alive)
+                else:
+                    content_type = _AUDIO_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+                    await self._send_file(writer, path, headers, content_type, 'no-cache', keep_alive, head_only)
+            elif route.startswith('/art/'):
+                key = route[len('/art/'):]
+                variant = parse_qs(url.query).get('size', ['header'])[0]
+                if not _ART_KEY.match(key) or variant not in ART_SIZES:
+                    await self._respond(writer, 404, keep_alive=keep_alive)
+                else:
+                    # Content-addressed: a key always names the same picture
+                    await self._send_file(writer, self.art_cache.path_for(key, variant), headers, 'image/png',
+                                          'public, max-age=31536000, immutable', keep_alive, head_only)
+            else:
+                await self._respond(writer, 404, keep_alive=keep_alive)
+        except (ConnectionError, OSError):
+            raise
+        except Exception as e:
+            print("Streaming request failed:", e)
+            await self._respond(writer, 500, keep_alive=False)
+            return False
+        return keep_alive
+
+    async def _send_listing(self, writer, headers, keep_alive, head_only):
+        await self._refresh_listing()
+        body, etag = self._listing
+        if _etag_matches(headers.get('if-none-match'), etag):
+            await self._respond(writer, 304, {'ETag': etag}, keep_alive=keep_alive)
+            return
+        await self._respond(writer, 200, {'Content-Type': 'application/json; charset=utf-8', 'ETag': etag,
+                                          'Cache-Control': 'no-cache'},
+                            body=b'' if head_only else body, length=len(body), keep_alive=keep_alive)
+
+    async def _send_file(self, writer, path, headers, content_type, cache_control, keep_alive, head_only):
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            await self._respond(writer, 404, keep_alive=keep_alive)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size, etag = st.st_size, file_etag(st)
+            extra = {'ETag': etag, 'Accept-Ranges': 'bytes', 'Cache-Control': cache_control}
+            if _etag_matches(headers.get('if-none-match'), etag):
+                await self._respond(writer, 304, extra, keep_alive=keep_alive)
+                return
+            status, start, count = 200, 0, size
+            range_header = headers.get('range')
+            if range_header and (headers.get('if-range') is None or headers['if-range'] == etag):
+                try:
+                    span = parse_range(range_header, size)
+                except RangeNotSatisfiable:
+                    extra['Content-Range'] = f'bytes */{size}'
+                    await self._respond(writer, 416, extra, keep_alive=keep_alive)
+                    return
+                if span is not None:
+                    start, end = span
+                    status, count = 206, end - start + 1
+                    extra['Content-Range'] = f'bytes {start}-{end}/{size}'
+            extra['Content-Type'] = content_type
+            await self._respond(writer, status, extra, length=count, keep_alive=keep_alive)
+            if count and not head_only:
+                await self._loop.sendfile(writer.transport, f, start, count)
+
+    async def _respond(self, writer, status, headers=None, body=b'', length=None, keep_alive=True):
+        lines = [f'HTTP/1.1 {status} {_STATUS[status]}']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        if status != 304:
+            lines.append(f'Content-Length: {len(body) if length is None else length}')
+        lines.append('Connection: ' + ('keep-alive' if keep_alive else 'close'))
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m musicflow.stream_server',
+                                     description="Serve a MusicFlow library over HTTP")
+    parser.add_argument('--folder', default='./songs', help="music folder (default: %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address to listen on; 0.0.0.0 for other devices on the network (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="(default: %(default)s)")
+    args = parser.parse_args(argv)
+    server = LibraryServer(args.folder, args.host, args.port)
+    try:
+        asyncio.run(server.run(lambda url: print("MusicFlow streaming at", url, flush=True)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import base64
+import os
+
+from musicflow.lazy import is_available, lazy_import
+
+# mutagen loads on the first file inspected, not when the app starts
+MUTAGEN_AVAILABLE = is_available('mutagen')
+_mutagen = lazy_import('mutagen._file')
+
+# ============================================================================
+# SINGLE-PASS TRACK INSPECTOR
+# One mutagen open per file yields duration, tags, embedded art and codec info.
+# Results are plain dicts so they can cross thread/process boundaries.
+# ============================================================================
+
+UNKNOWN_ARTIST = "Unknown Artist"
+
+# Tag keys per container family, in order of preference
+_TITLE_KEYS = ('TIT2', 'title', '\xa9nam', 'Title')
+_ARTIST_KEYS = ('TPE1', 'artist', '\xa9ART', 'Author')
+_ALBUM_KEYS = ('TALB', 'album', '\xa9alb', 'WM/AlbumTitle')
+
+
+def default_title(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _first_text(tags, keys):
+    for key in keys:
+        try:
+            if key not in tags:
+                continue
+            value = tags[key]
+        except Exception:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        if value is None:
+            continue
+        text = str(value).strip().lstrip('\ufeff')
+        if text:
+            return text
+    return None
+
+
+def _embedded_art(audio):
+    """Return (bytes, mime) for the first embedded picture, or (None, None)."""
+    tags = getattr(audio, 'tags', None)
+    # ID3 (mp3, aiff, some wav): APIC frames, keyed 'APIC:<desc>'
+    if tags is not None and hasattr(tags, 'getall'):
+        try:
+            frames = tags.getall('APIC')
+        except Exception:
+            frames = []
+        if frames:
+            # Prefer the front cover (type 3) when several pictures are present
+            frame = next((f for f in frames if getattr(f, 'type', None) == 3), frames[0])
+            return frame.data, getattr(frame, 'mime', None)
+    # FLAC: picture blocks live on the file object
+    pictures = getattr(audio, 'pictures', None)
+    if pictures:
+        return pictures[0].data, pictures[0].mime
+    if tags is None:
+        return None, None
+    # MP4/M4A: 'covr' atoms
+    try:
+        if 'covr' in tags and tags['covr']:
+            return bytes(tags['covr'][0]), None
+    except Exception:
+        pass
+    # Ogg Vorbis/Opus: base64 FLAC picture block in a comment
+    try:
+        if 'metadata_block_picture' in tags:
+            from mutagen.flac import Picture
+            pic = Picture(base64.b64decode(tags['metadata_block_picture'][0]))
+            return pic.data, pic.mime
+    except Exception:
+        pass
+    return None, None
+
+
+def inspect_track(path, with_art=True):
+    """Open `path` once and return duration, tags, embedded art bytes and codec info.
+
+    Missing values fall back to the filename title and "Unknown Artist"; a file
+    mutagen cannot read still yields a usable dict with duration 0.
+    """
+    info = {
+        'title': default_title(path),
+        'artist': UNKNOWN_ARTIST,
+        'album': None,
+        'duration': 0,
+        'codec': os.path.splitext(path)[1].lstrip('.').lower() or None,
+        'bitrate': 0,
+        'sample_rate': 0,
+        'channels': 0,
+        'art': None,
+        'art_mime': None,
+    }
+    if not MUTAGEN_AVAILABLE:
+        return info
+    try:
+        audio = _mutagen.File(path)
+    except Exception:
+        return info
+    if audio is None:
+        return info
+
+    stream = getattr(audio, 'info', None)
+    if stream is not None:
+        info['duration'] = getattr(stream, 'length', 0) or 0
+        info['bitrate'] = getattr(stream, 'bitrate', 0) or 0
+        info['sample_rate'] = getattr(stream, 'sample_rate', 0) or 0
+        info['channels'] = getattr(stream, 'channels', 0) or 0
+        codec = getattr(stream, 'codec', None)
+        if codec:
+            info['codec'] = str(codec)
+
+    tags = getattr(audio, 'tags', None)
+    if tags:
+        info['title'] = _first_text(tags, _TITLE_KEYS) or info['title']
+        info['artist'] = _first_text(tags, _ARTIST_KEYS) or info['artist']
+        info['album'] = _first_text(tags, _ALBUM_KEYS)
+
+    if with_art:
+        try:
+            info['art'], info['art_mime'] = _embedded_art(audio)
+        except Exception:
+            pass
+    return info
+
+
+def metadata_from_info(info):
+    """Reduce an inspection result to the fields kept in song_metadata."""
+    return {'duration': info['duration'], 'title': info['title'], 'artist': info['artist']}
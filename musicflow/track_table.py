@@ -0,0 +1,158 @@
+import threading
+from array import array
+
+from musicflow.track_inspector import UNKNOWN_ARTIST, default_title
+
+# ============================================================================
+# COLUMNAR TRACK TABLE
+# One row per track, stored column by column: paths and titles in lists, the
+# heavily shared artists and art keys as indexes into an interned string pool,
+# durations and loudness gains in float arrays.
+# Rows are addressed by small integer ids (stable until clear()), a dict maps
+# path -> id, and the library order keeps a reverse id -> position column, so
+# views can be plain id lists and every lookup is O(1).
+# ============================================================================
+
+# String-pool slot meaning "not known yet" (e.g. art not inspected), as opposed to ''
+_UNKNOWN = 0
+_NO_GAIN = float('nan')
+
+
+class TrackTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._paths = []            # id -> path (None once removed)
+            self._ids = {}              # path -> id
+            self._titles = []           # id -> title
+            self._artist = array('I')   # id -> string-pool index
+            self._art = array('I')
+            self._duration = array('f')
+            self._gain = array('f')     # dB; NaN until the loudness pass measured it
+            self._strings = [None]      # pool index -> string; slot 0 is "unknown"
+            self._string_ids = {}
+            self.order = array('I')     # library order: position -> id
+            self._pos = array('i')      # id -> position in order, -1 if not listed
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, path):
+        return path in self._ids
+
+    def _intern(self, text):
+        if text is None:
+            return _UNKNOWN
+        idx = self._string_ids.get(text)
+        if idx is None:
+            idx = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return idx
+
+    # ------------------ ROWS ------------------
+    def add(self, path, meta=None):
+        """Insert path (or update its row) and return its id."""
+        with self._lock:
+            tid = self._ids.get(path)
+            if tid is None:
+                tid = len(self._paths)
+                self._ids[path] = tid
+                self._paths.append(path)
+                self._titles.append(default_title(path))
+                self._artist.append(self._intern(UNKNOWN_ARTIST))
+                self._art.append(_UNKNOWN)
+                self._duration.append(0.0)
+                self._gain.append(_NO_GAIN)
+                self._pos.append(-1)
+            if meta:
+                self._set(tid, meta)
+            return tid
+
+    def set_meta(self, tid, meta):
+        """Overwrite the columns present in meta (title, artist, duration, art_key, gain)."""
+        with self._lock:
+            self._set(tid, meta)
+
+    def _set(self, tid, meta):
+        if meta.get('title'):
+            self._titles[tid] = meta['title']
+        if meta.get('artist'):
+            self._artist[tid] = self._intern(meta['artist'])
+        if 'duration' in meta:
+            self._duration[tid] = float(meta['duration'] or 0)
+        if 'art_key' in meta:
+            self._art[tid] = self._intern(meta['art_key'])
+        if 'gain' in meta:
+            self._gain[tid] = _NO_GAIN if meta['gain'] is None else float(meta['gain'])
+
+    def set_art_key(self, tid, key):
+        with self._lock:
+            self._art[tid] = self._intern(key)
+
+    def remove(self, path):
+        """Drop path's row; its id is never reused until clear(). Returns the id or None."""
+        with self._lock:
+            tid = self._ids.pop(path, None)
+            if tid is not None:
+                self._paths[tid] = None
+            return tid
+
+    # ------------------ COLUMNS ------------------
+    def id_of(self, path):
+        return self._ids.get(path)
+
+    def ids_for(self, paths):
+        """Ids of the known paths, in the given order."""
+        ids = self._ids
+        return [tid for tid in map(ids.get, paths) if tid is not None]
+
+    def path(self, tid):
+        return self._paths[tid]
+
+    def title(self, tid):
+        return self._titles[tid]
+
+    def artist(self, tid):
+        return self._strings[self._artist[tid]]
+
+    def duration(self, tid):
+        return self._duration[tid]
+
+    def gain(self, tid):
+        """Loudness normalization in dB, or None if not analyzed yet."""
+        g = self._gain[tid]
+        return None if g != g else g
+
+    def art_key(self, tid):
+        """Art cache key, '' for a track without art, None if not inspected yet."""
+        return self._strings[self._art[tid]]
+
+    def meta(self, tid):
+        """The row as a metadata dict (the shape the metadata store persists)."""
+        return {
+            'title': self.title(tid),
+            'artist': self.artist(tid),
+            'duration': self.duration(tid),
+            'art_key': self.art_key(tid),
+            'gain': self.gain(tid),
+        }
+
+    # ------------------ LIBRARY ORDER ------------------
+    def set_order(self, ids):
+        """Make ids the library order; returns the order array."""
+        with self._lock:
+            order = array('I', ids)
+            pos = array('i', [-1]) * len(self._paths)
+            for i, tid in enumerate(order):
+                pos[tid] = i
+            self.order, self._pos = order, pos
+            return order
+
+    def position(self, tid):
+        """Position of tid in the library order, or -1."""
+        if tid is None or not 0 <= tid < len(self._pos):
+            return -1
+        return self._pos[tid]
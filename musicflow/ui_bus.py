@@ -0,0 +1,129 @@
+import threading
+import time
+import traceback
+
+# ============================================================================
+# MAIN-THREAD UI UPDATE BUS
+# Worker threads post updates here instead of touching Tk or flooding
+# root.after(0, ...). The Tk thread drains the queue once per frame within a
+# time budget, keeps only the latest update per key (widget/variable/card),
+# and drops updates aimed at widgets that no longer exist.
+# ============================================================================
+
+
+class UIUpdateBus:
+    def __init__(self, root, frame_ms=16, budget_ms=8, idle_ms=100):
+        """
+        frame_ms: drain interval while updates are flowing
+        budget_ms: max time spent applying updates per frame; the rest waits a frame
+        idle_ms: drain interval once the queue has gone quiet
+        """
+        self.root = root
+        self.frame_ms = frame_ms
+        self.budget_ms = budget_ms
+        self.idle_ms = idle_ms
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._after_id = None
+        self.applied = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # ------------------ POSTING (any thread) ------------------
+    def post(self, key, fn, *args, widget=None):
+        """Queue fn(*args); a later post with the same key replaces it.
+
+        If widget is given, the update is dropped when that widget is gone.
+        """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (fn, args, widget)
+
+    def call(self, fn, *args):
+        """Queue fn(*args) without coalescing."""
+        self.post(object(), fn, *args)
+
+    def post_config(self, widget, **options):
+        """Queue widget.configure(**options), merging with any pending options for that widget."""
+        key = ('config', id(widget))
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[1][0].update(options)
+                self.coalesced += 1
+            else:
+                self._pending[key] = (self._apply_config, (dict(options), widget), widget)
+
+    def post_var(self, var, value):
+        """Queue var.set(value); only the latest value is applied."""
+        self.post(('var', id(var)), var.set, value)
+
+    # ------------------ DRAINING (Tk thread) ------------------
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.frame_ms, self._drain)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def flush(self):
+        """Apply everything pending right now (Tk thread only)."""
+        self._apply(float('inf'))
+
+    def _drain(self):
+        had_work = self._apply(self.budget_ms / 1000.0)
+        try:
+            self._after_id = self.root.after(self.frame_ms if had_work else self.idle_ms, self._drain)
+        except Exception:
+            # Root destroyed: stop quietly
+            self._after_id = None
+
+    def _apply(self, budget_s):
+        with self._lock:
+            if not self._pending:
+                return False
+            batch, self._pending = self._pending, {}
+        deadline = time.perf_counter() + budget_s
+        items = iter(batch.items())
+        for key, (fn, args, widget) in items:
+            if widget is not None and not self._alive(widget):
+                self.dropped += 1
+                continue
+            try:
+                fn(*args)
+                self.applied += 1
+            except Exception:
+                if widget is not None and not self._alive(widget):
+                    # Destroyed while the update ran: as good as dropped
+                    self.dropped += 1
+                else:
+                    self.failed += 1
+                    traceback.print_exc()
+            if time.perf_counter() > deadline:
+                break
+        leftover = list(items)
+        if leftover:
+            # Over budget: carry the rest to the next frame unless it was re-posted meanwhile
+            with self._lock:
+                newer = self._pending
+                self._pending = dict(leftover)
+                self._pending.update(newer)
+        return True
+
+    @staticmethod
+    def _alive(widget):
+        try:
+            return bool(widget.winfo_exists())
+        except Exception:
+            return False
+
+    @staticmethod
+    def _apply_config(options, widget):
+        widget.configure(**options)
@@ -0,0 +1,121 @@
+# ============================================================================
+# WAVEFORM SEEK BAR
+# A progress bar drawn as the track's waveform: two canvas polygons share the
+# same envelope, one for the whole track and one (in the accent colour) for
+# the part already played. Peaks come precomputed (see peaks.py); the bar only
+# resamples them to its width when it is resized or given a new track, and a
+# progress change is a single coords() call.
+# ============================================================================
+
+
+class WaveformBar:
+    # Horizontal pixels per envelope point
+    STEP = 2
+
+    def __init__(self, canvas, variable, colors, on_seek=None):
+        """
+        variable: DoubleVar holding the progress in percent (0..100)
+        colors: dict with 'bg', 'played', 'rest'
+        on_seek(value) receives the new percent as a string, like a ttk.Scale command
+        """
+        self.canvas = canvas
+        self.variable = variable
+        self.on_seek = on_seek
+        self.peaks = None
+        self._top = []
+        self._bottom = []
+        self._xs = []
+        self._drawn = None
+        self._drag = None
+        canvas.configure(bg=colors['bg'], highlightthickness=0, bd=0, cursor='hand2')
+        self._rest = canvas.create_polygon(0, 0, 0, 0, 0, 0, fill=colors['rest'], outline='')
+        self._played = canvas.create_polygon(0, 0, 0, 0, 0, 0, fill=colors['played'], outline='')
+        variable.trace_add('write', lambda *_: self._draw_progress())
+        canvas.bind('<Configure>', lambda e: self._layout())
+        canvas.bind('<Button-1>', self._on_press)
+        canvas.bind('<B1-Motion>', self._on_drag)
+        canvas.bind('<ButtonRelease-1>', self._on_release)
+
+    # ------------------ PUBLIC API ------------------
+    def set_peaks(self, peaks):
+        """Show peaks (a peaks.Peaks), or a flat line while they are being computed."""
+        self.peaks = peaks
+        self._layout()
+
+    # ------------------ DRAWING ------------------
+    def _layout(self):
+        c = self.canvas
+        width, height = max(c.winfo_width(), self.STEP), max(c.winfo_height(), 4)
+        columns = max(2, width // self.STEP)
+        mid, half = height / 2.0, height / 2.0 - 1
+        self._xs = [i * (width - 1) / (columns - 1) for i in range(columns)]
+        peaks = self.peaks
+        if peaks is None or not len(peaks.mins):
+            self._top = [mid - 1] * columns
+            self._bottom = [mid + 1] * columns
+        else:
+            mins, maxs = peaks.mins, peaks.maxs
+            n = len(mins)
+            # Scale to the loudest point so quiet tracks still fill the bar
+            scale = half / max(1, max(maxs), -min(mins))
+            self._top, self._bottom = [], []
+            for i in range(columns):
+                a = i * n // columns
+                b = max(a + 1, (i + 1) * n // columns)
+                self._top.append(mid - max(1.0, max(maxs[a:b]) * scale))
+                self._bottom.append(mid + max(1.0, -min(mins[a:b]) * scale))
+        c.coords(self._rest, *self._envelope(columns))
+        self._drawn = None
+        self._draw_progress()
+
+    def _envelope(self, count):
+        """Polygon coords along the top edge of the first count columns and back along the bottom."""
+        xs, top, bottom = self._xs, self._top, self._bottom
+        coords = []
+        for i in range(count):
+            coords += (xs[i], top[i])
+        for i in range(count - 1, -1, -1):
+            coords += (xs[i], bottom[i])
+        return coords
+
+    def _fraction(self):
+        if self._drag is not None:
+            return self._drag
+        try:
+            return min(1.0, max(0.0, float(self.variable.get()) / 100.0))
+        except Exception:
+            return 0.0
+
+    def _draw_progress(self):
+        columns = len(self._xs)
+        if not columns:
+            return
+        count = int(round(self._fraction() * (columns - 1))) + 1
+        if count == self._drawn:
+            return
+        self._drawn = count
+        if count < 2:
+            self.canvas.coords(self._played, 0, 0, 0, 0, 0, 0)
+        else:
+            self.canvas.coords(self._played, *self._envelope(count))
+
+    # ------------------ SEEKING ------------------
+    def _event_fraction(self, event):
+        width = max(1, self.canvas.winfo_width() - 1)
+        return min(1.0, max(0.0, event.x / width))
+
+    def _on_press(self, event):
+        self._drag = self._event_fraction(event)
+        self._draw_progress()
+
+    def _on_drag(self, event):
+        # Only the picture follows the pointer; the track seeks once, on release
+        self._drag = self._event_fraction(event)
+        self._draw_progress()
+
+    def _on_release(self, event):
+        value = self._event_fraction(event) * 100.0
+        self._drag = None
+        self.variable.set(value)
+        if self.on_seek is not None:
+            self.on_seek(str(value))
@@ -19,11 +19,11 @@ if errorlevel 1 (
     exit /b 1
 )
 
-echo [1/4] Python detected successfully
+echo [1/5] Python detected successfully
 echo.
 
 REM Install pygame
-echo [2/4] Installing pygame...
+echo [2/5] Installing pygame...
 pip install pygame
 if errorlevel 1 (
     echo ERROR: Failed to install pygame
@@ -33,7 +33,7 @@ if errorlevel 1 (
 
 REM Install Pillow
 echo.
-echo [3/4] Installing Pillow...
+echo [3/5] Installing Pillow...
 pip install pillow
 if errorlevel 1 (
     echo ERROR: Failed to install Pillow
@@ -43,7 +43,7 @@ if errorlevel 1 (
 
 REM Install mutagen
 echo.
-echo [4/4] Installing mutagen...
+echo [4/5] Installing mutagen...
 pip install mutagen
 if errorlevel 1 (
     echo ERROR: Failed to install mutagen
@@ -51,6 +51,16 @@ if errorlevel 1 (
     exit /b 1
 )
 
+REM Install numpy (waveform seek bar)
+echo.
+echo [5/5] Installing numpy...
+pip install numpy
+if errorlevel 1 (
+    echo ERROR: Failed to install numpy
+    pause
+    exit /b 1
+)
+
 REM Create songs folder
 echo.
 echo Creating 'songs' folder...